@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+# Import modules
+import argparse
+import glob
+import io
+import os
+import time
+import numpy as np
+from PIL import Image, ImageSequence
+from ipixel_ctrl import image
+
+def load_with_pil_loop(data: bytes, width: int, height: int, anchor: int, auto_resize: bool) -> np.ndarray:
+    # Per-frame PIL path: convert, resize and clip/anchor one frame at a time
+    frames = []
+    with Image.open(io.BytesIO(data)) as img:
+        for frame in ImageSequence.Iterator(img):
+            processed_frame = frame.convert("RGBA")
+            if auto_resize:
+                processed_frame = image.resize_image(processed_frame, width, height)
+            frames.append(image.clip_and_anchor_for_image(processed_frame, width, height, anchor))
+    return image.as_frame_stack(frames)
+
+def load_with_stack(data: bytes, width: int, height: int, anchor: int, auto_resize: bool, resample: str) -> np.ndarray:
+    stack, _, _ = image.load_frame_stack(data)
+    return image.render_stack_for_device(stack, width, height, anchor, auto_resize, resample = resample)
+
+def measure(func, repeat: int) -> tuple[float, object]:
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description = 'compare the PIL frame loop with the NumPy frame stack path')
+    parser.add_argument("--device-width", dest = 'device_width', type = int, default = 96)
+    parser.add_argument("--device-height", dest = 'device_height', type = int, default = 32)
+    parser.add_argument("--anchor", type = lambda x: int(x, 0), default = 0x33)
+    parser.add_argument("--no-resize", dest = 'auto_resize', default = True, action = "store_false")
+    parser.add_argument("--resample", choices = image.RESAMPLE_MODES, default = image.RESAMPLE_LANCZOS, help = 'resampling of the stack path, the PIL loop always uses LANCZOS')
+    parser.add_argument("--repeat", type = int, default = 5, help = 'runs per file, the best one is reported')
+    parser.add_argument("image_file", nargs = "*", help = 'image files (default: gifs/*.gif)')
+    args = parser.parse_args()
+
+    paths = args.image_file or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "gifs", "*.gif")))
+    print(f"{'file':<20} {'frames':>6} {'source':>9} {'pil ms':>8} {'stack ms':>8} {'speedup':>7} {'max diff':>8}")
+    total_pil = 0.0
+    total_stack = 0.0
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        pil_time, pil_frames = measure(lambda: load_with_pil_loop(data, args.device_width, args.device_height, args.anchor, args.auto_resize), args.repeat)
+        stack_time, stack_frames = measure(lambda: load_with_stack(data, args.device_width, args.device_height, args.anchor, args.auto_resize, args.resample), args.repeat)
+        total_pil += pil_time
+        total_stack += stack_time
+        diff = int(np.abs(pil_frames.astype(np.int16) - stack_frames.astype(np.int16)).max())
+        size = f"{pil_frames.shape[0]}"
+        with Image.open(io.BytesIO(data)) as img:
+            source = f"{img.width}x{img.height}"
+        print(f"{os.path.basename(path):<20} {size:>6} {source:>9} {pil_time * 1000:>8.2f} {stack_time * 1000:>8.2f} {pil_time / stack_time:>6.1f}x {diff:>8}")
+    if total_stack > 0:
+        print(f"{'total':<20} {'':>6} {'':>9} {total_pil * 1000:>8.2f} {total_stack * 1000:>8.2f} {total_pil / total_stack:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -32,12 +32,26 @@ async def send_command(params: argparse.Namespace) -> int:
 
     # Make payload
     payloads = ipixel_ctrl.arguments.COMMANDS[params.command](params)
+    if params.verbose:
+        for report in getattr(params, 'encode_report', []):
+            print(f"Encoded buffer {report['buffer']}: {report['format']} {report['size']} bytes (budget {report['budget']}), colors={report['colors']} dither={report['dither']} frames={report['frames']} fits={report['fits']}")
     for payload in payloads:
         if params.verbose:
             print("Payload:")
             ipixel_ctrl.utils.dump_data(payload)
 
-    # Send payload
+    # Send payload and print the responses of queries
+    if params.command in ipixel_ctrl.arguments.QUERIES:
+        decoder = ipixel_ctrl.arguments.QUERIES[params.command]
+        responses = await ipixel_ctrl.bluetooth.request(params.target, payloads)
+        if not responses:
+            print("No response")
+        for response in responses:
+            print("Response:")
+            ipixel_ctrl.utils.dump_data(response)
+            if decoder is not None:
+                print(decoder(response))
+        return 0
     await ipixel_ctrl.bluetooth.send(params.target, payloads)
 
     return 0
@@ -2,6 +2,17 @@
 
 from . import arguments
 from . import bluetooth
+from . import cache
+from . import flags
+from . import framebuffer
 from . import image
+from . import manifest
+from . import playlist
+from . import poll
+from . import reconnect
+from . import remocon
+from . import response
+from . import stream
 from . import utils
+from . import wall
 from .commands import *
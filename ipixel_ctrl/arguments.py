@@ -8,16 +8,28 @@ COMMANDS = {
     "expert": expert.make,
     "write-png": write_data_png.make,
     "write-gif": write_data_gif.make,
+    "write-mix": write_data_mix.make,
     "erase-data": erase_data.make,
     "diy-mode": set_diy_mode.make,
     "set-pixel": set_pixel.make,
     "clock-mode": set_clock_mode.make,
+    "current-time": set_current_time.make,
     "power": set_power.make,
     "default-mode": set_default_mode.make,
     "brightness": set_brightness.make,
     "upside-down": set_upside_down.make,
     "screen": set_screen.make,
     "prg-mode": set_prg_mode.make,
+    "text": set_text.make,
+    "device-info": get_device_info.make,
+    "last-space": get_last_space.make,
+}
+
+# Commands answered on the response characteristic, with an optional decoder
+QUERIES = {
+    "device-info": get_device_info.parse,
+    "current-time": set_current_time.parse,
+    "last-space": get_last_space.parse,
 }
 
 def helper_convert_bool(value: str) -> bool:
@@ -66,13 +78,18 @@ def parse(argv: list[str]):
     set_upside_down.args(subcmd)
     set_default_mode.args(subcmd)
     set_clock_mode.args(subcmd)
+    set_current_time.args(subcmd)
     set_diy_mode.args(subcmd)
     set_pixel.args(subcmd)
     set_prg_mode.args(subcmd)
     set_screen.args(subcmd)
+    set_text.args(subcmd)
     erase_data.args(subcmd)
+    get_device_info.args(subcmd)
+    get_last_space.args(subcmd)
     write_data_gif.args(subcmd)
     write_data_png.args(subcmd)
+    write_data_mix.args(subcmd)
     expert.args(subcmd)
 
     ## Do parse
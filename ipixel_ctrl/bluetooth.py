@@ -2,18 +2,149 @@
 
 # Import modules
 import asyncio
+import threading
+import time
+from typing import Callable, Optional
 from bleak import BleakScanner
 from bleak import BleakClient
 
-async def scan():
-    devices = await BleakScanner.discover()
-    for d in devices:
-        if d.name and d.name.startswith('LED_BLE_'):
-            print(f'ADDR = {d.address} NAME = {d.name})')
+# Advertised name prefix of iPixel panels ("LED_BLE_xxxx")
+DEVICE_NAME_PREFIX = 'LED_BLE_'
+
+# Service holding the write (fa02) and notify (fa03) characteristics, lets the backend drop other advertisements
+SERVICE_UUID = '0000fa00-0000-1000-8000-00805f9b34fb'
+
+def is_ipixel_name(name: Optional[str]) -> bool:
+    return bool(name) and name.startswith(DEVICE_NAME_PREFIX)
+
+class DeviceRegistry:
+    r"""Live table of advertising iPixel devices.
+
+    Updated from scanner callbacks, read from any thread. Each entry holds
+    the latest BLEDevice (so a connection can skip discovery), the name,
+    RSSI and the time the device was last seen.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._devices = {}
+
+    def update(self, device, name: Optional[str], rssi: Optional[int]) -> bool:
+        """
+        Records an advertisement.
+
+        :param device: The advertising BLEDevice.
+        :param name: Advertised name.
+        :param rssi: Signal strength in dBm.
+        :return: True if the device was not in the registry yet.
+        """
+        with self._lock:
+            new = device.address not in self._devices
+            self._devices[device.address] = {'device': device, 'name': name or device.name, 'rssi': rssi, 'last_seen': self.clock()}
+            return new
+
+    def get(self, address: str, max_age: Optional[float] = None) -> Optional[dict]:
+        """
+        Returns the entry of a device.
+
+        :param address: Device address.
+        :param max_age: Only return it if it was seen within this many seconds.
+        :return: Copy of the entry, or None.
+        """
+        with self._lock:
+            entry = self._devices.get(address)
+            if entry is None or (max_age is not None and self.clock() - entry['last_seen'] > max_age):
+                return None
+            return dict(entry)
+
+    def entries(self) -> dict:
+        """
+        Returns a copy of all entries, strongest signal first.
+
+        :return: Dict of address to entry.
+        """
+        with self._lock:
+            items = sorted(self._devices.items(), key = lambda item: -(item[1]['rssi'] if item[1]['rssi'] is not None else -999))
+            return {address: dict(entry) for address, entry in items}
+
+class ContinuousScanner:
+    r"""Callback-driven BLE scanner feeding a DeviceRegistry.
+
+    Advertisements are handled as they arrive instead of after a fixed
+    discovery window. Addresses added with want() are reported once,
+    through on_wanted, the moment they advertise.
+
+    :param registry: Registry to update.
+    :param on_wanted: Called with the address when a wanted device advertises (from the scanner's loop).
+    :param service_uuids: Service UUIDs to filter on in the backend, None to filter by name only.
+    """
+    def __init__(self, registry: DeviceRegistry, on_wanted: Optional[Callable[[str], None]] = None, service_uuids: Optional[tuple[str, ...]] = (SERVICE_UUID,)):
+        self.registry = registry
+        self.on_wanted = on_wanted
+        self.service_uuids = service_uuids
+        self._wanted = set()
+        self._lock = threading.Lock()
+
+    def want(self, address: str) -> None:
+        with self._lock:
+            self._wanted.add(address)
+
+    def unwant(self, address: str) -> None:
+        with self._lock:
+            self._wanted.discard(address)
+
+    def wanted(self) -> set[str]:
+        with self._lock:
+            return set(self._wanted)
+
+    def _detected(self, device, advertisement) -> None:
+        name = advertisement.local_name or device.name
+        if not is_ipixel_name(name):
+            return
+        self.registry.update(device, name, advertisement.rssi)
+        with self._lock:
+            wanted = device.address in self._wanted
+            self._wanted.discard(device.address)
+        if wanted and self.on_wanted:
+            self.on_wanted(device.address)
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        scanner = BleakScanner(detection_callback = self._detected, service_uuids = list(self.service_uuids) if self.service_uuids else None)
+        await scanner.start()
+        try:
+            await stop_event.wait()
+        finally:
+            await scanner.stop()
+
+async def scan(timeout: float = 5.0):
+    registry = DeviceRegistry()
+
+    def report(device, advertisement):
+        name = advertisement.local_name or device.name
+        # Print each device once, as soon as it advertises
+        if is_ipixel_name(name) and registry.update(device, name, advertisement.rssi):
+            print(f'ADDR = {device.address} NAME = {name} RSSI = {advertisement.rssi}')
+
+    async with BleakScanner(detection_callback = report, service_uuids = [SERVICE_UUID]):
+        await asyncio.sleep(timeout)
+
+WRITE_UUID = '0000fa02-0000-1000-8000-00805f9b34fb'
+NOTIFY_UUID = '0000fa03-0000-1000-8000-00805f9b34fb'
 
 async def send(target: str, payloads: list[bytes]):
     async with BleakClient(target) as client:
         _ = client.services
         for payload in payloads:
             await asyncio.sleep(0.5)
-            await client.write_gatt_char('0000fa02-0000-1000-8000-00805f9b34fb', payload)
+            await client.write_gatt_char(WRITE_UUID, payload)
+
+async def request(target: str, payloads: list[bytes], timeout: float = 2.0) -> list[bytes]:
+    responses = []
+    async with BleakClient(target) as client:
+        await client.start_notify(NOTIFY_UUID, lambda _, data: responses.append(bytes(data)))
+        for payload in payloads:
+            await client.write_gatt_char(WRITE_UUID, payload)
+        # Collect whatever arrives in time, some commands never answer
+        await asyncio.sleep(timeout)
+        await client.stop_notify(NOTIFY_UUID)
+    return responses
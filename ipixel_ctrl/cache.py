@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+# Import modules
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+INDEX_FILE = "index.json"
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+
+class PayloadCache:
+    r"""Size-bounded on-disk cache of ready-to-send image data with LRU eviction.
+
+    Entries are stored as one file per key, named by the key's hash. The
+    index (key, file name, size, in LRU order) is kept in memory and saved
+    to index.json on every put and on flush, so lookups never scan the
+    directory. All methods are thread-safe.
+
+    :param directory: Cache directory, created when missing.
+    :param max_bytes: Upper bound for the total size of all entries.
+    """
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, dict]" = OrderedDict()
+        self._total = 0
+        os.makedirs(directory, exist_ok = True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), 'r') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        # Saved from least to most recently used
+        for entry in entries:
+            self._index[entry['key']] = {'file': entry['file'], 'size': entry['size']}
+            self._total += entry['size']
+
+    def _save_index(self) -> None:
+        entries = [{'key': key, 'file': entry['file'], 'size': entry['size']} for key, entry in self._index.items()]
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + ".tmp", 'w') as f:
+            json.dump(entries, f)
+        os.replace(path + ".tmp", path)
+
+    def _remove(self, key: str) -> None:
+        entry = self._index.pop(key)
+        self._total -= entry['size']
+        try:
+            os.remove(os.path.join(self.directory, entry['file']))
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the cached data for a key and marks it as recently used.
+
+        :param key: Cache key.
+        :return: The cached data, or None on a miss.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            try:
+                with open(os.path.join(self.directory, entry['file']), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                # Deleted behind our back, forget it
+                self._remove(key)
+                self._save_index()
+                return None
+            self._index.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Stores data for a key, evicting the least recently used entries over the size bound.
+
+        :param key: Cache key.
+        :param data: Data to store.
+        :return: None
+        """
+        if len(data) > self.max_bytes:
+            return
+        name = hashlib.sha1(key.encode()).hexdigest() + ".bin"
+        with self._lock:
+            if key in self._index:
+                self._remove(key)
+            path = os.path.join(self.directory, name)
+            with open(path + ".tmp", 'wb') as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            self._index[key] = {'file': name, 'size': len(data)}
+            self._total += len(data)
+            while self._total > self.max_bytes:
+                self._remove(next(iter(self._index)))
+            self._save_index()
+
+    def flush(self) -> None:
+        """
+        Saves the index, including the LRU order changed by get().
+
+        :return: None
+        """
+        with self._lock:
+            self._save_index()
+
+    def clear(self) -> None:
+        """
+        Removes every entry.
+
+        :return: None
+        """
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+            self._save_index()
@@ -3,14 +3,19 @@
 from . import common
 from . import erase_data
 from . import expert
+from . import get_device_info
+from . import get_last_space
 from . import set_brightness
 from . import set_clock_mode
+from . import set_current_time
 from . import set_default_mode
 from . import set_diy_mode
 from . import set_pixel
 from . import set_power
 from . import set_prg_mode
 from . import set_screen
+from . import set_text
 from . import set_upside_down
 from . import write_data_gif
+from . import write_data_mix
 from . import write_data_png
@@ -1,8 +1,59 @@
 #!/usr/bin/env python3
 
+# Import modules
+from .. import utils
+
 PAYLOAD_LEN_SIZE = 0x02
 PAYLOAD_CMD_SIZE = 0x02
 
+# Data commands
+CMD_SEND_PNG = 0x0002
+CMD_SEND_GIF = 0x0003
+CMD_SEND_MIX = 0x0004
+CMD_SET_TEXT = 0x0100
+# Commands that store data in a buffer (same header layout), they answer with the DATA result codes
+DATA_COMMANDS = (CMD_SEND_PNG, CMD_SEND_GIF, CMD_SEND_MIX, CMD_SET_TEXT)
+
+# Screen numbers (SCR_NO)
+DIY_BUFFER = 0x65
+REMOCON_BUFFER = 0x6F # Remocon 1, selected with switch_screen 1
+REMOCON_COUNT = 9
+
 def make_payload(command: int, data:bytes) -> bytes:
     length = PAYLOAD_LEN_SIZE + PAYLOAD_CMD_SIZE + len(data)
     return length.to_bytes(PAYLOAD_LEN_SIZE, 'little') + command.to_bytes(PAYLOAD_CMD_SIZE, 'little') + data
+
+def make_data_payload(command: int, data: bytes, buffer: int, kind: int = 0x00) -> bytes:
+    data_size = len(data)
+    data_csum = utils.crc32(data)
+
+    # Make payload
+    payload  = bytes([0x00])
+    payload += data_size.to_bytes(4, 'little')
+    payload += data_csum.to_bytes(4, 'little')
+    payload += bytes([ kind ])
+    payload += bytes([ buffer ])
+    payload += data
+    return make_payload(command, payload)
+
+def parse_response(response: bytes, command: int, min_size: int = 0) -> bytes:
+    """
+    Checks a response notification and returns its data.
+
+    :param response: Response notification (LEN, CMD, DAT).
+    :param command: Expected command.
+    :param min_size: Minimum size of DAT, firmwares may append more.
+    :return: DAT of the response.
+    """
+    header_size = PAYLOAD_LEN_SIZE + PAYLOAD_CMD_SIZE
+    if response is None or len(response) < header_size:
+        raise ValueError("Response is too short")
+    length = int.from_bytes(response[0:PAYLOAD_LEN_SIZE], 'little')
+    if length != len(response):
+        raise ValueError(f"Response length {len(response)} does not match LEN {length}")
+    if int.from_bytes(response[PAYLOAD_LEN_SIZE:header_size], 'little') != command:
+        raise ValueError(f"Not a response to 0x{command:04X}")
+    data = response[header_size:]
+    if len(data) < min_size:
+        raise ValueError(f"Response to 0x{command:04X} is too short")
+    return data
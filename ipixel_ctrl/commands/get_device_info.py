@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+# Import modules
+import argparse
+from . import common
+
+def args(subparser):
+    subparser.add_parser(
+        "device-info",
+        help = 'get device information',
+        description = '',
+        formatter_class = lambda prog: argparse.HelpFormatter(prog, max_help_position = 120)
+    )
+
+def make(params: argparse.Namespace) -> list[bytes]:
+    # Check arguments
+    if params is None:
+        raise ValueError("Invalid arguments")
+
+    # Make payload
+    return [ common.make_payload(0x8005, bytes([])) ]
+
+def parse(response: bytes) -> dict:
+    """
+    Decodes the get_device_info response.
+
+    :param response: Response notification (LEN, CMD, DAT).
+    :return: Dict with the MCU and BLE firmware versions ("XX.YY") and the hex of any bytes after them.
+    """
+    data = common.parse_response(response, 0x8005, 4)
+    return {
+        'mcu_version': f"{data[0]:02X}.{data[1]:02X}",
+        'ble_version': f"{data[2]:02X}.{data[3]:02X}",
+        'extra': data[4:].hex()
+    }
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+# Import modules
+import argparse
+from . import common
+
+def args(subparser):
+    subparser.add_parser(
+        "last-space",
+        help = 'get last space (undocumented, prints the raw response if the device answers)',
+        description = '',
+        formatter_class = lambda prog: argparse.HelpFormatter(prog, max_help_position = 120)
+    )
+
+def make(params: argparse.Namespace) -> list[bytes]:
+    # Check arguments
+    if params is None:
+        raise ValueError("Invalid arguments")
+
+    # Make payload
+    return [ common.make_payload(0x8002, bytes([])) ]
+
+def parse(response: bytes) -> dict:
+    """
+    Reads the get_last_space response. Its layout is undocumented, so the data is only kept as hex.
+
+    :param response: Response notification (LEN, CMD, DAT).
+    :return: Dict with the data as hex.
+    """
+    data = common.parse_response(response, 0x8002, 1)
+    return {'space': data.hex()}
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+# Import modules
+import argparse
+from datetime import datetime
+from . import common
+
+def args(subparser):
+    arg = subparser.add_parser(
+        "current-time",
+        help = 'set current time and get the LED type',
+        description = 'The device powers on when it receives this command.',
+        formatter_class = lambda prog: argparse.HelpFormatter(prog, max_help_position = 120)
+    )
+    arg.add_argument(
+        "--time",
+        metavar = "HH:MM:SS",
+        dest = 'current_time',
+        default = None,
+        help = 'current time (default: now)'
+    )
+
+def make(params: argparse.Namespace) -> list[bytes]:
+    # Check arguments
+    if params is None:
+        raise ValueError("Invalid arguments")
+
+    # Set Data
+    value = getattr(params, 'current_time', None)
+    time = datetime.strptime(value, "%H:%M:%S").time() if value else datetime.now().time()
+
+    # Make payload
+    payload  = bytes([ time.hour ])
+    payload += bytes([ time.minute ])
+    payload += bytes([ time.second ])
+    payload += bytes([ 0x00 ])
+    return [ common.make_payload(0x8001, payload) ]
+
+def parse(response: bytes) -> dict:
+    """
+    Decodes the set_current_time response.
+
+    :param response: Response notification (LEN, CMD, DAT).
+    :return: Dict with the LED type, power and password flags.
+    """
+    data = common.parse_response(response, 0x8001, 7)
+    return {
+        'led_type': data[0],
+        'power': data[5] != 0x00,
+        'password': data[6] != 0x00
+    }
@@ -5,6 +5,9 @@ import argparse
 from .. import arguments
 from . import common
 
+# The device does not answer set_pixel, so like the vendor app every command is sent this many times
+REPEAT = 3
+
 def args(subparser):
     arg = subparser.add_parser(
         "set-pixel",
@@ -29,13 +32,16 @@ def args(subparser):
         help = 'pixel color'
     )
 
+def build(x: int, y: int, color: int) -> bytes:
+    payload  = color.to_bytes(4, 'big')
+    payload += bytes([ x ])
+    payload += bytes([ y ])
+    return common.make_payload(0x0105, payload)
+
 def make(params: argparse.Namespace) -> list[bytes]:
     # Check arguments
     if params is None:
         raise ValueError("Invalid arguments")
 
     # Make payload
-    payload  = params.pixel_color.to_bytes(4, 'big')
-    payload += bytes([ params.pixel_pos[0] ])
-    payload += bytes([ params.pixel_pos[1] ])
-    return [ common.make_payload(0x0105, payload) ]
+    return [ build(params.pixel_pos[0], params.pixel_pos[1], params.pixel_color) ] * REPEAT
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+# Import modules
+import argparse
+from .. import image
+from . import common
+from . import write_data_gif
+from . import write_data_png
+
+# Text effects (EFFECT)
+EFFECTS = {
+    'fixed': 0x00,
+    'rtl': 0x01,
+    'ltr': 0x02,
+    'blink': 0x05,
+    'breeze': 0x06,
+    'snow': 0x07,
+    'laser': 0x08
+}
+MAX_TEXT_LENGTH = 499
+GLYPH_MARKER = 0x80
+
+def helper_convert_color(value: str) -> tuple[int, int, int]:
+    try:
+        value = value.lstrip('#')
+        if len(value) != 6:
+            raise ValueError
+        return tuple(bytes.fromhex(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError("The color must be in the format: RRGGBB")
+
+def args(subparser):
+    arg = subparser.add_parser(
+        "text",
+        help = 'show text drawn by the device',
+        description = '',
+        formatter_class = lambda prog: argparse.HelpFormatter(prog, max_help_position = 120)
+    )
+    arg.add_argument(
+        "--buffer",
+        dest = 'start_buffer',
+        metavar="no.",
+        type = lambda x: int(x, 0),
+        default = 1,
+        help = 'write buffer number (0x01 - 0xFF)'
+    )
+    arg.add_argument(
+        "--effect",
+        choices = EFFECTS.keys(),
+        default = 'rtl',
+        help = 'text effect (default: rtl)'
+    )
+    arg.add_argument(
+        "--speed",
+        type = int,
+        default = 50,
+        help = 'effect speed (1 - 100)'
+    )
+    arg.add_argument(
+        "--style",
+        type = int,
+        default = 1,
+        help = 'text style (1 - 9)'
+    )
+    arg.add_argument(
+        "--color",
+        type = helper_convert_color,
+        default = (0xFF, 0xFF, 0xFF),
+        help = 'text color (RRGGBB)'
+    )
+    arg.add_argument(
+        "--background",
+        type = helper_convert_color,
+        default = (0x00, 0x00, 0x00),
+        help = 'background color (RRGGBB)'
+    )
+    arg.add_argument(
+        "--font",
+        dest = 'font',
+        default = image.DEFAULT_FONT,
+        help = 'TrueType font the glyphs are drawn with'
+    )
+    arg.add_argument(
+        "--marquee",
+        dest = 'marquee',
+        default = False,
+        action = "store_true",
+        help = 'upload the text as a scrolling GIF drawn with --font instead of the device font'
+    )
+    arg.add_argument(
+        "--device-width",
+        dest = 'device_width',
+        type = int,
+        default = 96,
+        help = 'device width, used with --marquee'
+    )
+    arg.add_argument(
+        "--device-height",
+        dest = 'device_height',
+        type = int,
+        default = 32,
+        help = 'device height, used with --marquee'
+    )
+    arg.add_argument(
+        "--temporary",
+        dest = 'temporary',
+        default = False,
+        action = "store_true",
+        help = 'send the text to the temporary DIY buffer (0x65) instead of a program buffer'
+    )
+    arg.add_argument(
+        "text",
+        help = 'text to show'
+    )
+
+def encode_glyph(glyph, color: tuple[int, int, int]) -> bytes:
+    """
+    Encodes a glyph as PIX_DATA: marker, color, size and one right-justified bit row per line.
+
+    :param glyph: Boolean array (height, width), True for lit pixels.
+    :param color: Glyph color (R, G, B).
+    :return: PIX_DATA as bytes.
+    """
+    height, width = glyph.shape
+    data  = bytes([ GLYPH_MARKER ])
+    data += bytes(color)
+    data += bytes([ width, height ])
+    for row in glyph:
+        # Leftmost pixel in the highest bit
+        line = 0
+        for lit in row:
+            line = (line << 1) | int(lit)
+        data += line.to_bytes(2, 'little')
+    return data
+
+def build_text_data(text: str, effect: int, speed: int, style: int, color: tuple[int, int, int], background: tuple[int, int, int], font: str = image.DEFAULT_FONT) -> bytes:
+    """
+    Makes TXT_DATA: the text header followed by one glyph per character.
+
+    :param text: Text to show.
+    :param effect: Effect value (see EFFECTS).
+    :param speed: Effect speed (1 - 100).
+    :param style: Text style (1 - 9).
+    :param color: Text color (R, G, B).
+    :param background: Background color (R, G, B).
+    :param font: TrueType font the glyphs are drawn with.
+    :return: TXT_DATA as bytes.
+    """
+    data  = len(text).to_bytes(2, 'little')
+    data += bytes([ 0x01, 0x01 ])
+    data += bytes([ effect ])
+    data += bytes([ speed ])
+    data += bytes([ style ])
+    data += bytes(color)
+    data += bytes([ 0x01 ])
+    data += bytes(background)
+    for char in text:
+        data += encode_glyph(image.render_glyph(char, font_path = font), color)
+    return data
+
+def build(text_data: bytes, buffer: int) -> bytes:
+    return common.make_data_payload(common.CMD_SET_TEXT, text_data, buffer)
+
+def make(params: argparse.Namespace) -> list[bytes]:
+    # Check arguments
+    if params is None:
+        raise ValueError("Invalid arguments")
+    if not params.text:
+        raise ValueError("The text must not be empty")
+    if len(params.text) > MAX_TEXT_LENGTH:
+        raise ValueError(f"The text must be at most {MAX_TEXT_LENGTH} characters")
+    if params.effect not in EFFECTS:
+        raise ValueError(f"The effect must be one of {', '.join(EFFECTS)}")
+    if params.speed < 1 or params.speed > 100:
+        raise ValueError("The speed must be between 1 and 100")
+    if params.style < 1 or params.style > 9:
+        raise ValueError("The style must be between 1 and 9")
+    temporary = getattr(params, 'temporary', False)
+    if not temporary and (params.start_buffer < 1 or params.start_buffer > 255):
+        raise ValueError("The buffer must be between 1 and 255")
+
+    # Make payload
+    if getattr(params, 'marquee', False):
+        step = max(1, params.speed // 25) # Faster scrolling skips columns
+        data = image.make_marquee(params.text, params.device_width, params.device_height, params.color, params.background, step = step, font_path = getattr(params, 'font', image.DEFAULT_FONT))
+        if temporary:
+            return write_data_png.make_temporary(write_data_gif.build(data, common.DIY_BUFFER))
+        return [ write_data_gif.build(data, params.start_buffer) ]
+    text_data = build_text_data(params.text, EFFECTS[params.effect], params.speed, params.style, params.color, params.background, getattr(params, 'font', image.DEFAULT_FONT))
+    if temporary:
+        return write_data_png.make_temporary(build(text_data, common.DIY_BUFFER))
+    return [ build(text_data, params.start_buffer) ]
@@ -3,8 +3,8 @@
 # Import modules
 import argparse
 from .. import image
-from .. import utils
 from . import common
+from . import write_data_png
 
 def args(subparser):
     arg = subparser.add_parser(
@@ -55,12 +55,76 @@ def args(subparser):
         default = 0x33,
         help = 'T.B.D.'
     )
+    arg.add_argument(
+        "--resample",
+        dest = 'resample',
+        choices = image.RESAMPLE_MODES,
+        default = image.RESAMPLE_AUTO,
+        help = 'resampling used with --auto-resize, auto picks nearest/box for pixel art and integer scales (default: auto)'
+    )
     arg.add_argument(
         "--duplicate-horizontally",
         dest = 'duplicate_horizontally',
         default = False,
         action = "store_true",
-        help = 'T.B.D.'
+        help = 'render at half the device width and show it twice side by side'
+    )
+    arg.add_argument(
+        "--colors",
+        dest = 'colors',
+        type = int,
+        default = image.MAX_PALETTE_COLORS,
+        help = 'global palette size shared by all frames (2 - 256)'
+    )
+    arg.add_argument(
+        "--byte-budget",
+        dest = 'byte_budget',
+        type = int,
+        default = 0,
+        help = 'maximum payload size in bytes, lowers quality until it fits (0 = off)'
+    )
+    arg.add_argument(
+        "--time-budget",
+        dest = 'time_budget',
+        type = float,
+        default = 0,
+        help = 'maximum upload time in seconds, needs --throughput (0 = off)'
+    )
+    arg.add_argument(
+        "--throughput",
+        dest = 'throughput',
+        type = float,
+        default = None,
+        help = 'link throughput in bytes per second, used with --time-budget'
+    )
+    arg.add_argument(
+        "--hold-after",
+        dest = 'hold_after',
+        metavar = "msec",
+        type = int,
+        default = 0,
+        help = 'play the animation for this long, then hold on its first frame (default: 0, loop forever)'
+    )
+    arg.add_argument(
+        "--temporary",
+        dest = 'temporary',
+        default = False,
+        action = "store_true",
+        help = 'send the first image to the temporary DIY buffer (0x65) instead of program buffers'
+    )
+    arg.add_argument(
+        "--placeholder",
+        dest = 'placeholder',
+        choices = image.PLACEHOLDER_MODES,
+        default = image.PLACEHOLDER_OFF,
+        help = 'show a tiny placeholder from the DIY buffer while a large payload uploads (default: off)'
+    )
+    arg.add_argument(
+        "--placeholder-threshold",
+        dest = 'placeholder_threshold',
+        type = int,
+        default = image.PLACEHOLDER_THRESHOLD,
+        help = f'only send a placeholder for payloads larger than this many bytes (default: {image.PLACEHOLDER_THRESHOLD})'
     )
     arg.add_argument(
         "image_file",
@@ -68,6 +132,22 @@ def args(subparser):
         help = 'image file (gif)'
     )
 
+def build(data_gif: bytes, buffer: int) -> bytes:
+    return common.make_data_payload(common.CMD_SEND_GIF, data_gif, buffer)
+
+def encode(key: str, frames, duration, loop, colors: int, hold_after: int = 0) -> bytes:
+    if hold_after > 0:
+        frames, duration, loop = image.hold_first_frame(frames, duration, hold_after)
+    return image.quantize_frames_to_gif(key, frames, duration = duration, loop = loop, colors = colors)
+
+def build_within_budget(frames, duration, loop, key: str, buffer: int, budget: int, colors: int, reports: list, hold_after: int = 0) -> bytes:
+    fmt, data, report = image.encode_within_budget(key, frames, duration, loop, budget, colors, hold_after)
+    report['buffer'] = buffer
+    reports.append(report)
+    if fmt == 'png':
+        return common.make_data_payload(common.CMD_SEND_PNG, data, buffer)
+    return build(data, buffer)
+
 def make(params: argparse.Namespace) -> list[bytes]:
     # Check arguments
     if params is None:
@@ -76,39 +156,47 @@ def make(params: argparse.Namespace) -> list[bytes]:
         raise ValueError("At least one image file must be specified. None was given")
     if params.start_buffer < 1 or params.start_buffer > 255:
         raise ValueError("The buffer must be between 1 and 255")
+    colors = getattr(params, 'colors', image.MAX_PALETTE_COLORS)
+    if colors < 2 or colors > image.MAX_PALETTE_COLORS:
+        raise ValueError("The colors must be between 2 and 256")
+    hold_after = getattr(params, 'hold_after', 0)
+    if hold_after < 0:
+        raise ValueError("The hold time must be 0 or greater")
+    budget = image.resolve_byte_budget(getattr(params, 'byte_budget', 0), getattr(params, 'time_budget', 0), getattr(params, 'throughput', None))
+    auto_resize = getattr(params, 'auto_resize', False)
+    resample = getattr(params, 'resample', image.RESAMPLE_AUTO)
+    duplicate = getattr(params, 'duplicate_horizontally', False)
+    temporary = getattr(params, 'temporary', False)
+    start_buffer = common.DIY_BUFFER if temporary else params.start_buffer
+    params.encode_report = []
 
     if params.make_from_image > 0:
-        # Set data
-        data_gif  = image.make_animation_from_image_file_for_device(params.image_file, params.device_width, params.device_height, params.anchor, params.make_from_image, getattr(params, 'auto_resize', False))
-        data_size = len(data_gif)
-        data_csum = utils.crc32(data_gif)
-
-        # Make payload
-        payload  = bytes([0x00])
-        payload += data_size.to_bytes(4, 'little')
-        payload += data_csum.to_bytes(4, 'little')
-        payload += bytes([0x00])
-        payload += bytes([ params.start_buffer ])
-        payload += data_gif
-        return [ common.make_payload(0x0003, payload) ]
+        frames, key = image.load_image_files_as_frames_for_device(params.image_file, params.device_width, params.device_height, params.anchor, auto_resize, duplicate, resample)
+        if budget > 0:
+            payload = build_within_budget(frames, params.make_from_image, 0, key, start_buffer, budget, colors, params.encode_report, hold_after)
+        else:
+            payload = build(encode(key, frames, params.make_from_image, 0, colors, hold_after), start_buffer)
+        if temporary:
+            return write_data_png.make_temporary(payload)
+        return write_data_png.with_placeholder([ payload ], frames, key, params)
 
     result = []
-    for i in range(len(params.image_file)):
-        if (params.start_buffer + i) > 0xFF:
+    first = None
+    # There is only one DIY buffer
+    count = 1 if temporary else len(params.image_file)
+    for i in range(count):
+        if (start_buffer + i) > 0xFF:
             break
 
-        # Set data
-        data_gif  = image.read_animation_file_for_device(params.image_file[i], params.device_width, params.device_height, params.anchor, getattr(params, 'auto_resize', False))
-        data_size = len(data_gif)
-        data_csum = utils.crc32(data_gif)
+        frames, duration, loop, key = image.load_animation_frames_for_device(params.image_file[i], params.device_width, params.device_height, params.anchor, auto_resize, duplicate, resample)
+        first = first or (frames, key)
+        if budget > 0:
+            result.append(build_within_budget(frames, duration, loop, key, start_buffer + i, budget, colors, params.encode_report, hold_after))
+            continue
 
-        # Make payload
-        payload  = bytes([0x00])
-        payload += data_size.to_bytes(4, 'little')
-        payload += data_csum.to_bytes(4, 'little')
-        payload += bytes([0x00])
-        payload += bytes([ params.start_buffer + i ])
-        payload += data_gif
-        result.append(common.make_payload(0x0003, payload))
+        # Set data
+        result.append(build(encode(key, frames, duration, loop, colors, hold_after), start_buffer + i))
 
-    return result
+    if temporary:
+        return write_data_png.make_temporary(result[0])
+    return write_data_png.with_placeholder(result, first[0], first[1], params) if first else result
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+# Import modules
+import argparse
+from .. import image
+from . import common
+from . import set_text
+from . import write_data_gif
+from . import write_data_png
+
+# Part types (block header byte 4)
+PART_GIF = 0x01
+PART_TEXT = 0x03
+PART_TYPES = {
+    'gif': PART_GIF,
+    'text': PART_TEXT
+}
+PART_HEADER_SIZE = 16
+MIX_KIND = 0x02
+
+def helper_convert_part(value: str) -> tuple[str, tuple[int, int, int, int], str]:
+    try:
+        kind, area, content = value.split(":", 2)
+        x, y, width, height = (int(v) for v in area.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("The part must be in the format: gif|text:x,y,width,height:file or text")
+    if kind not in PART_TYPES:
+        raise argparse.ArgumentTypeError(f"The part type must be one of {', '.join(PART_TYPES)}")
+    return kind, (x, y, width, height), content
+
+def args(subparser):
+    arg = subparser.add_parser(
+        "write-mix",
+        help = 'write gif and text parts in one upload',
+        description = 'Parts are drawn in the given order, e.g. --part gif:0,0,32,32:flag.gif --part "text:32,0,64,32:RED FLAG"',
+        formatter_class = lambda prog: argparse.HelpFormatter(prog, max_help_position = 120)
+    )
+    arg.add_argument(
+        "--buffer",
+        dest = 'start_buffer',
+        metavar="no.",
+        type = lambda x: int(x, 0),
+        required = True,
+        help = 'write buffer number (0x01 - 0xFF)'
+    )
+    arg.add_argument(
+        "--part",
+        dest = 'parts',
+        type = helper_convert_part,
+        action = "append",
+        required = True,
+        help = 'part as type:x,y,width,height:content, gif parts are resized to their area'
+    )
+    arg.add_argument(
+        "--colors",
+        type = int,
+        default = image.MAX_PALETTE_COLORS,
+        help = 'maximum colors of gif parts (2 - 256)'
+    )
+    arg.add_argument(
+        "--effect",
+        choices = set_text.EFFECTS.keys(),
+        default = 'rtl',
+        help = 'effect of text parts (default: rtl)'
+    )
+    arg.add_argument(
+        "--speed",
+        type = int,
+        default = 50,
+        help = 'effect speed of text parts (1 - 100)'
+    )
+    arg.add_argument(
+        "--color",
+        type = set_text.helper_convert_color,
+        default = (0xFF, 0xFF, 0xFF),
+        help = 'color of text parts (RRGGBB)'
+    )
+    arg.add_argument(
+        "--background",
+        type = set_text.helper_convert_color,
+        default = (0x00, 0x00, 0x00),
+        help = 'background color of text parts (RRGGBB)'
+    )
+    arg.add_argument(
+        "--temporary",
+        dest = 'temporary',
+        default = False,
+        action = "store_true",
+        help = 'send to the temporary DIY buffer (0x65) instead of a program buffer'
+    )
+
+def make_part_header(kind: int, size: int, x: int, y: int, width: int, height: int) -> bytes:
+    """
+    Makes the block header of a part, laid out like the examples in DeviceCommands.md.
+
+    :param kind: PART_GIF or PART_TEXT.
+    :param size: Size of the part data.
+    :param x: Left edge of the part area.
+    :param y: Top edge of the part area.
+    :param width: Width of the part area.
+    :param height: Height of the part area.
+    :return: The 16 byte header.
+    """
+    for value in (x, y, width, height):
+        if value < 0 or value > 0xFF:
+            raise ValueError("The part area must be between 0 and 255")
+    if width == 0 or height == 0:
+        raise ValueError("The part area must not be empty")
+    header  = size.to_bytes(4, 'little')
+    header += bytes([ kind, x, y, width, height ])
+    header += bytes([ 0x00 ])
+    # Unknown, copied from the examples (text parts differ from gif parts)
+    header += bytes([ 0x64 if kind == PART_TEXT else 0x00, 0x00 ])
+    header += bytes([ 0x00, 0x64 ])
+    header += bytes([ 0x00, 0x00 ])
+    return header
+
+def gif_part(data_gif: bytes, x: int, y: int, width: int, height: int) -> dict:
+    """
+    Describes a GIF part, shown in its area as it is (not resized by the device).
+
+    :param data_gif: GIF data.
+    :return: The part.
+    """
+    return {'kind': PART_GIF, 'data': data_gif, 'area': (x, y, width, height)}
+
+def text_part(text_data: bytes, x: int, y: int, width: int, height: int) -> dict:
+    """
+    Describes a text part, drawn by the device in its area.
+
+    :param text_data: TXT_DATA (see set_text.build_text_data).
+    :return: The part.
+    """
+    return {'kind': PART_TEXT, 'data': text_data, 'area': (x, y, width, height)}
+
+def compose(parts: list[dict]) -> bytes:
+    """
+    Packs parts into MIX_DATA: a block header and the data of each part, in order.
+
+    :param parts: Parts from gif_part and text_part.
+    :return: MIX_DATA as bytes.
+    """
+    if not parts:
+        raise ValueError("At least one part must be given")
+    data = b""
+    for part in parts:
+        data += make_part_header(part['kind'], len(part['data']), *part['area'])
+        data += part['data']
+    return data
+
+def build(mix_data: bytes, buffer: int) -> bytes:
+    return common.make_data_payload(common.CMD_SEND_MIX, mix_data, buffer, MIX_KIND)
+
+def make(params: argparse.Namespace) -> list[bytes]:
+    # Check arguments
+    if params is None:
+        raise ValueError("Invalid arguments")
+    if not params.parts:
+        raise ValueError("At least one part must be specified. None was given")
+    temporary = getattr(params, 'temporary', False)
+    if not temporary and (params.start_buffer < 1 or params.start_buffer > 255):
+        raise ValueError("The buffer must be between 1 and 255")
+    if params.speed < 1 or params.speed > 100:
+        raise ValueError("The speed must be between 1 and 100")
+
+    # Set data
+    parts = []
+    for kind, (x, y, width, height), content in params.parts:
+        if kind == 'gif':
+            frames, duration, loop, key = image.load_animation_frames_for_device(content, width, height, 0x33, True)
+            parts.append(gif_part(write_data_gif.encode(key, frames, duration, loop, params.colors), x, y, width, height))
+        else:
+            if not content:
+                raise ValueError("The text must not be empty")
+            text_data = set_text.build_text_data(content, set_text.EFFECTS[params.effect], params.speed, 1, params.color, params.background)
+            parts.append(text_part(text_data, x, y, width, height))
+
+    # Make payload
+    if temporary:
+        return write_data_png.make_temporary(build(compose(parts), common.DIY_BUFFER))
+    return [ build(compose(parts), params.start_buffer) ]
@@ -3,8 +3,8 @@
 # Import modules
 import argparse
 from .. import image
-from .. import utils
 from . import common
+from . import set_diy_mode
 
 def args(subparser):
     arg = subparser.add_parser(
@@ -55,12 +55,116 @@ def args(subparser):
         default = 0x33,
         help = 'T.B.D.'
     )
+    arg.add_argument(
+        "--resample",
+        dest = 'resample',
+        choices = image.RESAMPLE_MODES,
+        default = image.RESAMPLE_AUTO,
+        help = 'resampling used with --auto-resize, auto picks nearest/box for pixel art and integer scales (default: auto)'
+    )
+    arg.add_argument(
+        "--duplicate-horizontally",
+        dest = 'duplicate_horizontally',
+        default = False,
+        action = "store_true",
+        help = 'render at half the device width and show it twice side by side'
+    )
+    arg.add_argument(
+        "--byte-budget",
+        dest = 'byte_budget',
+        type = int,
+        default = 0,
+        help = 'maximum payload size in bytes, lowers quality until it fits (0 = off)'
+    )
+    arg.add_argument(
+        "--time-budget",
+        dest = 'time_budget',
+        type = float,
+        default = 0,
+        help = 'maximum upload time in seconds, needs --throughput (0 = off)'
+    )
+    arg.add_argument(
+        "--throughput",
+        dest = 'throughput',
+        type = float,
+        default = None,
+        help = 'link throughput in bytes per second, used with --time-budget'
+    )
+    arg.add_argument(
+        "--temporary",
+        dest = 'temporary',
+        default = False,
+        action = "store_true",
+        help = 'send the first image to the temporary DIY buffer (0x65) instead of program buffers'
+    )
+    arg.add_argument(
+        "--placeholder",
+        dest = 'placeholder',
+        choices = image.PLACEHOLDER_MODES,
+        default = image.PLACEHOLDER_OFF,
+        help = 'show a tiny placeholder from the DIY buffer while a large payload uploads (default: off)'
+    )
+    arg.add_argument(
+        "--placeholder-threshold",
+        dest = 'placeholder_threshold',
+        type = int,
+        default = image.PLACEHOLDER_THRESHOLD,
+        help = f'only send a placeholder for payloads larger than this many bytes (default: {image.PLACEHOLDER_THRESHOLD})'
+    )
     arg.add_argument(
         "image_file",
         nargs = "+",
         help = 'image file (png or jpg or bmp)'
     )
 
+def build(data_png: bytes, buffer: int) -> bytes:
+    return common.make_data_payload(common.CMD_SEND_PNG, data_png, buffer)
+
+def build_within_budget(frame, key: str, buffer: int, budget: int, reports: list) -> bytes:
+    fmt, data, report = image.encode_within_budget(key, [ frame ], 100, None, budget)
+    report['buffer'] = buffer
+    reports.append(report)
+    if fmt == 'gif':
+        return common.make_data_payload(common.CMD_SEND_GIF, data, buffer)
+    return build(data, buffer)
+
+def make_temporary(payload: bytes) -> list[bytes]:
+    """
+    Wraps a payload for the DIY buffer in the "Send Temporary Image Sequence".
+
+    :param payload: A write payload targeting common.DIY_BUFFER.
+    :return: DIY mode on, followed by the payload.
+    """
+    return set_diy_mode.make(argparse.Namespace(diy_mode = True)) + [ payload ]
+
+def with_placeholder(payloads: list[bytes], frames, key: str, params: argparse.Namespace) -> list[bytes]:
+    """
+    Prepends a tiny placeholder, shown from the DIY buffer while the payloads upload.
+
+    The sequence is: DIY mode on, placeholder PNG to the DIY buffer, the
+    full payloads, DIY mode off. The last upload then shows automatically.
+
+    :param payloads: The full write payloads.
+    :param frames: Device-ready frames of the first image, used for the placeholder.
+    :param key: Cache key of those frames (see image.render_key).
+    :param params: Command arguments (placeholder, placeholder_threshold).
+    :return: The payloads, with the placeholder sequence when the upload is large enough.
+    """
+    mode = getattr(params, 'placeholder', image.PLACEHOLDER_OFF)
+    threshold = getattr(params, 'placeholder_threshold', image.PLACEHOLDER_THRESHOLD)
+    if getattr(params, 'temporary', False):
+        return payloads
+    if mode == image.PLACEHOLDER_OFF or not payloads or sum(len(p) for p in payloads) <= threshold:
+        return payloads
+
+    placeholder = image.make_placeholder(key, frames, mode)
+    return (
+        set_diy_mode.make(argparse.Namespace(diy_mode = True))
+        + [ build(placeholder, common.DIY_BUFFER) ]
+        + payloads
+        + set_diy_mode.make(argparse.Namespace(diy_mode = False))
+    )
+
 def make(params: argparse.Namespace) -> list[bytes]:
     # Check arguments
     if params is None:
@@ -69,39 +173,41 @@ def make(params: argparse.Namespace) -> list[bytes]:
         raise ValueError("At least one image file must be specified. None was given")
     if params.start_buffer < 1 or params.start_buffer > 255:
         raise ValueError("The buffer must be between 1 and 255")
+    budget = image.resolve_byte_budget(getattr(params, 'byte_budget', 0), getattr(params, 'time_budget', 0), getattr(params, 'throughput', None))
+    auto_resize = getattr(params, 'auto_resize', False)
+    resample = getattr(params, 'resample', image.RESAMPLE_AUTO)
+    duplicate = getattr(params, 'duplicate_horizontally', False)
+    temporary = getattr(params, 'temporary', False)
+    start_buffer = common.DIY_BUFFER if temporary else params.start_buffer
+    params.encode_report = []
 
     if params.join_image_files:
-        # Set data
-        data_png  = image.make_joined_image_file_for_device(params.image_file, params.device_width, params.device_height, params.anchor, getattr(params, 'auto_resize', False))
-        data_size = len(data_png)
-        data_csum = utils.crc32(data_png)
-
-        # Make payload
-        payload  = bytes([0x00])
-        payload += data_size.to_bytes(4, 'little')
-        payload += data_csum.to_bytes(4, 'little')
-        payload += bytes([0x00])
-        payload += bytes([ params.start_buffer ])
-        payload += data_png
-        return [ common.make_payload(0x0002, payload) ]
+        frame, key = image.load_joined_image_frame_for_device(params.image_file, params.device_width, params.device_height, params.anchor, auto_resize, duplicate, resample)
+        if budget > 0:
+            payload = build_within_budget(frame, key, start_buffer, budget, params.encode_report)
+        else:
+            payload = build(image.encode_rgba_png(frame), start_buffer)
+        if temporary:
+            return make_temporary(payload)
+        return with_placeholder([ payload ], [ frame ], key, params)
 
     result = []
-    for i in range(len(params.image_file)):
-        if (params.start_buffer + i) > 0xFF:
+    first = None
+    # There is only one DIY buffer
+    count = 1 if temporary else len(params.image_file)
+    for i in range(count):
+        if (start_buffer + i) > 0xFF:
             break
 
+        frame, key = image.load_image_frame_for_device(params.image_file[i], params.device_width, params.device_height, params.anchor, auto_resize, duplicate, resample)
+        first = first or (frame, key)
+        if budget > 0:
+            result.append(build_within_budget(frame, key, start_buffer + i, budget, params.encode_report))
+            continue
+
         # Set data
-        data_png  = image.read_image_file_for_device(params.image_file[i], params.device_width, params.device_height, params.anchor, getattr(params, 'auto_resize', False))
-        data_size = len(data_png)
-        data_csum = utils.crc32(data_png)
-
-        # Make payload
-        payload  = bytes([0x00])
-        payload += data_size.to_bytes(4, 'little')
-        payload += data_csum.to_bytes(4, 'little')
-        payload += bytes([0x00])
-        payload += bytes([ params.start_buffer + i ])
-        payload += data_png
-        result.append(common.make_payload(0x0002, payload))
-
-    return result
+        result.append(build(image.encode_rgba_png(frame), start_buffer + i))
+
+    if temporary:
+        return make_temporary(result[0])
+    return with_placeholder(result, [ first[0] ], first[1], params) if first else result
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+# Import modules
+import time
+from typing import Optional
+
+# How Multiviewer actions settle before they are shown, overridden by "mv_policy" in the config file.
+# settle: seconds an action must persist before it is shown (slower back to green, so a bouncing status holds the flag).
+# dwell: seconds an action stays up before a lower or equal priority action may replace it.
+# Higher priority actions skip the dwell, preempting actions also skip the settle time.
+DEFAULT_MV_POLICY = {
+    'settle': {'green': 1.5, 'ending': 1.0},
+    'dwell': {'green': 2.0, 'yellow': 3.0, 'sc': 3.0, 'vsc': 3.0, 'ending': 3.0},
+    'priority': {'green': 0, 'ending': 0, 'yellow': 1, 'vsc': 2, 'sc': 3, 'red': 4},
+    'preempt': ['red']
+}
+
+class FlagDebouncer:
+    r"""Turns the raw Multiviewer actions into the settled flag to show.
+
+    A new action becomes a candidate. It is shown once it persisted for
+    its settle time and the shown action had its dwell time, unless it has
+    a higher priority (no dwell) or preempts (shown at once). A status
+    bouncing back to the shown action drops the candidate, so a flapping
+    track status causes no uploads until it settles.
+
+    :param overrides: Policy tables merged over DEFAULT_MV_POLICY, the preempt list is replaced.
+    :param clock: Monotonic clock in seconds.
+    """
+    def __init__(self, overrides: Optional[dict] = None, clock = time.monotonic):
+        overrides = overrides or {}
+        policy = {key: {**value, **overrides.get(key, {})} if isinstance(value, dict) else overrides.get(key, value) for key, value in DEFAULT_MV_POLICY.items()}
+        self.settle = policy.get('settle', {})
+        self.dwell = policy.get('dwell', {})
+        self.priority = policy.get('priority', {})
+        self.preempt = set(policy.get('preempt', []))
+        self.clock = clock
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forgets the shown action, e.g. when the screen showed something else meanwhile.
+
+        :return: None
+        """
+        self.shown = None
+        self.shown_at = None
+        self.pending = None
+        self.pending_since = None
+        self.offered = 0 # Raw action changes
+        self.sent = 0 # Settled actions passed on
+
+    def offer(self, action: str) -> None:
+        """
+        Takes a raw action from the Multiviewer thread.
+
+        :param action: Action name (e.g. 'green', 'sc').
+        :return: None
+        """
+        self.offered += 1
+        if action == self.shown:
+            self.pending = None
+        elif action != self.pending:
+            self.pending = action
+            self.pending_since = self.clock()
+
+    def poll(self) -> Optional[str]:
+        """
+        Returns the action to show now.
+
+        :return: Action name, or None if nothing is to be shown (yet).
+        """
+        if self.pending is None:
+            return None
+        now = self.clock()
+        action = self.pending
+        if action not in self.preempt:
+            if now - self.pending_since < self.settle.get(action, 0):
+                return None
+            escalates = self.shown is None or self.priority.get(action, 0) > self.priority.get(self.shown, 0)
+            if not escalates and now - self.shown_at < self.dwell.get(self.shown, 0):
+                return None
+        self.shown = action
+        self.shown_at = now
+        self.pending = None
+        self.sent += 1
+        return action
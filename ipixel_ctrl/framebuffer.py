@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+# Import modules
+import math
+from typing import Optional
+import numpy as np
+from PIL import Image
+from . import image
+from .commands import common, set_pixel, write_data_png
+
+# Byte cost model of a transfer
+ATT_PAYLOAD_SIZE = 244 # Bytes per BLE packet with the usual negotiated MTU (247)
+ATT_OVERHEAD = 3 # Header bytes per BLE packet
+BATCH_SIZE = 240 # set_pixel commands joined into one write (24 commands), not confirmed on hardware yet
+MIN_PNG_SIZE = 57 # Signature, IHDR, an empty IDAT and IEND
+
+def transfer_cost(writes: list[bytes]) -> int:
+    """
+    Estimates the bytes on air for a list of writes, including the BLE packet headers.
+
+    :param writes: Writes as sent to the device.
+    :return: Estimated cost in bytes.
+    """
+    return sum(len(w) + math.ceil(len(w) / ATT_PAYLOAD_SIZE) * ATT_OVERHEAD for w in writes)
+
+def pack_batches(payloads: list[bytes], batch_size: int = BATCH_SIZE) -> list[bytes]:
+    """
+    Joins consecutive payloads into writes of at most batch_size bytes.
+
+    The device should frame commands by their LEN field, like the large
+    data uploads that arrive in several packets, so one write may carry
+    several. This is not confirmed on hardware yet, see DiyFramebuffer.
+
+    :param payloads: Complete payloads (LEN, CMD, DAT).
+    :param batch_size: Maximum size of one write.
+    :return: The writes.
+    """
+    writes = []
+    for payload in payloads:
+        if writes and len(writes[-1]) + len(payload) <= batch_size:
+            writes[-1] += payload
+        else:
+            writes.append(payload)
+    return writes
+
+def encode_frame(frame: np.ndarray) -> bytes:
+    """
+    Encodes an RGB frame as a lossless PNG, paletted when it has at most 256 colors.
+
+    :param frame: Frame as an (H, W, 3) uint8 array.
+    :return: PNG data as bytes.
+    """
+    packed = (frame[..., 0].astype(np.uint32) << 16) | (frame[..., 1].astype(np.uint32) << 8) | frame[..., 2]
+    unique, inverse = np.unique(packed, return_inverse = True)
+    if len(unique) > image.MAX_PALETTE_COLORS:
+        return image.encode_rgba_png(Image.fromarray(np.ascontiguousarray(frame), "RGB"))
+    palette = np.stack(((unique >> 16) & 0xFF, (unique >> 8) & 0xFF, unique & 0xFF), axis = 1).astype(np.uint8)
+    return image.encode_png_from_indices(inverse.reshape(frame.shape[:2]).astype(np.uint8), palette, None)
+
+class DiyFramebuffer:
+    r"""Host copy of what the DIY buffer (0x65) of one device shows.
+
+    update() compares a new frame with the last sent one. Changed frames
+    are sent as a PNG to the DIY buffer, unchanged ones cost nothing.
+
+    With pixels, update() picks the cheaper way to get a frame on screen:
+    the changed pixels as set_pixel commands packed into batches, or the
+    whole frame as a PNG. set_pixel has no response, so every command is
+    sent set_pixel.REPEAT times, and both are priced with transfer_cost.
+    A changed pixel thus costs 30 bytes: a 5-pixel change is one write of
+    150 bytes (153 on air). That beats the PNG of a busy or wide frame
+    (e.g. about 320 bytes for a line of text on 96x32), but not of a
+    simple one (about 130 bytes for a filled square on 32x32). Batching
+    is not confirmed on hardware, so this path is off by default.
+    Until a frame was sent (or after invalidate()) the device content is
+    unknown and the full frame is sent.
+
+    :param width: Panel width.
+    :param height: Panel height.
+    :param pixels: If True, send small changes as set_pixel commands.
+    """
+    def __init__(self, width: int, height: int, pixels: bool = False):
+        self.width = width
+        self.height = height
+        self.pixels = pixels
+        self.frame: Optional[np.ndarray] = None
+        self.last_report: Optional[dict] = None
+
+    def invalidate(self) -> None:
+        """
+        Forgets the device content, e.g. after DIY mode was left.
+
+        :return: None
+        """
+        self.frame = None
+
+    def to_rgb(self, frame) -> np.ndarray:
+        """
+        Converts a frame to the (H, W, 3) RGB the device shows, transparent pixels become black.
+
+        :param frame: PIL image, (H, W, 3) or (H, W, 4) uint8 array of the panel size.
+        :return: Frame as an (H, W, 3) uint8 array.
+        """
+        if isinstance(frame, Image.Image):
+            frame = np.asarray(frame.convert("RGBA"))
+        if frame.shape[:2] != (self.height, self.width):
+            raise ValueError(f"The frame must be {self.width}x{self.height}")
+        if frame.shape[2] == 4:
+            return np.where(frame[..., 3:] >= image.ALPHA_THRESHOLD, frame[..., :3], 0).astype(np.uint8)
+        # A copy, the caller may reuse its array for the next frame
+        return np.array(frame[..., :3], np.uint8)
+
+    def seed(self, frame) -> None:
+        """
+        Records a frame that was put on screen by other means (e.g. an upload to the DIY buffer).
+
+        :param frame: The shown frame (see to_rgb).
+        :return: None
+        """
+        self.frame = self.to_rgb(frame)
+
+    def diff(self, frame: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the pixels that differ from the last sent frame, all of them when it is unknown.
+
+        :param frame: Frame as an (H, W, 3) uint8 array.
+        :return: Row and column indices of the changed pixels.
+        """
+        if self.frame is None:
+            return np.nonzero(np.ones(frame.shape[:2], bool))
+        return np.nonzero((frame != self.frame).any(axis = 2))
+
+    def update(self, frame) -> list[bytes]:
+        """
+        Returns the writes that change the DIY buffer to a frame, and takes the frame as sent.
+
+        The DIY mode must already be on.
+
+        :param frame: The new frame (see to_rgb).
+        :return: Writes (set_pixel batches or one PNG payload), empty if nothing changed.
+        """
+        frame = self.to_rgb(frame)
+        ys, xs = self.diff(frame)
+        writes = []
+        mode = 'none'
+        if self.frame is None or (len(ys) > 0 and not self.pixels):
+            writes = [write_data_png.build(encode_frame(frame), common.DIY_BUFFER)]
+            mode = 'png'
+        elif len(ys) > 0:
+            pixels = [set_pixel.build(int(x), int(y), int(r) << 16 | int(g) << 8 | int(b)) for y, x, (r, g, b) in zip(ys, xs, frame[ys, xs]) for _ in range(set_pixel.REPEAT)]
+            writes = pack_batches(pixels)
+            mode = 'pixels'
+            # Skip encoding when the pixels are cheaper than any PNG
+            if transfer_cost(writes) > image.PAYLOAD_HEADER_SIZE + MIN_PNG_SIZE:
+                png = [write_data_png.build(encode_frame(frame), common.DIY_BUFFER)]
+                if transfer_cost(png) < transfer_cost(writes):
+                    writes = png
+                    mode = 'png'
+        self.last_report = {'mode': mode, 'pixels': int(len(ys)), 'bytes': sum(len(w) for w in writes), 'cost': transfer_cost(writes)}
+        self.frame = frame
+        return writes
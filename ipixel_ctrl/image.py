@@ -1,52 +1,974 @@
 #!/usr/bin/env python3
 
 # Import modules
+import functools
+import hashlib
 import io
-from PIL import Image, ImageSequence
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, ImageSequence
 
-def resize_image(img: Image.Image, width: int, height: int) -> Image.Image:
+# Quantization settings
+MAX_PALETTE_COLORS = 256
+PALETTE_SAMPLE_SIZE = 64
+PALETTE_CACHE_SIZE = 32
+ALPHA_THRESHOLD = 0x80
+
+# Budget search settings
+BUDGET_COLOR_STEPS = (256, 128, 64, 32, 16, 8, 4, 2)
+BUDGET_MIN_COLORS = 16
+BUDGET_DITHER_COLORS = 32
+BUDGET_FRAME_STEPS = (1, 2, 3, 4)
+PAYLOAD_HEADER_SIZE = 15
+
+# Resampling modes
+RESAMPLE_AUTO = 'auto'
+RESAMPLE_LANCZOS = 'lanczos'
+RESAMPLE_BOX = 'box'
+RESAMPLE_NEAREST = 'nearest'
+RESAMPLE_MODES = (RESAMPLE_AUTO, RESAMPLE_LANCZOS, RESAMPLE_BOX, RESAMPLE_NEAREST)
+PIXEL_ART_MAX_COLORS = 16
+PIL_FILTERS = {
+    RESAMPLE_LANCZOS: Image.Resampling.LANCZOS,
+    RESAMPLE_BOX: Image.Resampling.BOX,
+    RESAMPLE_NEAREST: Image.Resampling.NEAREST,
+}
+
+# Placeholder settings
+PLACEHOLDER_OFF = 'off'
+PLACEHOLDER_COLOR = 'color'
+PLACEHOLDER_PREVIEW = 'preview'
+PLACEHOLDER_MODES = (PLACEHOLDER_OFF, PLACEHOLDER_COLOR, PLACEHOLDER_PREVIEW)
+PLACEHOLDER_THRESHOLD = 1024
+PLACEHOLDER_PREVIEW_COLORS = 4
+
+# Hold on first frame (longest delay a GIF can store, 65535 centiseconds)
+HOLD_FRAME_DURATION = 655350
+HOLD_SEAM_DURATION = 20 # Shortest delay most decoders honour, for the copy of the first frame between passes
+
+# Text glyphs (set_text), the device draws 10x16 characters
+GLYPH_WIDTH = 10
+GLYPH_HEIGHT = 16
+DEFAULT_FONT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "font", "Roboto-Black.ttf")
+GLYPH_FIT_SAMPLE = "Hgjy|" # Tallest and deepest common characters
+GLYPH_ATLAS_CHARS = "".join(chr(c) for c in range(0x20, 0x7F)) # Drawn up front, others on first use
+GLYPH_ATLAS_CACHE_SIZE = 8
+GLYPH_SPACING = 1
+
+# Marquee GIFs
+MARQUEE_STEP = 2
+MARQUEE_DURATION = 80
+
+# Global palettes keyed by (source hash and geometry, colors), shared by the GUI threads
+_palette_cache: "OrderedDict[tuple[str, int], np.ndarray]" = OrderedDict()
+_palette_lock = threading.Lock()
+
+# Glyph atlases keyed by (font, font size, height), the lock also guards adding glyphs to an atlas
+_atlas_cache: "OrderedDict[tuple[str, int, int], dict]" = OrderedDict()
+_atlas_lock = threading.Lock()
+
+def resize_image(img: Image.Image, width: int, height: int, resample: str = RESAMPLE_LANCZOS) -> Image.Image:
     """
     Resizes an image to the specified width and height.
 
     :param img: The source PIL Image object.
     :param width: The target width.
     :param height: The target height.
+    :param resample: One of RESAMPLE_MODES.
     :return: The resized PIL Image object.
     """
     # If dimensions are invalid, return original image
     if width <= 0 or height <= 0:
         return img
-    return img.resize((width, height), Image.Resampling.LANCZOS)
+    if resample == RESAMPLE_AUTO:
+        return Image.fromarray(resize_stack(as_frame_stack([img]), width, height, resample)[0], "RGBA")
+    if resample not in PIL_FILTERS:
+        raise ValueError(f"Unknown resample mode: {resample}")
+    return img.resize((width, height), PIL_FILTERS[resample])
 
-def clip_and_anchor_for_image(img: Image.Image, max_width: int, max_height: int, anchor: int) -> Image.Image:
-    if anchor == 0x00:
-        return img
-
-    # Clipp
-    clipped = img.crop((0, 0, min(img.size[0], max_width), min(img.size[1], max_height)))
+def anchor_offsets(width: int, height: int, max_width: int, max_height: int, anchor: int) -> tuple[int, int]:
+    """
+    Returns where a clipped image of the given size is placed on the canvas.
 
+    :param width: Clipped image width.
+    :param height: Clipped image height.
+    :param max_width: Canvas width.
+    :param max_height: Canvas height.
+    :param anchor: Bitwise flags controlling image alignment.
+    :return: Tuple of (offset_x, offset_y).
+    """
     # Adjust Left-Right
     if anchor & 0x01 and not anchor & 0x02:
         offset_x = 0
     elif anchor & 0x02 and not anchor & 0x01:
-        offset_x = max_width - clipped.width
+        offset_x = max_width - width
     else:
-        offset_x = max((max_width - clipped.width) // 2, 0)
+        offset_x = max((max_width - width) // 2, 0)
 
     # Adjust Top-Bottom
     if anchor & 0x10 and not anchor & 0x20:
         offset_y = 0
     elif anchor & 0x02 and not anchor & 0x20:
-        offset_y = max_height - clipped.height
+        offset_y = max_height - height
     else:
-        offset_y = max((max_height - clipped.height) // 2, 0)
+        offset_y = max((max_height - height) // 2, 0)
+    return offset_x, offset_y
+
+def clip_and_anchor_for_image(img: Image.Image, max_width: int, max_height: int, anchor: int) -> Image.Image:
+    if anchor == 0x00:
+        return img
+
+    # Clipp
+    clipped = img.crop((0, 0, min(img.size[0], max_width), min(img.size[1], max_height)))
+    offset_x, offset_y = anchor_offsets(clipped.width, clipped.height, max_width, max_height, anchor)
 
     # Make result
     result = Image.new("RGBA", (max_width, max_height), (0, 0, 0, 0))
     result.paste(clipped.convert("RGBA"), (offset_x, offset_y))
     return result
 
-def read_image_file_for_device(path: str, max_width: int, max_height: int, anchor: int, auto_resize: bool = False) -> bytes:
+def detect_pixel_grid(stack: np.ndarray) -> tuple[int, int]:
+    """
+    Detects the block size of upscaled pixel art.
+
+    The block size is the greatest common divisor of the runs of identical
+    columns (and rows) over all frames, 1 for regular images. A few sampled
+    lines are checked first so regular images are rejected cheaply.
+
+    :param stack: RGBA frames as an (N, H, W, 4) uint8 array.
+    :return: Tuple of (block_width, block_height).
+    """
+    def run_gcd(changes: np.ndarray) -> int:
+        edges = np.flatnonzero(changes) + 1
+        runs = np.diff(np.concatenate(([0], edges, [len(changes) + 1])))
+        return int(np.gcd.reduce(runs))
+
+    # One uint32 per pixel, so each comparison covers all four channels
+    pixels = np.ascontiguousarray(stack).view(np.uint32)[..., 0]
+    height, width = pixels.shape[1:]
+    rows = pixels[:, ::max(height // 8, 1)]
+    columns = pixels[:, :, ::max(width // 8, 1)]
+    block_width = run_gcd((rows[:, :, 1:] != rows[:, :, :-1]).any(axis = (0, 1)))
+    block_height = run_gcd((columns[:, 1:] != columns[:, :-1]).any(axis = (0, 2)))
+    # The full check can only lower a block size, never raise it
+    if block_width > 1:
+        block_width = run_gcd((pixels[:, :, 1:] != pixels[:, :, :-1]).any(axis = (0, 1)))
+    if block_height > 1:
+        block_height = run_gcd((pixels[:, 1:] != pixels[:, :-1]).any(axis = (0, 2)))
+    return block_width, block_height
+
+def count_colors(stack: np.ndarray, limit: int = PIXEL_ART_MAX_COLORS) -> int:
+    """
+    Counts the distinct RGBA colors of a (sampled) frame stack.
+
+    :param stack: RGBA frames as an (N, H, W, 4) uint8 array.
+    :param limit: Stop counting exactly once more than this many colors are found.
+    :return: Number of distinct colors, at most limit + 1.
+    """
+    step = -(-max(stack.shape[1], stack.shape[2]) // PALETTE_SAMPLE_SIZE)
+    packed = np.ascontiguousarray(stack[:, ::step, ::step]).view(np.uint32).reshape(-1)
+    return min(len(np.unique(packed)), limit + 1)
+
+def choose_resample(stack: np.ndarray, width: int, height: int, pixel_art: Optional[bool] = None) -> str:
+    """
+    Picks the resampling mode used by RESAMPLE_AUTO.
+
+    Pixel art and integer upscales use nearest (array repeat), integer
+    downscales of other images use box and everything else LANCZOS.
+
+    :param stack: RGBA frames as an (N, H, W, 4) uint8 array.
+    :param width: The target width.
+    :param height: The target height.
+    :param pixel_art: Whether the source is pixel art, detected from its colors when None.
+    :return: One of RESAMPLE_LANCZOS, RESAMPLE_BOX or RESAMPLE_NEAREST.
+    """
+    src_height, src_width = stack.shape[1:3]
+    if pixel_art is None:
+        pixel_art = count_colors(stack) <= PIXEL_ART_MAX_COLORS
+    if pixel_art:
+        return RESAMPLE_NEAREST
+    if width % src_width == 0 and height % src_height == 0:
+        return RESAMPLE_NEAREST
+    if src_width % width == 0 and src_height % height == 0:
+        return RESAMPLE_BOX
+    return RESAMPLE_LANCZOS
+
+def _nearest_stack(stack: np.ndarray, width: int, height: int) -> np.ndarray:
+    src_height, src_width = stack.shape[1:3]
+    if width % src_width == 0 and height % src_height == 0:
+        return stack.repeat(height // src_height, axis = 1).repeat(width // src_width, axis = 2)
+    # Sample at pixel centers like Pillow's NEAREST filter
+    ys = ((np.arange(height) + 0.5) * src_height / height).astype(np.intp)
+    xs = ((np.arange(width) + 0.5) * src_width / width).astype(np.intp)
+    return stack[:, ys[:, None], xs[None, :]]
+
+def resize_stack(stack: np.ndarray, width: int, height: int, resample: str = RESAMPLE_LANCZOS) -> np.ndarray:
+    """
+    Resizes every frame of a stack.
+
+    LANCZOS and box use Pillow's resize frame by frame, which is exact and
+    faster than batching the filters in NumPy (see bench_image.py). Nearest
+    is a single index lookup over all frames. With RESAMPLE_AUTO, upscaled
+    pixel art is first reduced to its own grid and the mode is picked by
+    choose_resample.
+
+    :param stack: RGBA frames as an (N, H, W, 4) uint8 array.
+    :param width: The target width.
+    :param height: The target height.
+    :param resample: One of RESAMPLE_MODES.
+    :return: The resized (N, height, width, 4) uint8 array.
+    """
+    # If dimensions are invalid, return original frames
+    if width <= 0 or height <= 0:
+        return stack
+    if resample not in RESAMPLE_MODES:
+        raise ValueError(f"Unknown resample mode: {resample}")
+    if resample == RESAMPLE_AUTO:
+        block_width, block_height = detect_pixel_grid(stack)
+        # Dropping the repeated pixels of upscaled pixel art is lossless
+        stack = stack[:, ::block_height, ::block_width]
+        resample = choose_resample(stack, width, height, True if block_width > 1 or block_height > 1 else None)
+    if stack.shape[1:3] == (height, width):
+        return stack
+    if resample == RESAMPLE_NEAREST:
+        return _nearest_stack(stack, width, height)
+    result = np.empty((stack.shape[0], height, width, 4), np.uint8)
+    for i, frame in enumerate(stack):
+        result[i] = np.asarray(Image.fromarray(frame, "RGBA").resize((width, height), PIL_FILTERS[resample]))
+    return result
+
+def clip_and_anchor_stack(stack: np.ndarray, max_width: int, max_height: int, anchor: int) -> np.ndarray:
+    """
+    Clips a frame stack from the top-left and places it on a transparent canvas.
+
+    Behaves like clip_and_anchor_for_image, for all frames in one slice copy.
+
+    :param stack: RGBA frames as an (N, H, W, 4) uint8 array.
+    :param max_width: Canvas width.
+    :param max_height: Canvas height.
+    :param anchor: Bitwise flags controlling image alignment.
+    :return: The anchored (N, max_height, max_width, 4) uint8 array.
+    """
+    if anchor == 0x00:
+        return stack
+
+    clip_height = min(stack.shape[1], max_height)
+    clip_width = min(stack.shape[2], max_width)
+    offset_x, offset_y = anchor_offsets(clip_width, clip_height, max_width, max_height, anchor)
+    if (clip_width, clip_height, offset_x, offset_y) == (max_width, max_height, 0, 0):
+        return stack[:, :max_height, :max_width]
+
+    result = np.zeros((stack.shape[0], max_height, max_width, 4), np.uint8)
+    result[:, offset_y:offset_y + clip_height, offset_x:offset_x + clip_width] = stack[:, :clip_height, :clip_width]
+    return result
+
+def duplicate_stack_horizontally(stack: np.ndarray, max_width: int) -> np.ndarray:
+    """
+    Repeats frames side by side until the canvas width is filled.
+
+    :param stack: RGBA frames as an (N, H, W, 4) uint8 array.
+    :param max_width: Canvas width.
+    :return: The (N, H, max_width, 4) uint8 array.
+    """
+    copies = -(-max_width // stack.shape[2])
+    return np.tile(stack, (1, 1, copies, 1))[:, :, :max_width]
+
+def render_stack_for_device(stack: np.ndarray, max_width: int, max_height: int, anchor: int, auto_resize: bool = False, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> np.ndarray:
+    """
+    Applies resize, clip/anchor and horizontal duplication to a frame stack.
+
+    With duplicate_horizontally, frames are rendered for half the device
+    width and shown twice side by side.
+
+    :param stack: RGBA frames as an (N, H, W, 4) uint8 array.
+    :param max_width: Output width for the device.
+    :param max_height: Output height for the device.
+    :param anchor: Bitwise flags controlling image alignment.
+    :param auto_resize: If True, resize the frames to fit the device.
+    :param duplicate_horizontally: If True, repeat the content horizontally.
+    :param resample: Resampling mode used with auto_resize (see RESAMPLE_MODES).
+    :return: Device-ready (N, max_height, max_width, 4) uint8 array.
+    """
+    target_width = max(max_width // 2, 1) if duplicate_horizontally else max_width
+    if auto_resize:
+        stack = resize_stack(stack, target_width, max_height, resample)
+    stack = clip_and_anchor_stack(stack, target_width, max_height, anchor)
+    if duplicate_horizontally:
+        stack = duplicate_stack_horizontally(stack, max_width)
+    return stack
+
+def render_image_for_device(img: Image.Image, max_width: int, max_height: int, anchor: int, auto_resize: bool = False, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> Image.Image:
+    """
+    Applies resize, clip/anchor and horizontal duplication to one RGBA image, like render_stack_for_device.
+
+    :param img: RGBA image.
+    :param max_width: Output width for the device.
+    :param max_height: Output height for the device.
+    :param anchor: Bitwise flags controlling image alignment.
+    :param auto_resize: If True, resize the image to fit the device.
+    :param duplicate_horizontally: If True, repeat the content horizontally.
+    :param resample: Resampling mode used with auto_resize (see RESAMPLE_MODES).
+    :return: Device-ready RGBA image.
+    """
+    target_width = max(max_width // 2, 1) if duplicate_horizontally else max_width
+    if auto_resize:
+        img = resize_image(img, target_width, max_height, resample)
+    img = clip_and_anchor_for_image(img, target_width, max_height, anchor)
+    if duplicate_horizontally:
+        img = Image.fromarray(duplicate_stack_horizontally(np.asarray(img)[np.newaxis], max_width)[0], "RGBA")
+    return img
+
+def load_frame_stack(data: bytes) -> tuple[np.ndarray, object, int]:
+    """
+    Decodes every frame of an image into one (N, H, W, 4) RGBA array.
+
+    :param data: Source bytes.
+    :return: Tuple of the frame stack, frame duration (msec) and loop count.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        count = getattr(img, "n_frames", 1)
+        if count < 1:
+            raise ValueError("no frame GIF")
+        stack = np.empty((count, img.height, img.width, 4), np.uint8)
+        for i, frame in enumerate(ImageSequence.Iterator(img)):
+            stack[i] = np.asarray(frame.convert("RGBA"))
+        return stack, img.info.get("duration", 100), img.info.get("loop", 0)
+
+def render_key(key: str, anchor: int, auto_resize: bool, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> str:
+    """
+    Extends a source hash with the settings that change the rendered frames.
+
+    :param key: Source hash (see source_hash).
+    :param anchor: Bitwise flags controlling image alignment.
+    :param auto_resize: Whether the frames were resized to the device.
+    :param duplicate_horizontally: Whether the frames were repeated horizontally.
+    :param resample: Resampling mode, only relevant with auto_resize.
+    :return: Cache key string.
+    """
+    key = f"{key}:{anchor:02x}:{int(bool(auto_resize))}"
+    if auto_resize:
+        key += f":{resample}"
+    if duplicate_horizontally:
+        key += ":dup"
+    return key
+
+def read_source(path) -> bytes:
+    """
+    Reads the raw bytes of an image source.
+
+    :param path: A file path or a binary file-like object.
+    :return: The source bytes. File-like objects are rewound afterwards.
+    """
+    if isinstance(path, (str, os.PathLike)):
+        with open(path, 'rb') as f:
+            return f.read()
+    pos = path.tell()
+    data = path.read()
+    path.seek(pos)
+    return data
+
+def source_hash(data: bytes) -> str:
+    """
+    Returns a stable hash of source bytes, used as a cache key.
+
+    :param data: The source bytes.
+    :return: Hex digest string.
+    """
+    return hashlib.sha1(data).hexdigest()
+
+def as_frame_stack(frames) -> np.ndarray:
+    """
+    Returns frames as an (N, H, W, 4) RGBA array.
+
+    :param frames: A frame stack array, or a list of PIL frames of the same size.
+    :return: RGBA frames as an (N, H, W, 4) uint8 array.
+    """
+    if isinstance(frames, np.ndarray):
+        return frames
+    return np.stack([np.asarray(frame.convert("RGBA")) for frame in frames])
+
+def build_global_palette(frames, colors: int = MAX_PALETTE_COLORS) -> np.ndarray:
+    r"""Build one palette shared by every frame of an animation.
+
+    All opaque pixels of all frames are pooled, so the palette reflects the
+    whole animation instead of each frame on its own. Frames larger than
+    PALETTE_SAMPLE_SIZE are sampled down first.
+
+    :param frames: Device-ready frames, as a frame stack or a list of PIL frames.
+    :param colors: Maximum number of palette entries (2 - 256).
+    :return: Palette as an (K, 3) uint8 array.
+    """
+    colors = max(2, min(colors, MAX_PALETTE_COLORS))
+    stack = as_frame_stack(frames)
+    step = -(-max(stack.shape[1], stack.shape[2]) // PALETTE_SAMPLE_SIZE)
+    pixels = stack[:, ::step, ::step].reshape(-1, 4)
+    pixels = pixels[pixels[:, 3] >= ALPHA_THRESHOLD, :3]
+    if len(pixels) == 0:
+        return np.zeros((1, 3), np.uint8)
+
+    pool = Image.fromarray(pixels.reshape(1, -1, 3), "RGB")
+    quantized = pool.quantize(colors = colors, method = Image.Quantize.FASTOCTREE, dither = Image.Dither.NONE)
+    used = np.unique(np.asarray(quantized))
+    palette = np.array(quantized.getpalette()[:3 * MAX_PALETTE_COLORS], np.uint8).reshape(-1, 3)
+    return np.unique(palette[used], axis = 0)
+
+def get_global_palette(key: str, frames, colors: int = MAX_PALETTE_COLORS) -> np.ndarray:
+    """
+    Returns the global palette for a source, building it on a cache miss.
+
+    Devices sharing the same geometry and settings share one palette, so
+    the key should identify both the source and the rendered frame size.
+    Thread-safe, the palette is built outside the lock.
+
+    :param key: Cache key, usually source_hash plus the frame geometry.
+    :param frames: Device-ready frames, used only when the palette is not cached.
+    :param colors: Maximum number of palette entries.
+    :return: Palette as an (K, 3) uint8 array.
+    """
+    cache_key = (key, colors)
+    with _palette_lock:
+        palette = _palette_cache.get(cache_key)
+        if palette is not None:
+            _palette_cache.move_to_end(cache_key)
+            return palette
+    palette = build_global_palette(frames, colors)
+    with _palette_lock:
+        _palette_cache[cache_key] = palette
+        while len(_palette_cache) > PALETTE_CACHE_SIZE:
+            _palette_cache.popitem(last = False)
+    return palette
+
+def map_to_palette(stack: np.ndarray, palette: np.ndarray) -> tuple[np.ndarray, Optional[int]]:
+    r"""Map RGBA frames to palette indices with a vectorized nearest-color lookup.
+
+    Distances are only computed once per distinct color in the stack, so the
+    cost scales with the number of colors rather than the number of pixels.
+    Pixels with alpha below ALPHA_THRESHOLD map to a transparent index that
+    is appended after the palette entries.
+
+    :param stack: RGBA frames as an (N, H, W, 4) uint8 array.
+    :param palette: Palette as an (K, 3) uint8 array.
+    :return: Tuple of (N, H, W) uint8 index array and transparent index (or None).
+    """
+    rgb = stack[..., :3].reshape(-1, 3).astype(np.uint32)
+    packed = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+    unique, inverse = np.unique(packed, return_inverse = True)
+    unique_rgb = np.stack(((unique >> 16) & 0xFF, (unique >> 8) & 0xFF, unique & 0xFF), axis = 1).astype(np.int32)
+
+    pal = palette.astype(np.int32)
+    lookup = np.empty(len(unique), np.uint8)
+    for start in range(0, len(unique), 4096):
+        chunk = unique_rgb[start:start + 4096]
+        distance = ((chunk[:, None, :] - pal[None, :, :]) ** 2).sum(axis = 2)
+        lookup[start:start + 4096] = distance.argmin(axis = 1)
+    indices = lookup[inverse.reshape(-1)].reshape(stack.shape[:-1])
+
+    transparent = stack[..., 3] < ALPHA_THRESHOLD
+    if not transparent.any():
+        return indices, None
+    indices[transparent] = len(palette)
+    return indices, len(palette)
+
+def encode_gif_from_indices(indices: np.ndarray, palette: np.ndarray, transparency: Optional[int], duration, loop: Optional[int], disposal: int = 2) -> bytes:
+    """
+    Encodes palette indices as a GIF with a single global color table.
+
+    :param indices: Frames as an (N, H, W) uint8 index array.
+    :param palette: Palette as an (K, 3) uint8 array.
+    :param transparency: Transparent index, or None.
+    :param duration: Frame duration in msec, or a list per frame.
+    :param loop: GIF loop count, or None to play once.
+    :param disposal: GIF disposal method, 1 lets frames store only what changed (opaque frames only).
+    :return: GIF data as bytes.
+    """
+    entries = [tuple(int(c) for c in color) for color in palette]
+    if transparency is not None:
+        # The transparent entry must not duplicate a real color
+        used = set(entries)
+        filler = next(((v, v, v) for v in range(256) if (v, v, v) not in used), (0, 0, 0))
+        entries.append(filler)
+    flat = bytes(c for color in entries for c in color)
+
+    frames = []
+    for frame in indices:
+        img = Image.fromarray(np.ascontiguousarray(frame), "P")
+        img.putpalette(flat)
+        frames.append(img)
+
+    options = {}
+    if transparency is not None:
+        options['transparency'] = transparency
+    if loop is not None:
+        options['loop'] = loop
+    buf = io.BytesIO()
+    frames[0].save(
+        buf,
+        format = "GIF",
+        save_all = True,
+        append_images = frames[1:],
+        duration = duration,
+        disposal = disposal,
+        palette = flat,
+        optimize = False,
+        **options
+    )
+    return buf.getvalue()
+
+def quantize_frames(key: str, frames, colors: int = MAX_PALETTE_COLORS, dither: bool = False) -> tuple[np.ndarray, np.ndarray, Optional[int]]:
+    """
+    Quantizes device frames to one cached global palette.
+
+    :param key: Cache key (see render_key). The frame geometry is added to it.
+    :param frames: Device-ready frames, as a frame stack or a list of PIL frames of the same size.
+    :param colors: Maximum number of palette entries.
+    :param dither: If True, apply Floyd-Steinberg dithering against the global palette.
+    :return: Tuple of (N, H, W) index array, palette and transparent index (or None).
+    """
+    stack = as_frame_stack(frames)
+    if (stack[..., 3] < ALPHA_THRESHOLD).any():
+        # Keep one index free for transparency
+        colors = min(colors, MAX_PALETTE_COLORS - 1)
+    palette = get_global_palette(f"{key}:{stack.shape[2]}x{stack.shape[1]}", stack, colors)
+    indices, transparency = map_to_palette(stack, palette)
+    if not dither:
+        return indices, palette, transparency
+
+    # Pad with the first entry so Pillow never picks an index past the palette
+    padded = np.concatenate((palette, np.repeat(palette[:1], MAX_PALETTE_COLORS - len(palette), axis = 0)))
+    palette_img = Image.new("P", (1, 1))
+    palette_img.putpalette(padded.tobytes())
+    for i, frame in enumerate(stack):
+        dithered = np.asarray(Image.fromarray(frame[..., :3], "RGB").quantize(palette = palette_img, dither = Image.Dither.FLOYDSTEINBERG))
+        dithered = np.where(dithered >= len(palette), 0, dithered)
+        opaque = frame[..., 3] >= ALPHA_THRESHOLD
+        indices[i][opaque] = dithered[opaque]
+    return indices, palette, transparency
+
+def quantize_frames_to_gif(key: str, frames, duration, loop: Optional[int], colors: int = MAX_PALETTE_COLORS, dither: bool = False) -> bytes:
+    """
+    Encodes device frames as a GIF using one cached global palette.
+
+    :param key: Cache key (see render_key). The frame geometry is added to it.
+    :param frames: Device-ready frames, as a frame stack or a list of PIL frames of the same size.
+    :param duration: Frame duration in msec, or a list per frame.
+    :param loop: GIF loop count, or None to play once.
+    :param colors: Maximum number of palette entries.
+    :param dither: If True, apply Floyd-Steinberg dithering against the global palette.
+    :return: GIF data as bytes.
+    """
+    indices, palette, transparency = quantize_frames(key, frames, colors, dither)
+    return encode_gif_from_indices(indices, palette, transparency, duration, loop)
+
+def encode_png_from_indices(indices: np.ndarray, palette: np.ndarray, transparency: Optional[int]) -> bytes:
+    """
+    Encodes a single frame of palette indices as a paletted PNG.
+
+    :param indices: Frame as an (H, W) uint8 index array.
+    :param palette: Palette as an (K, 3) uint8 array.
+    :param transparency: Transparent index, or None.
+    :return: PNG data as bytes.
+    """
+    img = Image.fromarray(np.ascontiguousarray(indices), "P")
+    img.putpalette(np.concatenate((palette, np.zeros((1, 3), np.uint8))).tobytes())
+    options = {}
+    if transparency is not None:
+        options['transparency'] = transparency
+    buf = io.BytesIO()
+    img.save(buf, format = 'PNG', optimize = True, icc_profile = None, **options)
+    return buf.getvalue()
+
+def encode_rgba_png(img: Image.Image) -> bytes:
+    """
+    Encodes a device-ready frame as an RGBA PNG.
+
+    :param img: The PIL Image object.
+    :return: PNG data as bytes.
+    """
+    buf = io.BytesIO()
+    img.save(buf, format = 'PNG', optimize = False, compress_level = 6, icc_profile = None)
+    return buf.getvalue()
+
+@functools.lru_cache(maxsize = 8)
+def load_glyph_font(path: str, height: int) -> ImageFont.FreeTypeFont:
+    """
+    Loads a font at the largest size whose common characters fit a glyph.
+
+    :param path: TrueType font file.
+    :param height: Glyph height in pixels.
+    :return: The font.
+    """
+    for size in range(height * 2, 3, -1):
+        font = ImageFont.truetype(path, size)
+        _, top, _, bottom = font.getbbox(GLYPH_FIT_SAMPLE, anchor = 'ls')
+        if bottom - top <= height:
+            return font
+    raise ValueError(f"No size of {path} fits {height} pixels")
+
+@functools.lru_cache(maxsize = 8)
+def load_sized_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size)
+
+def _draw_glyphs(font: ImageFont.FreeTypeFont, chars: str, height: int) -> tuple[np.ndarray, list[int]]:
+    # One FreeType call per character, cropped to its ink (spaces to their advance)
+    _, top, _, bottom = font.getbbox(GLYPH_FIT_SAMPLE, anchor = 'ls')
+    baseline = (height - (bottom - top)) // 2 - top
+    glyphs = []
+    for char in chars:
+        left, _, right, _ = font.getbbox(char, anchor = 'ls')
+        if right <= left:
+            glyphs.append(np.zeros((height, max(int(round(font.getlength(char))), 1)), bool))
+            continue
+        canvas = Image.new('L', (right - left, height), 0)
+        ImageDraw.Draw(canvas).text((-left, baseline), char, fill = 0xFF, font = font, anchor = 'ls')
+        glyphs.append(np.asarray(canvas) >= ALPHA_THRESHOLD)
+    return np.concatenate(glyphs, axis = 1), [g.shape[1] for g in glyphs]
+
+def _add_to_atlas(atlas: dict, chars: str) -> None:
+    # Callers hold _atlas_lock. The strip is replaced, never changed in place.
+    chars = "".join(dict.fromkeys(c for c in chars if c not in atlas['slices']))
+    if not chars:
+        return
+    strip, widths = _draw_glyphs(atlas['font'], chars, atlas['strip'].shape[0])
+    x = atlas['strip'].shape[1]
+    for char, width in zip(chars, widths):
+        atlas['slices'][char] = (x, width)
+        x += width
+    atlas['strip'] = np.concatenate((atlas['strip'], strip), axis = 1)
+
+def get_glyph_atlas(height: int = GLYPH_HEIGHT, font_path: str = DEFAULT_FONT, size: Optional[int] = None) -> dict:
+    r"""Returns the glyph atlas of a font, building it on a cache miss.
+
+    The atlas is one wide monochrome strip holding every printable ASCII
+    character side by side, cropped to its ink, plus the column range of
+    each character. Strings are then composed from strip slices without
+    calling FreeType again. Other characters are added on first use,
+    which replaces the strip, so read the strip and its slices together
+    while holding _atlas_lock (see render_text_mask).
+
+    :param height: Height of the strip, usually the panel or glyph height.
+    :param font_path: TrueType font file.
+    :param size: Font size, or None for the largest size that fits the height.
+    :return: Dict with the font, the (height, W) boolean strip and the slices (x, width) per character.
+    """
+    font = load_glyph_font(font_path, height) if size is None else load_sized_font(font_path, size)
+    cache_key = (os.path.abspath(font_path), font.size, height)
+    with _atlas_lock:
+        atlas = _atlas_cache.get(cache_key)
+        if atlas is not None:
+            _atlas_cache.move_to_end(cache_key)
+            return atlas
+        atlas = {'font': font, 'strip': np.zeros((height, 0), bool), 'slices': {}}
+        _add_to_atlas(atlas, GLYPH_ATLAS_CHARS)
+        _atlas_cache[cache_key] = atlas
+        while len(_atlas_cache) > GLYPH_ATLAS_CACHE_SIZE:
+            _atlas_cache.popitem(last = False)
+        return atlas
+
+def render_text_mask(text: str, height: int = GLYPH_HEIGHT, font_path: str = DEFAULT_FONT, size: Optional[int] = None, spacing: int = GLYPH_SPACING) -> np.ndarray:
+    """
+    Composes a string from glyph atlas slices.
+
+    :param text: The string.
+    :param height: Text height in pixels.
+    :param font_path: TrueType font file.
+    :param size: Font size, or None for the largest size that fits the height.
+    :param spacing: Blank columns between characters.
+    :return: Boolean array (height, W), True for lit pixels.
+    """
+    atlas = get_glyph_atlas(height, font_path, size)
+    with _atlas_lock:
+        _add_to_atlas(atlas, text)
+        # Another thread may replace the strip afterwards, keep this one with its slices
+        strip = atlas['strip']
+        slices = [atlas['slices'][char] for char in text]
+    gap = np.zeros((height, spacing), bool)
+    parts = []
+    for x, width in slices:
+        parts.append(strip[:, x:x + width])
+        parts.append(gap)
+    if not parts:
+        return np.zeros((height, 0), bool)
+    return np.concatenate(parts[:-1], axis = 1)
+
+def render_glyph(char: str, width: int = GLYPH_WIDTH, height: int = GLYPH_HEIGHT, font_path: str = DEFAULT_FONT) -> np.ndarray:
+    """
+    Renders one character as a fixed-size monochrome glyph (set_text), centered on a shared baseline.
+
+    Characters wider than the glyph are squeezed horizontally.
+
+    :param char: The character.
+    :param width: Glyph width in pixels.
+    :param height: Glyph height in pixels.
+    :param font_path: TrueType font file.
+    :return: Boolean array (height, width), True for lit pixels.
+    """
+    mask = render_text_mask(char, height, font_path)
+    if mask.shape[1] > width:
+        squeezed = Image.fromarray(mask.astype(np.uint8) * 0xFF, 'L').resize((width, height), Image.Resampling.LANCZOS)
+        return np.asarray(squeezed) >= ALPHA_THRESHOLD
+    glyph = np.zeros((height, width), bool)
+    offset = (width - mask.shape[1]) // 2
+    glyph[:, offset:offset + mask.shape[1]] = mask
+    return glyph
+
+def render_text_stack(text: str, max_width: int, max_height: int, color: tuple[int, int, int], anchor: int = 0x33, font_path: str = DEFAULT_FONT, size: Optional[int] = None) -> np.ndarray:
+    """
+    Renders a label (lap counter, driver number...) as a device-ready frame.
+
+    :param text: The label.
+    :param max_width: Canvas width, longer labels are clipped.
+    :param max_height: Canvas height, also the text height unless a size is given.
+    :param color: Text color (R, G, B).
+    :param anchor: Bitwise flags controlling text alignment.
+    :param font_path: TrueType font file.
+    :param size: Font size, or None for the largest size that fits the height.
+    :return: RGBA frames as a (1, max_height, max_width, 4) uint8 array, transparent background.
+    """
+    mask = render_text_mask(text, max_height, font_path, size)
+    stack = np.zeros((1, mask.shape[0], mask.shape[1], 4), np.uint8)
+    stack[0][mask] = (*color, 0xFF)
+    if anchor == 0x00:
+        anchor = 0x33 # The canvas size is fixed
+    return clip_and_anchor_stack(stack, max_width, max_height, anchor)
+
+def make_marquee(text: str, max_width: int, max_height: int, color: tuple[int, int, int], background: tuple[int, int, int] = (0, 0, 0), step: int = MARQUEE_STEP, duration: int = MARQUEE_DURATION, font_path: str = DEFAULT_FONT, size: Optional[int] = None) -> bytes:
+    r"""Makes a looping GIF of text scrolling from right to left.
+
+    The text is rendered once into a strip padded with one blank canvas on
+    each side, and every frame is a window into that strip. Repeated frames
+    (the blank gap) are merged into one longer frame, frames only store
+    what changed, and the GIF holds just the two colors. The size still
+    grows with the text length; set_text is far cheaper where the device
+    font is acceptable.
+
+    :param text: Text to scroll.
+    :param max_width: Canvas width.
+    :param max_height: Canvas height, also the text height unless a size is given.
+    :param color: Text color (R, G, B).
+    :param background: Background color (R, G, B).
+    :param step: Columns scrolled per frame.
+    :param duration: Frame duration in msec.
+    :param font_path: TrueType font file.
+    :param size: Font size, or None for the largest size that fits the height.
+    :return: GIF data as bytes.
+    """
+    if step < 1:
+        raise ValueError("The step must be at least 1")
+    mask = render_text_mask(text, max_height, font_path, size)[:max_height]
+    strip = np.zeros((max_height, max_width + mask.shape[1] + max_width), np.uint8)
+    strip[:mask.shape[0], max_width:max_width + mask.shape[1]] = mask
+    windows = np.lib.stride_tricks.sliding_window_view(strip, max_width, axis = 1)
+    frames = windows[:, 0:max_width + mask.shape[1]:step].transpose(1, 0, 2)
+
+    keep = [0]
+    durations = [duration]
+    for i in range(1, len(frames)):
+        if np.array_equal(frames[i], frames[keep[-1]]):
+            durations[-1] += duration
+        else:
+            keep.append(i)
+            durations.append(duration)
+    palette = np.array([background, color], np.uint8)
+    # Opaque frames, so each one only stores the rows and columns that changed
+    return encode_gif_from_indices(frames[keep], palette, None, durations if len(durations) > 1 else durations[0], 0, disposal = 1)
+
+def dominant_color(frames) -> tuple[int, int, int]:
+    """
+    Returns the most common color of the opaque pixels.
+
+    Colors are binned at 4 bits per channel and the mean of the fullest
+    bin is returned, so gradients and noise still give a stable result.
+
+    :param frames: Frames as a frame stack or a list of PIL frames.
+    :return: (R, G, B) tuple, black if nothing is opaque.
+    """
+    stack = as_frame_stack(frames)
+    step = -(-max(stack.shape[1], stack.shape[2]) // PALETTE_SAMPLE_SIZE)
+    pixels = stack[:, ::step, ::step].reshape(-1, 4)
+    pixels = pixels[pixels[:, 3] >= ALPHA_THRESHOLD, :3]
+    if len(pixels) == 0:
+        return (0, 0, 0)
+    bins = ((pixels[:, 0] >> 4).astype(np.int32) << 8) | ((pixels[:, 1] >> 4).astype(np.int32) << 4) | (pixels[:, 2] >> 4)
+    fullest = np.bincount(bins).argmax()
+    color = pixels[bins == fullest].mean(axis = 0)
+    return tuple(int(round(c)) for c in color)
+
+def make_placeholder(key: str, frames, mode: str = PLACEHOLDER_COLOR) -> bytes:
+    """
+    Makes a tiny PNG shown while the full payload is uploading.
+
+    :param key: Cache key (see render_key).
+    :param frames: Device-ready frames, as a frame stack or a list of PIL frames.
+    :param mode: PLACEHOLDER_COLOR for a solid dominant color, PLACEHOLDER_PREVIEW for a low-color first frame.
+    :return: PNG data as bytes.
+    """
+    stack = as_frame_stack(frames)
+    if mode == PLACEHOLDER_COLOR:
+        indices = np.zeros(stack.shape[1:3], np.uint8)
+        return encode_png_from_indices(indices, np.array([dominant_color(stack)], np.uint8), None)
+    if mode == PLACEHOLDER_PREVIEW:
+        indices, palette, transparency = quantize_frames(key, stack[:1], PLACEHOLDER_PREVIEW_COLORS)
+        return encode_png_from_indices(indices[0], palette, transparency)
+    raise ValueError(f"Unknown placeholder mode: {mode}")
+
+def decimate_frames(frames: list, duration, step: int) -> tuple[list, object]:
+    """
+    Keeps every step-th frame and stretches durations to preserve timing.
+
+    :param frames: Frames to decimate.
+    :param duration: Frame duration in msec, or a list per frame.
+    :param step: Keep one frame out of this many.
+    :return: Tuple of decimated frames and their duration(s).
+    """
+    if step <= 1 or len(frames) <= 1:
+        return frames, duration
+    kept = frames[::step]
+    if isinstance(duration, (list, tuple)):
+        return kept, [sum(duration[i:i + step]) for i in range(0, len(frames), step)]
+    return kept, duration * step
+
+def hold_first_frame(frames, duration, hold_after: int) -> tuple[np.ndarray, object, Optional[int]]:
+    r"""Make an animation play for a while and then stay on its first frame.
+
+    The frames keep their order and a copy of the first frame is appended,
+    so the animation still starts on its first frame and a finite loop
+    count makes the decoder stop on the copy once the loops are done.
+    Unrolling the loops into extra frames would repeat every frame in the
+    file, so only the loop count grows with hold_after. Between passes the
+    copy is only shown for HOLD_SEAM_DURATION. When one pass is enough, the
+    copy instead gets the longest GIF delay and the animation plays once.
+
+    :param frames: Device-ready frames, as a frame stack or a list of PIL frames.
+    :param duration: Frame duration in msec, or a list per frame.
+    :param hold_after: Play time in msec before holding, rounded up to whole passes.
+    :return: Tuple of the frame stack, per-frame durations and GIF loop count (None to play once).
+    """
+    stack = as_frame_stack(frames)
+    if hold_after <= 0:
+        raise ValueError("The hold time must be greater than 0")
+    if len(stack) <= 1:
+        return stack, duration, None
+    durations = list(duration) if isinstance(duration, (list, tuple)) else [duration] * len(stack)
+    passes = max(1, math.ceil(hold_after / max(sum(durations), 1)))
+    stack = np.concatenate([stack, stack[:1]])
+    if passes == 1:
+        return stack, durations + [HOLD_FRAME_DURATION], None
+    # NETSCAPE loop count: repetitions after the first pass
+    return stack, durations + [HOLD_SEAM_DURATION], passes - 1
+
+def resolve_byte_budget(byte_budget: int = 0, time_budget: float = 0, throughput: Optional[float] = None) -> int:
+    """
+    Combines a byte budget and a time budget into one byte limit.
+
+    :param byte_budget: Maximum payload size in bytes, 0 to disable.
+    :param time_budget: Maximum upload time in seconds, 0 to disable.
+    :param throughput: Measured link throughput in bytes per second, used with time_budget.
+    :return: The tightest byte limit, or 0 when no budget applies.
+    """
+    limits = []
+    if byte_budget and byte_budget > 0:
+        limits.append(int(byte_budget))
+    if time_budget and time_budget > 0 and throughput and throughput > 0:
+        limits.append(int(time_budget * throughput))
+    return min(limits) if limits else 0
+
+def _budget_candidates(frame_count: int, colors: int):
+    counts = [c for c in BUDGET_COLOR_STEPS if c <= colors] or [colors]
+    high = [c for c in counts if c >= BUDGET_MIN_COLORS] or counts[:1]
+    low = [c for c in counts if c not in high]
+    steps = [s for s in BUDGET_FRAME_STEPS if s == 1 or s < frame_count]
+
+    def with_dither(counts):
+        for c in counts:
+            if c <= BUDGET_DITHER_COLORS:
+                yield c, True
+            yield c, False
+
+    # Reduce colors first, then drop frames, then fall back to a still image
+    for step in steps:
+        for c, dither in with_dither(high):
+            yield step, c, dither
+    if frame_count > 1:
+        for c, dither in with_dither(high):
+            yield frame_count, c, dither
+    for c, dither in with_dither(low):
+        yield max(steps[-1], frame_count), c, dither
+
+def encode_within_budget(key: str, frames, duration, loop: Optional[int], budget: int, colors: int = MAX_PALETTE_COLORS, hold_after: int = 0) -> tuple[str, bytes, dict]:
+    r"""Search the quality space for a payload that fits a byte budget.
+
+    Candidates are tried from the highest quality down: fewer palette
+    colors first, then frame decimation, then a still image of the first
+    frame. Dithering is tried before plain mapping once the palette gets
+    small. Still images are encoded as both PNG and GIF and the smaller one
+    is kept. The first candidate that fits is returned. If none fits, the
+    smallest candidate is returned and the report says so.
+
+    :param key: Cache key (see render_key).
+    :param frames: Device-ready frames, as a frame stack or a list of PIL frames.
+    :param duration: Frame duration in msec, or a list per frame.
+    :param loop: GIF loop count, or None to play once.
+    :param budget: Maximum size of the sent payload in bytes, header included.
+    :param colors: Upper bound for the palette size.
+    :param hold_after: Hold on the first frame after this many msec (see hold_first_frame), 0 to disable.
+    :return: Tuple of format ('gif' or 'png'), image data and a report dict.
+    """
+    stack = as_frame_stack(frames)
+    limit = budget - PAYLOAD_HEADER_SIZE
+    best = None
+    tried = 0
+    for step, count, dither in _budget_candidates(len(stack), colors):
+        tried += 1
+        kept, kept_duration = decimate_frames(stack, duration, step)
+        kept_loop = loop
+        if hold_after > 0:
+            # After decimation, so a still fallback is still the first frame
+            kept, kept_duration, kept_loop = hold_first_frame(kept, kept_duration, hold_after)
+        indices, palette, transparency = quantize_frames(key, kept, count, dither)
+        encoded = [('gif', encode_gif_from_indices(indices, palette, transparency, kept_duration, kept_loop))]
+        if len(kept) == 1:
+            encoded.append(('png', encode_png_from_indices(indices[0], palette, transparency)))
+        fmt, data = min(encoded, key = lambda e: len(e[1]))
+        report = {
+            'format': fmt,
+            'colors': len(palette),
+            'dither': dither,
+            'frame_step': step,
+            'frames': len(kept),
+            'size': len(data) + PAYLOAD_HEADER_SIZE,
+            'budget': budget,
+            'fits': len(data) <= limit,
+            'tried': tried,
+        }
+        if report['fits']:
+            return fmt, data, report
+        if best is None or len(data) < len(best[1]):
+            best = (fmt, data, report)
+    return best
+
+def load_image_frame_for_device(path: str, max_width: int, max_height: int, anchor: int, auto_resize: bool = False, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> tuple[Image.Image, str]:
+    """
+    Loads an image and clips/anchors it onto a device-sized RGBA canvas.
+
+    :param path: Path to the image file (or a binary file-like object).
+    :param max_width: Output image width for the device.
+    :param max_height: Output image height for the device.
+    :param anchor: Bitwise flags controlling image alignment.
+    :param auto_resize: If True, resize the image to fit device dimensions.
+    :param duplicate_horizontally: If True, render for half the width and repeat it.
+    :param resample: Resampling mode used with auto_resize (see RESAMPLE_MODES).
+    :return: Tuple of the device-ready frame and its cache key (see render_key).
+    """
+    data = read_source(path)
+    with Image.open(io.BytesIO(data)) as img:
+        processed_img = render_image_for_device(img.convert("RGBA"), max_width, max_height, anchor, auto_resize, duplicate_horizontally, resample)
+        return processed_img, render_key(source_hash(data), anchor, auto_resize, duplicate_horizontally, resample)
+
+def read_image_file_for_device(path: str, max_width: int, max_height: int, anchor: int, auto_resize: bool = False, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> bytes:
     r"""Load an image and prepare it for a device-specific PNG format.
 
     The image is clipped from the top-left if it exceeds the target size,
@@ -68,78 +990,93 @@ def read_image_file_for_device(path: str, max_width: int, max_height: int, ancho
     :param max_height: Output image height for the device.
     :param anchor: Bitwise flags controlling image alignment.
     :param auto_resize: If True, resize the image to fit device dimensions.
+    :param duplicate_horizontally: If True, render for half the width and repeat it.
+    :param resample: Resampling mode used with auto_resize (see RESAMPLE_MODES).
     :return: PNG image data as bytes.
     """
 
-    with Image.open(path) as img:
-        processed_img = img.convert("RGBA")
-        if auto_resize:
-            processed_img = resize_image(processed_img, max_width, max_height)
-        
-        result = clip_and_anchor_for_image(processed_img, max_width, max_height, anchor)
+    result, _ = load_image_frame_for_device(path, max_width, max_height, anchor, auto_resize, duplicate_horizontally, resample)
+    return encode_rgba_png(result)
+
+def load_animation_frames_for_device(path: str, max_width: int, max_height: int, anchor: int, auto_resize: bool = False, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> tuple[np.ndarray, object, int, str]:
+    """
+    Loads every frame of an animation into one device-sized frame stack.
+
+    :param path: Path to the animation file (or a binary file-like object).
+    :param max_width: Output image width for the device.
+    :param max_height: Output image height for the device.
+    :param anchor: Bitwise flags controlling image alignment.
+    :param auto_resize: If True, resize the frames to fit device dimensions.
+    :param duplicate_horizontally: If True, render for half the width and repeat it.
+    :param resample: Resampling mode used with auto_resize (see RESAMPLE_MODES).
+    :return: Tuple of the (N, H, W, 4) frame stack, frame duration (msec), loop count and cache key (see render_key).
+    """
+    data = read_source(path)
+    stack, duration, loop = load_frame_stack(data)
+    stack = render_stack_for_device(stack, max_width, max_height, anchor, auto_resize, duplicate_horizontally, resample)
+    return stack, duration, loop, render_key(source_hash(data), anchor, auto_resize, duplicate_horizontally, resample)
 
-        buf = io.BytesIO()
-        result.save(buf, format = 'PNG', optimize = False, compress_level = 6, icc_profile = None)
-        return buf.getvalue()
+def read_animation_file_for_device(path: str, max_width: int, max_height: int, anchor: int, auto_resize: bool = False, colors: int = MAX_PALETTE_COLORS, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> bytes:
+    frames, duration, loop, key = load_animation_frames_for_device(path, max_width, max_height, anchor, auto_resize, duplicate_horizontally, resample)
+    return quantize_frames_to_gif(key, frames, duration = duration, loop = loop, colors = colors)
 
-def read_animation_file_for_device(path: str, max_width: int, max_height: int, anchor: int, auto_resize: bool = False) -> bytes:
+def load_image_files_as_frames_for_device(paths: list[str], max_width: int, max_height: int, anchor: int, auto_resize: bool = False, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> tuple[list[Image.Image], str]:
+    """
+    Loads several still images as the frames of one animation.
+
+    :param paths: Paths to the image files.
+    :param max_width: Output image width for the device.
+    :param max_height: Output image height for the device.
+    :param anchor: Bitwise flags controlling image alignment.
+    :param auto_resize: If True, resize the images to fit device dimensions.
+    :param duplicate_horizontally: If True, render for half the width and repeat it.
+    :param resample: Resampling mode used with auto_resize (see RESAMPLE_MODES).
+    :return: Tuple of device-ready frames and a hash over all sources.
+    """
     frames = []
-    with Image.open(path) as img:
-        # Edit
-        for frame in ImageSequence.Iterator(img):
-            processed_frame = frame.convert("RGBA")
-            if auto_resize:
-                processed_frame = resize_image(processed_frame, max_width, max_height)
-            frames.append(clip_and_anchor_for_image(processed_frame, max_width, max_height, anchor))
-        if len(frames) < 1:
-            raise ValueError("no frame GIF")
-        # Save
-        buf = io.BytesIO()
-        frames[0].save(
-            buf,
-            format = "GIF",
-            save_all = True,
-            append_images = frames[1:],
-            loop = img.info.get("loop", 0),
-            duration = img.info.get("duration", 100),
-            disposal = 2
-        )
-        return buf.getvalue()
-
-def make_animation_from_image_file_for_device(paths: list[str], max_width: int, max_height: int, anchor: int, duration: int, auto_resize: bool = False) -> bytes:
-    # Load PNG files
-    png_files = []
+    keys = []
     for path in paths:
-        png_files.append(read_image_file_for_device(path, max_width, max_height, anchor, auto_resize))
-    if len(png_files) < 1:
+        frame, key = load_image_frame_for_device(path, max_width, max_height, anchor, auto_resize, duplicate_horizontally, resample)
+        frames.append(frame)
+        keys.append(key)
+    if len(frames) < 1:
         raise ValueError("no PNG specified")
+    return frames, source_hash(''.join(keys).encode())
+
+def make_animation_from_image_file_for_device(paths: list[str], max_width: int, max_height: int, anchor: int, duration: int, auto_resize: bool = False, colors: int = MAX_PALETTE_COLORS, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> bytes:
+    # Load image files
+    frames, key = load_image_files_as_frames_for_device(paths, max_width, max_height, anchor, auto_resize, duplicate_horizontally, resample)
 
     # Make GIF file
-    frames = [ Image.open(io.BytesIO(f)) for f in png_files]
-    buf = io.BytesIO()
-    frames[0].save(
-        buf,
-        format = "GIF",
-        save_all = True,
-        append_images = frames[1:],
-        loop = 0,
-        duration = duration,
-        disposal = 2
-    )
-    return buf.getvalue()
+    return quantize_frames_to_gif(key, frames, duration = duration, loop = 0, colors = colors)
 
-def make_joined_image_file_for_device(paths: list[str], max_width: int, max_height: int, anchor: int, auto_resize: bool = False) -> bytes:
+def load_joined_image_frame_for_device(paths: list[str], max_width: int, max_height: int, anchor: int, auto_resize: bool = False, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> tuple[Image.Image, str]:
+    """
+    Joins several images side by side onto one device-sized RGBA canvas.
+
+    :param paths: Paths to the image files, joined from left to right.
+    :param max_width: Output image width for the device.
+    :param max_height: Output image height for the device.
+    :param anchor: Bitwise flags controlling image alignment.
+    :param auto_resize: If True, resize the joined image to fit device dimensions.
+    :param duplicate_horizontally: If True, render for half the width and repeat it.
+    :param resample: Resampling mode used with auto_resize (see RESAMPLE_MODES).
+    :return: Tuple of the device-ready frame and a hash over all sources.
+    """
 
     joined_width = 0
     joined_height = 0
 
     # Load PNG files
     png_files = []
+    keys = []
     for path in paths:
-        img = Image.open(path)
+        data = read_source(path)
+        img = Image.open(io.BytesIO(data))
         joined_width += img.size[0]
         joined_height = max(joined_height, img.size[1])
         png_files.append(img)
+        keys.append(source_hash(data))
     if len(png_files) < 1:
         raise ValueError("no PNG specified")
 
@@ -150,11 +1087,67 @@ def make_joined_image_file_for_device(paths: list[str], max_width: int, max_heig
         joined.paste(img, (joined_x, 0))
         joined_x += img.size[0]
     
-    processed_img = joined
-    if auto_resize:
-        processed_img = resize_image(processed_img, max_width, max_height)
+    processed_img = render_image_for_device(joined, max_width, max_height, anchor, auto_resize, duplicate_horizontally, resample)
+    return processed_img, render_key(source_hash(''.join(keys).encode()), anchor, auto_resize, duplicate_horizontally, resample)
 
-    result = clip_and_anchor_for_image(processed_img, max_width, max_height, anchor)
-    buf = io.BytesIO()
-    result.save(buf, format = 'PNG', optimize = False, compress_level = 6, icc_profile = None)
-    return buf.getvalue()
+def make_joined_image_file_for_device(paths: list[str], max_width: int, max_height: int, anchor: int, auto_resize: bool = False, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO) -> bytes:
+    result, _ = load_joined_image_frame_for_device(paths, max_width, max_height, anchor, auto_resize, duplicate_horizontally, resample)
+    return encode_rgba_png(result)
+
+def open_reduced_image(data: bytes, width: int, height: int) -> Image.Image:
+    """
+    Decodes an image at the smallest resolution that still covers the target size.
+
+    JPEG sources use the decoder's draft mode (DCT scaling by 1/2, 1/4 or
+    1/8), so the decode cost follows the target size rather than the
+    source size. Other formats are reduced by an integer box factor.
+
+    :param data: Source bytes.
+    :param width: The minimum width needed.
+    :param height: The minimum height needed.
+    :return: The decoded RGBA PIL Image object.
+    """
+    img = Image.open(io.BytesIO(data))
+    if img.format == "JPEG":
+        img.draft("RGB", (width, height))
+        return img.convert("RGBA")
+    img = img.convert("RGBA")
+    factor = min(img.width // max(width, 1), img.height // max(height, 1))
+    if factor >= 2:
+        img = img.reduce(factor)
+    return img
+
+def album_art_size(max_width: int, max_height: int, duplicate_horizontally: bool = False) -> int:
+    """
+    Returns the side length of square album art on a device.
+
+    :param max_width: Device width.
+    :param max_height: Device height.
+    :param duplicate_horizontally: If True, the art is shown twice side by side.
+    :return: Side length in pixels.
+    """
+    target_width = max(max_width // 2, 1) if duplicate_horizontally else max_width
+    return max(min(target_width, max_height), 1)
+
+def render_album_art_for_device(data: bytes, max_width: int, max_height: int, anchor: int, duplicate_horizontally: bool = False, resample: str = RESAMPLE_AUTO, colors: int = MAX_PALETTE_COLORS) -> bytes:
+    """
+    Renders album art straight to a device's geometry as a still GIF.
+
+    The cover is decoded at reduced resolution, scaled to the largest
+    square that fits the device and placed according to anchor.
+
+    :param data: Cover image bytes (usually JPEG).
+    :param max_width: Output image width for the device.
+    :param max_height: Output image height for the device.
+    :param anchor: Bitwise flags controlling image alignment.
+    :param duplicate_horizontally: If True, show the art twice side by side.
+    :param resample: Resampling mode (see RESAMPLE_MODES).
+    :param colors: Maximum number of palette entries.
+    :return: GIF data as bytes.
+    """
+    size = album_art_size(max_width, max_height, duplicate_horizontally)
+    stack = as_frame_stack([open_reduced_image(data, size, size)])
+    stack = resize_stack(stack, size, size, resample)
+    stack = render_stack_for_device(stack, max_width, max_height, anchor, False, duplicate_horizontally)
+    key = render_key(source_hash(data), anchor, True, duplicate_horizontally, resample)
+    return quantize_frames_to_gif(key, stack, duration = 100, loop = None, colors = colors)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+# Import modules
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+from .commands import common
+
+CMD_DELETE_IMAGE = 0x0102
+DATA_HEADER_SIZE = 11
+
+def parse_data_payload(payload: bytes) -> Optional[dict]:
+    """
+    Reads the buffer, size, CRC and content hash of a data payload (send_png/gif/mix_data).
+
+    :param payload: A complete payload (LEN, CMD, DAT).
+    :return: Dict with command, buffer, size, crc and hash, or None for other commands.
+    """
+    if len(payload) < 4 + DATA_HEADER_SIZE:
+        return None
+    command = int.from_bytes(payload[2:4], 'little')
+    if command not in common.DATA_COMMANDS:
+        return None
+    header = payload[4:4 + DATA_HEADER_SIZE]
+    data = payload[4 + DATA_HEADER_SIZE:]
+    return {
+        'command': command,
+        'buffer': header[10],
+        'size': int.from_bytes(header[1:5], 'little'),
+        'crc': int.from_bytes(header[5:9], 'little'),
+        'hash': hashlib.sha1(data).hexdigest()
+    }
+
+def parse_erase_payload(payload: bytes) -> Optional[list[int]]:
+    """
+    Reads the buffers of a delete_image payload.
+
+    :param payload: A complete payload (LEN, CMD, DAT).
+    :return: List of erased buffer numbers, or None for other commands.
+    """
+    if len(payload) < 6 or int.from_bytes(payload[2:4], 'little') != CMD_DELETE_IMAGE:
+        return None
+    count = int.from_bytes(payload[4:6], 'little')
+    return list(payload[6:6 + count])
+
+class BufferManifest:
+    r"""Per-device record of what was written to which buffer.
+
+    The device cannot list its buffers, so the manifest is the host's
+    memory of every data payload the device confirmed (buffer, size, CRC
+    and content hash). Within a session, writes of content a buffer
+    already holds can be skipped. Across sessions verify() compares the
+    firmware and the get_last_space answer recorded after the last change
+    with the answers on connect: a write or erase by another app changes
+    the free space. Devices that do not answer get_last_space are never
+    verified. The DIY buffer is not recorded, its content does not
+    survive mode changes. The file is saved atomically on every change.
+    All methods are thread-safe.
+
+    :param path: JSON file of the manifest, created on the first change.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._devices = {}
+        try:
+            with open(path, 'r') as f:
+                self._devices = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def _save(self) -> None:
+        with open(self.path + ".tmp", 'w') as f:
+            json.dump(self._devices, f, indent = 4)
+        os.replace(self.path + ".tmp", self.path)
+
+    def verify(self, address: str, device_info: Optional[dict], space: Optional[str]) -> bool:
+        """
+        Checks whether the manifest of a device still describes its buffers.
+
+        :param address: Device address.
+        :param device_info: Decoded get_device_info response, or None if the device did not answer.
+        :param space: get_last_space data (hex) on connect, or None if the device did not answer.
+        :return: True if a manifest exists for the same firmware and the free space did not change since its last change.
+        """
+        with self._lock:
+            entry = self._devices.get(address)
+            if device_info is None or space is None or entry is None:
+                return False
+            return entry['device_info'] == device_info and entry.get('space') == space
+
+    def record_space(self, address: str, space: Optional[str]) -> None:
+        """
+        Stores the get_last_space answer after a change, for verify() on the next connect.
+
+        :param address: Device address.
+        :param space: get_last_space data (hex), or None if the device did not answer.
+        :return: None
+        """
+        with self._lock:
+            entry = self._devices.get(address)
+            if entry is None or entry.get('space') == space:
+                return
+            entry['space'] = space
+            self._save()
+
+    def reset(self, address: str, device_info: Optional[dict]) -> None:
+        """
+        Starts an empty manifest for a device, e.g. after erasing all buffers.
+
+        :param address: Device address.
+        :param device_info: Decoded get_device_info response, or None.
+        :return: None
+        """
+        with self._lock:
+            self._devices[address] = {'device_info': device_info, 'buffers': {}}
+            self._save()
+
+    def record(self, address: str, payloads: list[bytes]) -> bool:
+        """
+        Updates the manifest with payloads a device confirmed.
+
+        :param address: Device address.
+        :param payloads: Payloads the device stored (OK data response), data and delete_image payloads are recorded.
+        :return: True if the payloads changed the buffers, i.e. the free space should be recorded again.
+        """
+        with self._lock:
+            entry = self._devices.get(address)
+            if entry is None:
+                return False
+            buffers = entry['buffers']
+            changed = False
+            for payload in payloads:
+                erased = parse_erase_payload(payload)
+                if erased is not None:
+                    for buffer in erased:
+                        buffers.pop(str(buffer), None)
+                    changed = True
+                    continue
+                info = parse_data_payload(payload)
+                if info is None or info['buffer'] == common.DIY_BUFFER:
+                    continue
+                buffers[str(info['buffer'])] = {k: info[k] for k in ('command', 'size', 'crc', 'hash')}
+                changed = True
+            if changed:
+                self._save()
+            return changed
+
+    def holds(self, address: str, payload: bytes) -> bool:
+        """
+        Checks whether a device already holds the data of a payload.
+
+        :param address: Device address.
+        :param payload: A data payload.
+        :return: True if the target buffer holds the same data.
+        """
+        info = parse_data_payload(payload)
+        if info is None or info['buffer'] == common.DIY_BUFFER:
+            return False
+        with self._lock:
+            entry = self._devices.get(address)
+            stored = entry['buffers'].get(str(info['buffer'])) if entry else None
+            return stored is not None and all(stored[k] == info[k] for k in ('command', 'size', 'crc', 'hash'))
+
+    def buffers(self, address: str) -> dict:
+        """
+        Returns the recorded buffers of a device.
+
+        :param address: Device address.
+        :return: Dict of buffer number to size, CRC and hash.
+        """
+        with self._lock:
+            entry = self._devices.get(address)
+            return {int(k): dict(v) for k, v in entry['buffers'].items()} if entry else {}
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+# Import modules
+import argparse
+from typing import Callable, Optional
+from .commands import set_prg_mode
+from .manifest import BufferManifest
+
+# Program buffers reserved for slides (0x50 - 0x64), below them stay free for regular writes
+FIRST_BUFFER = 0x50
+BUFFER_COUNT = 0x15
+RENDER_CACHE_SIZE = BUFFER_COUNT * 4 # Rendered slides kept, enough for a few devices with different settings
+
+class Playlist:
+    r"""Slides kept in program buffers and cycled by the device itself.
+
+    Every slide (keyed by its source, e.g. the file path) keeps the buffer
+    it was given for as long as it stays in the playlist, so reordering or
+    adding slides does not move the others. Slides that left the playlist
+    free their buffer for new ones. The assignments are plain data, saved
+    with the config.
+
+    plan() compares every slide with the buffer manifest of a device, so
+    only new or changed slides are uploaded. A slide is only rendered again
+    when its fingerprint (source content and render settings) changed.
+    set_prg_mode then hands the cycling to the device, which needs no
+    traffic per slide.
+
+    :param buffers: Program buffers the playlist may use.
+    :param assignments: Saved slide key to buffer assignments.
+    """
+    def __init__(self, buffers: Optional[list[int]] = None, assignments: Optional[dict] = None):
+        self.buffers = list(buffers) if buffers is not None else list(range(FIRST_BUFFER, FIRST_BUFFER + BUFFER_COUNT))
+        self.assignments = {k: v for k, v in (assignments or {}).items() if v in self.buffers}
+        self._rendered = {} # Fingerprint and buffer -> payloads, oldest first
+
+    def assign(self, slides: list[str]) -> dict[str, int]:
+        """
+        Gives every slide a buffer, keeping existing assignments.
+
+        :param slides: Slide keys in playlist order.
+        :return: Slide key to buffer, in playlist order.
+        """
+        if not slides:
+            raise ValueError("The playlist must not be empty")
+        if len(set(slides)) != len(slides):
+            raise ValueError("Every slide may only be in the playlist once")
+        if len(slides) > len(self.buffers):
+            raise ValueError(f"The playlist holds at most {len(self.buffers)} slides")
+        self.assignments = {k: v for k, v in self.assignments.items() if k in slides}
+        free = [b for b in self.buffers if b not in self.assignments.values()]
+        for slide in slides:
+            if slide not in self.assignments:
+                self.assignments[slide] = free.pop(0)
+        return {slide: self.assignments[slide] for slide in slides}
+
+    def plan(self, address: str, slides: list[str], render: Callable[[str, int], list[bytes]], manifest: BufferManifest, fingerprint: Optional[Callable[[str], str]] = None) -> tuple[list[bytes], list[bytes]]:
+        """
+        Returns what a device needs to play the playlist.
+
+        :param address: Device address.
+        :param slides: Slide keys in playlist order.
+        :param render: Returns the data payloads of a slide for a buffer.
+        :param manifest: Buffer manifest, for what the device already holds.
+        :param fingerprint: Returns a key of a slide's source content and render settings, None to render every slide.
+        :return: Tuple of the uploads (changed slides only) and the set_prg_mode payloads.
+        """
+        order = self.assign(slides)
+        uploads = []
+        for slide, buffer in order.items():
+            key = f"{fingerprint(slide)}:{buffer:02x}" if fingerprint else None
+            payloads = self._rendered.pop(key, None) if key else None
+            if payloads is None:
+                payloads = render(slide, buffer)
+            if key:
+                self._rendered[key] = payloads
+                while len(self._rendered) > RENDER_CACHE_SIZE:
+                    del self._rendered[next(iter(self._rendered))]
+            if not all(manifest.holds(address, payload) for payload in payloads):
+                uploads += payloads
+        return uploads, set_prg_mode.make(argparse.Namespace(buffer = list(order.values())))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+# Import modules
+import time
+from typing import Optional
+
+class SpotifyPollScheduler:
+    r"""Decides when to poll Spotify next, based on the last playback state.
+
+    While a track plays, the next poll is scheduled just after its expected
+    end (capped so skips are still noticed). After an early track change
+    (a skip) a few fast polls follow, since skips tend to come in bursts.
+    While paused or idle, the interval backs off up to IDLE_MAX_INTERVAL.
+    Both caps stay close to a fixed poll of a few seconds, so skips and
+    resumes are noticed about as fast as before.
+
+    :param clock: Monotonic clock in seconds.
+    """
+    END_MARGIN = 0.4 # Seconds after the expected track end
+    MIN_INTERVAL = 0.5
+    PLAYING_MAX_INTERVAL = 3.0
+    SKIP_INTERVAL = 1.5
+    SKIP_FAST_POLLS = 3
+    SKIP_TOLERANCE = 2.0 # A change earlier than this before the expected end is a skip
+    IDLE_MIN_INTERVAL = 3.0
+    IDLE_MAX_INTERVAL = 6.0
+    ERROR_INTERVAL = 5.0
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.expected_end = None # Clock time the current track should end
+        self.fast_polls = 0
+        self.idle_interval = self.IDLE_MIN_INTERVAL
+        self.polls = 0
+
+    def next_delay(self, playback: Optional[dict], changed: bool, request_started: float) -> float:
+        """
+        Returns the seconds to wait before the next poll.
+
+        :param playback: Response of current_user_playing_track (or None).
+        :param changed: True if the track differs from the previous poll.
+        :param request_started: Clock time the request was sent, to discount its latency.
+        :return: Seconds.
+        """
+        self.polls += 1
+        now = self.clock()
+        if changed and self.expected_end is not None and now < self.expected_end - self.SKIP_TOLERANCE:
+            self.fast_polls = self.SKIP_FAST_POLLS
+
+        item = (playback or {}).get('item')
+        if not item or not playback.get('is_playing'):
+            self.expected_end = None
+            self.fast_polls = 0
+            delay = self.idle_interval
+            self.idle_interval = min(self.idle_interval * 2, self.IDLE_MAX_INTERVAL)
+            return delay
+
+        self.idle_interval = self.IDLE_MIN_INTERVAL
+        remaining = max((item.get('duration_ms') or 0) - (playback.get('progress_ms') or 0), 0) / 1000
+        self.expected_end = request_started + remaining
+        delay = self.expected_end + self.END_MARGIN - now
+        if self.fast_polls > 0:
+            self.fast_polls -= 1
+            delay = min(delay, self.SKIP_INTERVAL)
+        return min(max(delay, self.MIN_INTERVAL), self.PLAYING_MAX_INTERVAL)
+
+    def error_delay(self) -> float:
+        self.expected_end = None
+        return self.ERROR_INTERVAL
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+# Import modules
+import random
+import time
+from typing import Optional
+
+class ReconnectSupervisor:
+    r"""Decides when to retry dropped devices and measures how long they took to recover.
+
+    Retries back off exponentially from BASE_DELAY up to MAX_DELAY, with
+    "equal jitter" (half of the delay is random) so several panels that
+    dropped together do not retry in lockstep. Devices the user
+    disconnected are not retried until the user connects them again.
+
+    :param clock: Monotonic clock in seconds.
+    :param rng: Returns a random float in [0, 1).
+    """
+    BASE_DELAY = 1.0
+    MAX_DELAY = 30.0
+
+    def __init__(self, clock=time.monotonic, rng=random.random):
+        self.clock = clock
+        self.rng = rng
+        self.devices = {} # Address -> {'since': clock time of the drop, 'attempts': retries so far}
+        self.recoveries = [] # (address, seconds, attempts) of every recovery
+        self.user_disconnects = set() # Devices the user disconnected, not to be reconnected
+
+    def lost(self, address: str) -> bool:
+        """
+        Starts tracking a dropped device. Repeated calls keep the original drop time.
+
+        :param address: Device address.
+        :return: False if the user disconnected the device, which is then not tracked.
+        """
+        if self.is_suppressed(address):
+            return False
+        self.devices.setdefault(address, {'since': self.clock(), 'attempts': 0})
+        return True
+
+    def is_recovering(self, address: str) -> bool:
+        return address in self.devices
+
+    def is_suppressed(self, address: str) -> bool:
+        return address in self.user_disconnects
+
+    def next_delay(self, address: str) -> float:
+        """
+        Returns the seconds to wait before the next attempt and counts the attempt.
+
+        :param address: Address of a tracked device.
+        :return: Seconds, between half and all of the capped exponential delay.
+        """
+        state = self.devices[address]
+        state['attempts'] += 1
+        cap = min(self.MAX_DELAY, self.BASE_DELAY * 2 ** (state['attempts'] - 1))
+        return cap / 2 + self.rng() * cap / 2
+
+    def attempts(self, address: str) -> int:
+        state = self.devices.get(address)
+        return state['attempts'] if state else 0
+
+    def recovered(self, address: str) -> Optional[tuple[float, int]]:
+        """
+        Stops tracking a device that is back.
+
+        :param address: Device address.
+        :return: Tuple of the seconds to recover and the attempts, or None if it was not lost.
+        """
+        state = self.devices.pop(address, None)
+        if state is None:
+            return None
+        seconds = self.clock() - state['since']
+        self.recoveries.append((address, seconds, state['attempts']))
+        return seconds, state['attempts']
+
+    def user_disconnected(self, address: str) -> None:
+        """
+        Stops tracking a device the user disconnected and suppresses its retries.
+
+        :param address: Device address.
+        :return: None
+        """
+        self.user_disconnects.add(address)
+        self.devices.pop(address, None)
+
+    def user_connected(self, address: str) -> None:
+        """
+        Allows retries again for a device the user connected.
+
+        :param address: Device address.
+        :return: None
+        """
+        self.user_disconnects.discard(address)
+
+    def summary(self) -> str:
+        """
+        Returns a one-line summary of all recoveries.
+
+        :return: Summary.
+        """
+        if not self.recoveries:
+            return "no recoveries"
+        times = [seconds for _, seconds, _ in self.recoveries]
+        return f"{len(times)} recoveries, mean {sum(times) / len(times):.1f} s, max {max(times):.1f} s"
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+# Import modules
+import threading
+from collections import OrderedDict
+from typing import Optional
+from .commands import common
+
+class RemoconSlots:
+    r"""Tracks which assets are stored in a device's remocon slots (0x6F onwards).
+
+    Assets in a slot are shown with switch_screen instead of a new upload.
+    Slots are reused least recently used first, never the one on screen
+    and never one with a prefetch in flight.
+
+    :param budget: Number of slots the device may use (0 - REMOCON_COUNT).
+    """
+    def __init__(self, budget: int):
+        self.budget = max(0, min(budget, common.REMOCON_COUNT))
+        self.assets = OrderedDict() # Asset key -> slot, least recently used first
+        self.pending = {} # Prefetch token -> (asset key, slot)
+        self.current = None # Slot on screen, None if the screen shows something else
+        self.next_token = 0
+
+    @staticmethod
+    def screen(slot: int) -> int:
+        """
+        Returns the switch_screen number of a slot.
+
+        :param slot: Buffer number of the slot.
+        :return: Screen number (1 - REMOCON_COUNT).
+        """
+        return slot - common.REMOCON_BUFFER + 1
+
+    def lookup(self, key: str) -> Optional[int]:
+        """
+        Returns the slot holding an asset and marks it as recently used.
+
+        :param key: Asset key.
+        :return: Slot, or None if the asset is not stored.
+        """
+        slot = self.assets.get(key)
+        if slot is not None:
+            self.assets.move_to_end(key)
+        return slot
+
+    def is_known(self, key: str) -> bool:
+        return key in self.assets or any(k == key for k, _ in self.pending.values())
+
+    def allocate(self, key: str, budget: Optional[int] = None) -> Optional[int]:
+        """
+        Picks a slot for an asset, evicting the least recently used one.
+
+        :param key: Asset key.
+        :param budget: Slots to pick from, the device budget when None.
+        :return: Slot, or None if all are busy.
+        """
+        busy = {self.current} | {slot for _, slot in self.pending.values()}
+        used = set(self.assets.values())
+        budget = self.budget if budget is None else max(0, min(budget, common.REMOCON_COUNT))
+        for slot in range(common.REMOCON_BUFFER, common.REMOCON_BUFFER + budget):
+            if slot not in used and slot not in busy:
+                return slot
+        for old_key, slot in self.assets.items():
+            if slot not in busy:
+                del self.assets[old_key]
+                return slot
+        return None
+
+    def store(self, key: str, slot: int) -> None:
+        """
+        Records an asset as stored in a slot.
+
+        :param key: Asset key.
+        :param slot: Slot it was written to.
+        :return: None
+        """
+        for old_key in [k for k, s in self.assets.items() if s == slot]:
+            del self.assets[old_key]
+        self.assets[key] = slot
+
+    def begin_prefetch(self, key: str, slot: int) -> int:
+        """
+        Records a prefetch in flight.
+
+        :param key: Asset key.
+        :param slot: Slot it is written to.
+        :return: Token of the prefetch.
+        """
+        self.next_token += 1
+        self.pending[self.next_token] = (key, slot)
+        return self.next_token
+
+    def end_prefetch(self, token: int, stored: bool) -> None:
+        """
+        Records the outcome of a prefetch.
+
+        :param token: Token from begin_prefetch().
+        :param stored: True if the device stored the asset.
+        :return: None
+        """
+        entry = self.pending.pop(token, None)
+        if entry and stored:
+            self.store(*entry)
+
+    def forget_all(self) -> None:
+        """
+        Forgets every stored asset, e.g. after the buffers were erased.
+
+        :return: None
+        """
+        self.assets.clear()
+        self.current = None
+
+class SyncSwitch:
+    r"""Two-phase switch of several devices to content staged in their remocon slots.
+
+    Phase one: every device uploads into a staging slot and switches back,
+    since uploads show once they are complete. Phase two starts when all
+    devices reported: their BLE threads wait on the same event and send
+    switch_screen right away, so the panels change together however long
+    each upload took. The spread of the times the switch writes completed
+    is the skew. Devices that already showed the content (unchanged) still
+    switch, but their time does not count towards the skew.
+
+    :param switches: Address to the payloads that show the staged content.
+    :param status_queue: Gets "SYNC_DONE:<switched>:<skew in ms>" once every device is done.
+    :param unchanged: Addresses whose switch does not change the screen.
+    """
+    STAGE_TIMEOUT = 30.0 # Seconds to wait for the slowest upload before switching anyway
+
+    def __init__(self, switches: dict[str, list[bytes]], status_queue, unchanged = ()):
+        self.switches = switches
+        self.unchanged = set(unchanged)
+        self.status_queue = status_queue
+        self.go = threading.Event()
+        self.switched = {} # Address -> time the switch was sent, None if the device did not switch
+        self._pending = set(switches)
+        self._lock = threading.Lock()
+
+    def staged(self, address: str) -> None:
+        """
+        Records that a device finished phase one (uploaded or failed), starting phase two after the last one.
+
+        :param address: Device address.
+        :return: None
+        """
+        with self._lock:
+            self._pending.discard(address)
+            if not self._pending:
+                self.go.set()
+
+    def record(self, address: str, when: Optional[float]) -> None:
+        """
+        Records the switch time of a device and reports the skew once all devices are done.
+
+        :param address: Device address.
+        :param when: Time the switch was sent, None if the device did not switch.
+        :return: None
+        """
+        with self._lock:
+            self.switched[address] = when
+            done = len(self.switched) == len(self.switches)
+        if done:
+            self.status_queue.put(f"SYNC_DONE:{len(self.switch_times())}:{self.skew() * 1000:.1f}")
+
+    def switch_times(self) -> list[float]:
+        """
+        Returns the times of the switches that changed the screen.
+
+        :return: Times, in no particular order.
+        """
+        return [t for address, t in self.switched.items() if t is not None and address not in self.unchanged]
+
+    def skew(self) -> float:
+        """
+        Returns the seconds between the first and the last switch that changed the screen.
+
+        :return: Seconds, 0 for fewer than two switches.
+        """
+        times = self.switch_times()
+        return max(times) - min(times) if len(times) > 1 else 0.0
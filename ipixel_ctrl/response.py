@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+# Import modules
+from typing import NamedTuple, Optional
+from .commands import common, get_device_info, get_last_space, set_current_time
+
+# Responses carrying more than a result code
+DECODERS = {
+    0x8001: set_current_time.parse,
+    0x8002: get_last_space.parse,
+    0x8005: get_device_info.parse,
+}
+
+# Result codes meaning OK, data commands answer 0x03 and the others 0x01
+DATA_OK = 0x03
+RET_OK = 0x01
+
+PRG_BUFFER_COUNT = 0x64 # SCR_NO 01 - 64
+
+def decode(response: bytes) -> dict:
+    """
+    Decodes a response notification from fa03.
+
+    :param response: Response notification (LEN, CMD, DAT).
+    :return: Dict with the command, the data as hex and the decoded fields, 'ok' for result codes.
+    """
+    if response is None or len(response) < common.PAYLOAD_LEN_SIZE + common.PAYLOAD_CMD_SIZE:
+        raise ValueError("Response is too short")
+    command = int.from_bytes(response[2:4], 'little')
+    data = common.parse_response(response, command)
+    result = {'command': command, 'data': data.hex()}
+    if command in DECODERS:
+        result.update(DECODERS[command](response))
+    elif len(data) == 1:
+        result['ok'] = data[0] == (DATA_OK if command in common.DATA_COMMANDS else RET_OK)
+    return result
+
+class Capabilities(NamedTuple):
+    r"""What is known about a panel, cached per device in the config.
+
+    Firmware versions come from get_device_info and the LED type from the
+    set_current_time response. Neither reports the geometry, so it is
+    looked up by LED type in a table learned from panels whose size was
+    confirmed once. The buffer count is the documented PRG range, the
+    device does not report it.
+    """
+    mcu_version: Optional[str] = None
+    ble_version: Optional[str] = None
+    led_type: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    buffer_count: int = PRG_BUFFER_COUNT
+
+    @property
+    def has_geometry(self) -> bool:
+        return self.width is not None and self.height is not None
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "Capabilities":
+        """
+        Restores a record saved with _asdict(), ignoring unknown keys.
+
+        :param values: Saved record.
+        :return: Capabilities
+        """
+        return cls(**{k: values[k] for k in cls._fields if k in values})
+
+def make_capabilities(device_info: Optional[dict], time_info: Optional[dict], geometries: dict) -> Capabilities:
+    """
+    Builds the capability record of a panel from its responses.
+
+    :param device_info: Decoded get_device_info response, or None.
+    :param time_info: Decoded set_current_time response, or None.
+    :param geometries: Learned LED type (as string) to [width, height].
+    :return: Capabilities, without geometry for unknown LED types.
+    """
+    led_type = time_info['led_type'] if time_info else None
+    geometry = geometries.get(str(led_type)) if led_type is not None else None
+    return Capabilities(
+        mcu_version = device_info['mcu_version'] if device_info else None,
+        ble_version = device_info['ble_version'] if device_info else None,
+        led_type = led_type,
+        width = geometry[0] if geometry else None,
+        height = geometry[1] if geometry else None
+    )
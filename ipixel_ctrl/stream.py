@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+# Import modules
+import threading
+import time
+from typing import Callable, Iterable, Optional
+import numpy as np
+from .framebuffer import DiyFramebuffer
+
+# Color depth in bits per channel
+MAX_DEPTH = 8
+MIN_DEPTH = 3
+
+def reduce_depth(frame: np.ndarray, bits: int) -> np.ndarray:
+    """
+    Drops the low bits of every channel, so fewer pixels change and PNGs get smaller.
+
+    :param frame: Frame as an (H, W, C) uint8 array.
+    :param bits: Bits kept per channel (1 - 8).
+    :return: The reduced frame.
+    """
+    if bits >= MAX_DEPTH:
+        return frame
+    return frame & np.uint8((0xFF << (MAX_DEPTH - bits)) & 0xFF)
+
+class FrameGovernor:
+    r"""Caps the frame rate and color depth of a stream to what the link sustains.
+
+    Every sent frame reports its size and how long the send took. Both are
+    smoothed, giving the achieved throughput (bytes per second) and the
+    cost of a frame. The frame rate is the rate that uses HEADROOM of the
+    throughput, between min_fps and max_fps, so sends never pile up. When
+    even min_fps does not fit, the color depth is lowered one bit at a
+    time; it is raised again once the link has plenty of room.
+
+    :param max_fps: Highest frame rate.
+    :param min_fps: Lowest frame rate before the depth is lowered.
+    """
+    HEADROOM = 0.8 # Share of the measured throughput a stream may use
+    SMOOTHING = 0.3 # Weight of the newest measurement
+    RAISE_FACTOR = 2.0 # Depth goes up when max_fps fits this many times
+
+    def __init__(self, max_fps: float = 10.0, min_fps: float = 1.0):
+        if min_fps <= 0 or max_fps < min_fps:
+            raise ValueError("The frame rates must satisfy 0 < min_fps <= max_fps")
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.depth = MAX_DEPTH
+        self.throughput: Optional[float] = None # Bytes per second
+        self.frame_cost: Optional[float] = None # Bytes per frame
+
+    def _smooth(self, old: Optional[float], new: float) -> float:
+        return new if old is None else old + self.SMOOTHING * (new - old)
+
+    def record(self, size: int, elapsed: float) -> None:
+        """
+        Takes the measurement of a sent frame.
+
+        :param size: Bytes sent for the frame (0 if nothing changed).
+        :param elapsed: Seconds the send took.
+        :return: None
+        """
+        self.frame_cost = self._smooth(self.frame_cost, size)
+        if size > 0 and elapsed > 0:
+            self.throughput = self._smooth(self.throughput, size / elapsed)
+        sustainable = self.sustainable_fps()
+        if sustainable is None:
+            return
+        if sustainable < self.min_fps and self.depth > MIN_DEPTH:
+            self.depth -= 1
+        elif sustainable > self.max_fps * self.RAISE_FACTOR and self.depth < MAX_DEPTH:
+            self.depth += 1
+
+    def sustainable_fps(self) -> Optional[float]:
+        """
+        Returns the frame rate the link sustains with the current frame cost, or None before any measurement.
+
+        :return: Frames per second.
+        """
+        if not self.throughput or self.frame_cost is None:
+            return None
+        if self.frame_cost <= 0:
+            return float('inf')
+        return self.throughput * self.HEADROOM / self.frame_cost
+
+    @property
+    def fps(self) -> float:
+        sustainable = self.sustainable_fps()
+        if sustainable is None:
+            return self.min_fps
+        return max(self.min_fps, min(self.max_fps, sustainable))
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.fps
+
+class StreamPlayer:
+    r"""Plays frames from a generator into the DIY buffer of one device.
+
+    Frame i of the generator is due source_interval * i seconds after the
+    start. Each frame goes through the color depth of the governor and the
+    framebuffer, which sends a PNG of changed frames (see DiyFramebuffer). The
+    send callback must return once the writes were sent, so at most one
+    frame is in flight. A frame is dropped when the governor's interval has
+    not passed yet and the next frame is due before it has. A sent frame is
+    late when its send started more than one source interval after it was
+    due.
+
+    :param frames: Frames (PIL images or RGB/RGBA arrays of the panel size).
+    :param framebuffer: Framebuffer of the device, the DIY mode must already be on.
+    :param send: Sends a list of writes and returns when they are sent.
+    :param source_fps: Rate the generator produces frames for.
+    :param governor: FrameGovernor, a default one capped at source_fps when None.
+    """
+    def __init__(self, frames: Iterable, framebuffer: DiyFramebuffer, send: Callable[[list[bytes]], None], source_fps: float = 10.0, governor: Optional[FrameGovernor] = None, clock = time.monotonic, sleep = time.sleep):
+        if source_fps <= 0:
+            raise ValueError("The source frame rate must be positive")
+        self.frames = frames
+        self.framebuffer = framebuffer
+        self.send = send
+        self.source_interval = 1.0 / source_fps
+        self.governor = governor or FrameGovernor(max_fps = source_fps, min_fps = min(1.0, source_fps))
+        self.clock = clock
+        self.sleep = sleep
+        self.sent = 0
+        self.dropped = 0
+        self.late = 0
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the counters and the current governor state.
+
+        :return: Dict with sent, dropped, late, bytes, fps, depth and throughput.
+        """
+        return {
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'late': self.late,
+            'bytes': self.bytes,
+            'fps': round(self.governor.fps, 1),
+            'depth': self.governor.depth,
+            'throughput': round(self.governor.throughput or 0)
+        }
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> dict:
+        """
+        Plays until the generator ends or the stop event is set.
+
+        :param stop_event: Optional event to stop playing.
+        :return: The final stats().
+        """
+        start = self.clock()
+        next_send = start
+        for i, frame in enumerate(self.frames):
+            if stop_event is not None and stop_event.is_set():
+                break
+            due = start + i * self.source_interval
+            now = self.clock()
+            if now < due:
+                self.sleep(due - now)
+                now = self.clock()
+            if now < next_send:
+                if due + self.source_interval <= next_send:
+                    # A newer frame will be due by the time the link is ready
+                    self.dropped += 1
+                    continue
+                self.sleep(next_send - now)
+                now = self.clock()
+
+            writes = self.framebuffer.update(reduce_depth(self.framebuffer.to_rgb(frame), self.governor.depth))
+            size = sum(len(w) for w in writes)
+            if writes:
+                self.send(writes)
+            elapsed = self.clock() - now
+            self.governor.record(size, elapsed)
+            self.sent += 1
+            self.bytes += size
+            if now - due > self.source_interval:
+                self.late += 1
+            next_send = now + self.governor.interval
+        return self.stats()
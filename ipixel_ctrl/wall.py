@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+# Import modules
+from typing import NamedTuple, Optional
+import numpy as np
+from . import image
+
+class WallPanel(NamedTuple):
+    r"""One panel of a wall and the area of the canvas it shows."""
+    address: str
+    x: int
+    y: int
+    width: int
+    height: int
+
+class WallLayout:
+    r"""Several panels tiled into one virtual canvas.
+
+    Panels sit in a grid of rows and columns. A column is as wide as its
+    widest panel and a row as high as its highest one, panels start at the
+    top left of their cell plus an optional offset (e.g. for bezels). The
+    canvas is the bounding box of all panels.
+
+    :param panels: The panels with their canvas areas.
+    """
+    def __init__(self, panels: list[WallPanel]):
+        if not panels:
+            raise ValueError("A wall needs at least one panel")
+        for panel in panels:
+            if panel.x < 0 or panel.y < 0 or panel.width <= 0 or panel.height <= 0:
+                raise ValueError(f"Invalid wall area for {panel.address}")
+        self.panels = panels
+        self.width = max(p.x + p.width for p in panels)
+        self.height = max(p.y + p.height for p in panels)
+
+    @classmethod
+    def from_config(cls, layout: dict, sizes: dict) -> "WallLayout":
+        """
+        Places the panels of a layout from the config.
+
+        The layout looks like {"panels": [{"address": ..., "row": 0,
+        "column": 1, "offset_x": 0, "offset_y": 0}, ...]}.
+
+        :param layout: Wall layout.
+        :param sizes: Address to (width, height) of each panel.
+        :return: WallLayout
+        """
+        entries = layout.get('panels', [])
+        for entry in entries:
+            if entry['address'] not in sizes:
+                raise ValueError(f"No size known for wall panel {entry['address']}")
+        column_widths = {}
+        row_heights = {}
+        for entry in entries:
+            width, height = sizes[entry['address']]
+            column, row = entry.get('column', 0), entry.get('row', 0)
+            column_widths[column] = max(column_widths.get(column, 0), width)
+            row_heights[row] = max(row_heights.get(row, 0), height)
+        panels = []
+        for entry in entries:
+            width, height = sizes[entry['address']]
+            column, row = entry.get('column', 0), entry.get('row', 0)
+            x = sum(w for c, w in column_widths.items() if c < column) + entry.get('offset_x', 0)
+            y = sum(h for r, h in row_heights.items() if r < row) + entry.get('offset_y', 0)
+            panels.append(WallPanel(entry['address'], x, y, width, height))
+        return cls(panels)
+
+    @property
+    def key(self) -> str:
+        return "wall:" + ";".join(f"{p.x},{p.y},{p.width}x{p.height}" for p in self.panels)
+
+    def panel_key(self, key: str, panel: WallPanel) -> str:
+        """
+        Returns the cache key of the part of a rendering one panel shows.
+
+        :param key: Key of the wall rendering.
+        :param panel: The panel.
+        :return: Cache key.
+        """
+        return f"{key}:{self.key}:{panel.x},{panel.y},{panel.width}x{panel.height}"
+
+    def slices(self, stack: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        Cuts a canvas-sized stack into panel views, without copying.
+
+        :param stack: Stack of shape (N, H, W, ...) at canvas size.
+        :return: Address to the view of its panel.
+        """
+        if stack.shape[1:3] != (self.height, self.width):
+            raise ValueError(f"The stack must be {self.width}x{self.height}")
+        return {p.address: stack[:, p.y:p.y + p.height, p.x:p.x + p.width] for p in self.panels}
+
+def render_wall_gifs(path: str, layout: WallLayout, anchor: int, auto_resize: bool = False, resample: str = image.RESAMPLE_AUTO, colors: int = image.MAX_PALETTE_COLORS, cache = None) -> dict[str, bytes]:
+    """
+    Renders an animation once at canvas size and encodes one GIF per panel.
+
+    All panels share one palette, so colors match across panel edges. With
+    a cache (see cache.PayloadCache), each panel's GIF is stored under its
+    own key and the source is only decoded when a panel misses.
+
+    :param path: Path to the animation file.
+    :param layout: The wall.
+    :param anchor: Bitwise flags controlling alignment on the canvas.
+    :param auto_resize: If True, resize the frames to fit the canvas.
+    :param resample: Resampling mode used with auto_resize (see RESAMPLE_MODES).
+    :param colors: Maximum number of palette entries.
+    :param cache: Optional payload cache.
+    :return: Address to GIF data.
+    """
+    key = image.render_key(image.source_hash(image.read_source(path)), anchor, auto_resize, False, resample) + f":{colors}"
+    gifs = {}
+    if cache is not None:
+        for panel in layout.panels:
+            data = cache.get(layout.panel_key(key, panel))
+            if data is not None:
+                gifs[panel.address] = data
+    if len(gifs) == len(layout.panels):
+        return gifs
+
+    stack, duration, loop, render = image.load_animation_frames_for_device(path, layout.width, layout.height, anchor, auto_resize, False, resample)
+    if (stack[..., 3] < image.ALPHA_THRESHOLD).any():
+        # Keep one index free for transparency
+        colors = min(colors, image.MAX_PALETTE_COLORS - 1)
+    palette = image.get_global_palette(f"{render}:{layout.key}", stack, colors)
+    indices, transparency = image.map_to_palette(stack, palette)
+    views = layout.slices(indices)
+    for panel in layout.panels:
+        if panel.address in gifs:
+            continue
+        view = views[panel.address]
+        panel_transparency: Optional[int] = transparency if transparency is not None and (view == transparency).any() else None
+        data = image.encode_gif_from_indices(view, palette, panel_transparency, duration, loop)
+        gifs[panel.address] = data
+        if cache is not None:
+            cache.put(layout.panel_key(key, panel), data)
+    return gifs
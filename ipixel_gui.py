@@ -13,7 +13,9 @@ import httpx
 import sys
 import webbrowser
 import io
+import gzip
 from datetime import datetime
+from collections import OrderedDict
 from PIL import Image, ImageTk, ImageDraw, GifImagePlugin
 import ttkbootstrap as ttk
 
@@ -25,7 +27,7 @@ if sys.platform == "win32":
 
 # New imports for advanced BLE handling
 import json
-from bleak import BleakClient, BleakScanner
+from bleak import BleakClient
 
 # Add project root to path to allow importing ipixel_ctrl
 from pathlib import Path
@@ -33,7 +35,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 try:
     # Correctly import the command modules from the new package structure
-    from ipixel_ctrl.commands import write_data_png, write_data_gif, erase_data
+    from ipixel_ctrl.commands import write_data_png, write_data_gif, erase_data, set_diy_mode, common, get_device_info, get_last_space, set_prg_mode, set_current_time, set_text, write_data_mix
     # Import spotipy for Spotify integration
     try:
         import spotipy
@@ -41,22 +43,84 @@ try:
     except ImportError:
         messagebox.showerror("Dependency Error", "The 'spotipy' library is not installed.\nPlease run 'pip install spotipy'.")
         sys.exit(1)
-    from ipixel_ctrl.commands import set_brightness, set_upside_down, set_clock_mode
+    from ipixel_ctrl.commands import set_brightness, set_upside_down, set_clock_mode, set_screen
+    from ipixel_ctrl import image, cache, manifest, bluetooth, response, framebuffer, stream, wall, playlist, poll, reconnect, remocon, flags
 except ImportError as e: # pragma: no cover
     messagebox.showerror("Import Error", f"Failed to import ipixel_ctrl module: {e}\n\nPlease run 'pip install -e .' from the project root.")
     sys.exit(1)
 
+# Content classes of queued commands, used to route writes and to group send statistics.
+# Transient content (album art) goes to the DIY buffer, durable content (flags) to program buffers.
+CONTENT_TRANSIENT = "transient"
+CONTENT_DURABLE = "durable"
+CONTENT_MODE = "mode"
+CONTENT_COMMAND = "command"
+CONTENT_PREFETCH = "prefetch"
+CONTENT_STREAM = "stream"
+
+# GIFs that play for a while (msec) and then hold on their first frame, by file name.
+# Overridden per asset by "gif_hold_after" in the config file.
+DEFAULT_GIF_HOLD_AFTER = {
+    'green.gif': 3000,
+    'yellow.gif': 3000,
+    'red.gif': 3000,
+    'blue.gif': 3000,
+    'white.gif': 3000
+}
+
+# Likely next Multiviewer actions, most likely first. Used to prefetch flags into remocon slots.
+MV_TRANSITIONS = {
+    'green': ['yellow', 'sc', 'red', 'vsc'],
+    'yellow': ['green'],
+    'red': ['green'],
+    'sc': ['ending', 'green'],
+    'vsc': ['ending', 'green'],
+    'ending': ['green']
+}
+
+# Folder of recorded Multiviewer sessions (see mv_replay.py)
+MV_SESSION_DIR = "mv_sessions"
+
+# Text shown by the device itself (set_text) for Multiviewer actions without a GIF
+MV_ACTION_TEXT = {
+    'green': 'GREEN FLAG',
+    'yellow': 'YELLOW FLAG',
+    'red': 'RED FLAG',
+    'sc': 'SAFETY CAR',
+    'vsc': 'VIRTUAL SAFETY CAR',
+    'ending': 'CHEQUERED FLAG'
+}
+DEFAULT_TEXT_STYLE = {'effect': 'rtl', 'speed': 50, 'color': 'FFFFFF'}
+
+# Remocon slots a synchronized switch may use on devices with a smaller slot budget (one on screen, one staging)
+SYNC_STAGING_SLOTS = 2
+
 class BLEThread(threading.Thread):
     """A thread for managing the asyncio event loop and BLE communication."""
-    def __init__(self, device_address, command_queue, status_queue):
+    REQUEST_TIMEOUT = 2.0 # Seconds to wait for a response notification
+    MIN_THROUGHPUT = 1000 # Bytes per second assumed when waiting for the response to a data upload
+    SPACE_TIMEOUT = 1.0 # Seconds to wait for get_last_space, some firmwares do not answer it
+
+    def __init__(self, device_address, command_queue, status_queue, buffer_manifest=None, device=None, query_time=False):
         super().__init__()
         self.device_address = device_address
+        self.query_time = query_time # Send set_current_time on connect to learn the LED type
+        self.device = device # BLEDevice from the scanner, lets the connection skip discovery
         self.command_queue = command_queue # This is a broadcast queue
         self.status_queue = status_queue
+        self.buffer_manifest = buffer_manifest # Records what was written to which buffer
+        self.device_info = None # Decoded get_device_info response, None if the device did not answer
+        self.time_info = None # Decoded set_current_time response (LED type), None if the device did not answer
+        self.last_space = None # get_last_space data (hex) on connect, None if the device did not answer
+        self._responses = {} # Command -> future waiting for its response notification
+        self.notifying = False # True once responses are subscribed, data writes then wait for their result
         self.loop = asyncio.new_event_loop()
         self.client = None
         self.daemon = True
         self._stop_event = None
+        self.throughput = None # Measured upload speed in bytes per second (smoothed)
+        self.send_stats = {} # Per content class: number of sends, bytes and seconds spent sending
+        self.prefetch_queue = queue.Queue() # Low priority uploads, only sent while command_queue is empty
 
  
     def stop(self):
@@ -81,34 +145,74 @@ class BLEThread(threading.Thread):
     async def ble_worker(self):
         """Main worker for handling BLE connection and commands."""
         try:
-            async with BleakClient(self.device_address, disconnected_callback=self.disconnected_callback) as client:
+            async with BleakClient(self.device or self.device_address, disconnected_callback=self.disconnected_callback) as client:
                 self.client = client
                 device_name = client.name if client.name else "iPixel Device"
+                # Identify the device before reporting, the manifest check depends on it
+                self.device_info = await self.query_device_info()
+                self.last_space = await self.query_last_space() if self.notifying else None
+                if self.query_time:
+                    self.time_info = await self.query_time_info()
                 self.status_queue.put(f"BLE_CONNECTED_SUCCESS:{self.device_address}:{device_name}")
                 print("Connected to the device")
 
                 while not self._stop_event.is_set():
                     try:
-                        # Use a timeout on the queue to allow the loop to check the stop event
-                        payloads = await self.loop.run_in_executor(None, self.command_queue.get, True, 0.1)
+                        payloads = self.command_queue.get_nowait()
                     except queue.Empty:
-                        continue # No command, just loop and check stop event
+                        # Idle link: use it for prefetching
+                        if await self.send_prefetch():
+                            continue
+                        try:
+                            # Use a timeout on the queue to allow the loop to check the stop event
+                            payloads = await self.loop.run_in_executor(None, self.command_queue.get, True, 0.1)
+                        except queue.Empty:
+                            continue # No command, just loop and check stop event
 
                     if payloads is None: # Shutdown signal
                         break
-
+                    # Items are either a list of payloads or a (payloads, content class[, SyncSwitch]) tuple
+                    content_class = CONTENT_COMMAND
+                    sync = None
+                    if isinstance(payloads, tuple):
+                        if len(payloads) == 3:
+                            payloads, content_class, sync = payloads
+                        else:
+                            payloads, content_class = payloads
+
+                    staged = False
+                    changed = False
                     try:
                         self.status_queue.put(f"Sending {len(payloads)} command(s)...")
+                        started = time.monotonic()
+                        answered = 0
+                        confirmed = [] # Payloads the device stored, or that only erase
                         for i, payload in enumerate(payloads):
                             print(f"Sending packet {i+1}/{len(payloads)}...")
-                            await self.client.write_gatt_char("0000fa02-0000-1000-8000-00805f9b34fb", payload)
+                            ok = await self.write_payload(payload)
+                            if ok is not None:
+                                answered += 1
+                            if ok or int.from_bytes(payload[2:4], 'little') not in common.DATA_COMMANDS:
+                                confirmed.append(payload)
+                        elapsed = time.monotonic() - started
+                        if self.buffer_manifest:
+                            changed = self.buffer_manifest.record(self.device_address, confirmed)
+                        # Only time sends whose data uploads were all answered, a bare write may only measure local queueing
+                        if answered and answered == sum(1 for p in payloads if int.from_bytes(p[2:4], 'little') in common.DATA_COMMANDS):
+                            self.update_throughput(sum(len(p) for p in payloads), elapsed)
+                        self.update_send_stats(content_class, sum(len(p) for p in payloads), elapsed)
 
                         self.status_queue.put("Finished sending command.")
+                        staged = True
                     except Exception as e:
                         print(f"Error sending command: {e}")
                         self.status_queue.put(f"Error sending command: {e}")
                     finally:
                         self.command_queue.task_done()
+                    if sync:
+                        await self.fire_sync_switch(sync, staged)
+                    if changed:
+                        await self.record_last_space()
 
         except Exception as e:
             self.status_queue.put(f"BLE_CONNECT_FAIL:{self.device_address}:{e}")
@@ -117,9 +221,176 @@ class BLEThread(threading.Thread):
 
         if self.client and self.client.is_connected:
             await self.client.disconnect()
+        self.print_send_stats()
         print("BLE thread finished.")
         self.status_queue.put(f"BLE_DISCONNECTED:{self.device_address}")
 
+    def notification_handler(self, sender, data):
+        """Hands response notifications to the request waiting for their command."""
+        data = bytes(data)
+        if len(data) < 4:
+            return
+        future = self._responses.pop(int.from_bytes(data[2:4], 'little'), None)
+        if future and not future.done():
+            future.set_result(data)
+            return
+        # Nobody waits for it, only report failures
+        try:
+            decoded = response.decode(data)
+        except ValueError as e:
+            print(f"[{self.device_address}] Invalid response {data.hex()}: {e}")
+            return
+        if decoded.get('ok') is False:
+            print(f"[{self.device_address}] Command 0x{decoded['command']:04X} failed: {decoded['data']}")
+
+    async def request(self, payload, command, timeout=REQUEST_TIMEOUT):
+        """Sends a payload and returns the response notification for a command."""
+        future = self.loop.create_future()
+        self._responses[command] = future
+        try:
+            await self.client.write_gatt_char("0000fa02-0000-1000-8000-00805f9b34fb", payload)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._responses.pop(command, None)
+
+    async def write_payload(self, payload):
+        """Writes one payload. Data payloads wait for their result code, returns whether it was OK, or None if nothing confirmed the write."""
+        command = int.from_bytes(payload[2:4], 'little')
+        if not self.notifying or command not in common.DATA_COMMANDS:
+            await self.client.write_gatt_char("0000fa02-0000-1000-8000-00805f9b34fb", payload)
+            return None
+        try:
+            # Writes without response return once queued locally, the result code arrives after the device stored the data
+            result = await self.request(payload, command, self.REQUEST_TIMEOUT + len(payload) / self.MIN_THROUGHPUT)
+        except asyncio.TimeoutError:
+            print(f"[{self.device_address}] No response to 0x{command:04X}")
+            return None
+        ok = response.decode(result).get('ok')
+        if not ok:
+            print(f"[{self.device_address}] Command 0x{command:04X} failed: {result.hex()}")
+        return ok
+
+    async def query_device_info(self):
+        """Subscribes to responses and asks for the firmware versions. Returns None if the device does not answer."""
+        try:
+            await self.client.start_notify("0000fa03-0000-1000-8000-00805f9b34fb", self.notification_handler)
+            self.notifying = True
+            response = await self.request(get_device_info.make(argparse.Namespace())[0], 0x8005)
+            info = get_device_info.parse(response)
+            print(f"[{self.device_address}] Device info: {info}")
+            return info
+        except Exception as e:
+            print(f"[{self.device_address}] No device info: {e!r}")
+            return None
+
+    async def query_last_space(self):
+        """Asks for the free space, the manifest compares it to tell whether the buffers changed while the app was away. Returns None if the device does not answer."""
+        try:
+            response = await self.request(get_last_space.make(argparse.Namespace())[0], 0x8002, self.SPACE_TIMEOUT)
+            return get_last_space.parse(response)['space']
+        except Exception as e:
+            print(f"[{self.device_address}] No last space: {e!r}")
+            return None
+
+    async def record_last_space(self):
+        """Records the free space after the buffers changed, so the next connect can verify the manifest."""
+        if self.last_space is None or not self.buffer_manifest:
+            # The device did not answer on connect, its manifest is never verified
+            return
+        self.last_space = await self.query_last_space()
+        self.buffer_manifest.record_space(self.device_address, self.last_space)
+
+    async def query_time_info(self):
+        """Sets the clock like the vendor app does on connect, the answer carries the LED type. Returns None if the device does not answer.
+
+        The command also powers the panel on and resets the clock language (LANG=0), so it is only sent when the device config opts in.
+        """
+        try:
+            response = await self.request(set_current_time.make(argparse.Namespace())[0], 0x8001)
+            info = set_current_time.parse(response)
+            print(f"[{self.device_address}] Time info: {info}")
+            return info
+        except Exception as e:
+            print(f"[{self.device_address}] No time info: {e!r}")
+            return None
+
+    async def send_prefetch(self):
+        """Sends one queued prefetch, yielding to real traffic between payloads. Returns False if none is queued."""
+        try:
+            token, upload, restore = self.prefetch_queue.get_nowait()
+        except queue.Empty:
+            return False
+        started = time.monotonic()
+        confirmed = [] # Payloads the device stored
+        stored = False
+        try:
+            sent = 0
+            failed = False
+            for payload in upload:
+                if not self.command_queue.empty():
+                    break
+                ok = await self.write_payload(payload)
+                sent += 1
+                failed |= ok is False
+                if ok:
+                    confirmed.append(payload)
+            if confirmed and self.buffer_manifest and self.buffer_manifest.record(self.device_address, confirmed):
+                await self.record_last_space()
+            if sent == len(upload):
+                self.update_send_stats(CONTENT_PREFETCH, sum(len(p) for p in upload), time.monotonic() - started)
+                # Uploads show once complete, go back to the screen that was up before (the same path synchronized switches use)
+                for payload in restore:
+                    await self.client.write_gatt_char("0000fa02-0000-1000-8000-00805f9b34fb", payload)
+                stored = not failed
+        except Exception as e:
+            print(f"Error sending prefetch: {e}")
+            stored = False
+        self.status_queue.put(f"PREFETCH_{'DONE' if stored else 'ABORTED'}:{self.device_address}:{token}")
+        return True
+
+    async def fire_sync_switch(self, sync, staged):
+        """Reports the staged upload, waits until every device of the switch is ready and switches right away."""
+        sync.staged(self.device_address)
+        ready = await self.loop.run_in_executor(None, sync.go.wait, sync.STAGE_TIMEOUT)
+        if not ready:
+            print(f"[{self.device_address}] Not every device staged in time, switching anyway")
+        if not staged:
+            sync.record(self.device_address, None)
+            return
+        try:
+            for payload in sync.switches[self.device_address]:
+                await self.client.write_gatt_char("0000fa02-0000-1000-8000-00805f9b34fb", payload)
+            sync.record(self.device_address, time.monotonic())
+        except Exception as e:
+            print(f"[{self.device_address}] Error sending switch: {e}")
+            sync.record(self.device_address, None)
+
+    def update_throughput(self, size, elapsed):
+        """Folds one transfer, timed until the device confirmed it, into the smoothed throughput estimate."""
+        # Tiny commands are dominated by latency, not bandwidth
+        if size < 256 or elapsed <= 0:
+            return
+        sample = size / elapsed
+        self.throughput = sample if self.throughput is None else 0.7 * self.throughput + 0.3 * sample
+        print(f"Link throughput: {self.throughput:.0f} B/s")
+
+    def update_send_stats(self, content_class, size, elapsed):
+        """Adds one completed send to the statistics of its content class."""
+        stats = self.send_stats.setdefault(content_class, {'count': 0, 'bytes': 0, 'seconds': 0.0})
+        stats['count'] += 1
+        stats['bytes'] += size
+        stats['seconds'] += elapsed
+        rate = stats['bytes'] / stats['seconds'] if stats['seconds'] > 0 else 0
+        print(f"[{self.device_address}] {content_class}: {size} bytes in {elapsed * 1000:.0f} ms (avg {stats['seconds'] * 1000 / stats['count']:.0f} ms, {rate:.0f} B/s over {stats['count']} sends)")
+
+    def print_send_stats(self):
+        """Prints a summary of the send statistics. Every durable send is one write to flash."""
+        for content_class, stats in self.send_stats.items():
+            rate = stats['bytes'] / stats['seconds'] if stats['seconds'] > 0 else 0
+            print(f"[{self.device_address}] {content_class}: {stats['count']} sends, {stats['bytes']} bytes, avg {stats['seconds'] * 1000 / stats['count']:.0f} ms, {rate:.0f} B/s")
+        durable = self.send_stats.get(CONTENT_DURABLE, {}).get('count', 0)
+        print(f"[{self.device_address}] Program buffer (flash) writes: {durable}")
+
     async def send_payloads(self, payloads):
         """The original send function, adapted for the class."""
         if not self.client or not self.client.is_connected:
@@ -129,18 +400,97 @@ class BLEThread(threading.Thread):
             await self.client.write_gatt_char("0000fa02-0000-1000-8000-00805f9b34fb", payload)
             await asyncio.sleep(0.02)
 
+class ScannerThread(threading.Thread):
+    """Runs the continuous BLE scanner in its own event loop, until stopped."""
+    def __init__(self, scanner, status_queue):
+        super().__init__()
+        self.status_queue = status_queue
+        self.scanner = scanner # Shared by all runs, so wanted addresses survive a restart
+        self.loop = asyncio.new_event_loop()
+        self.daemon = True
+        self._stop_event = None
+        self.stopping = False
+
+    def stop(self):
+        self.stopping = True
+        if self._stop_event:
+            self.loop.call_soon_threadsafe(self._stop_event.set)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self._stop_event = asyncio.Event()
+        if self.stopping:
+            self._stop_event.set()
+        try:
+            self.loop.run_until_complete(self.scanner.run(self._stop_event))
+        except Exception as e:
+            self.status_queue.put(f"Scan failed: {e}")
+        print("Scanner thread finished.")
+
+class StreamThread(threading.Thread):
+    """Plays a frame generator into the DIY buffer of one device, one frame in flight at a time.
+
+    Writes go straight to the device's command queue and the player waits
+    until the queue is drained, so the measured time is what the link
+    achieved and the queue never grows behind the stream.
+    """
+    def __init__(self, address, ble_thread, frames, width, height, status_queue, source_fps=10.0, pixels=False):
+        super().__init__()
+        self.address = address
+        self.ble_thread = ble_thread
+        self.status_queue = status_queue
+        self.daemon = True
+        self._stop_event = threading.Event()
+        self.player = stream.StreamPlayer(frames, framebuffer.DiyFramebuffer(width, height, pixels), self.send, source_fps)
+
+    def send(self, writes):
+        self.ble_thread.command_queue.put((writes, CONTENT_STREAM))
+        while self.ble_thread.command_queue.unfinished_tasks and not self._stop_event.is_set():
+            if not self.ble_thread.is_alive():
+                self._stop_event.set()
+                break
+            time.sleep(0.005)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            stats = self.player.run(self._stop_event)
+        except Exception as e:
+            print(f"[{self.address}] Stream failed: {e}")
+            self.status_queue.put(f"STREAM_DONE:{self.address}:failed ({e})")
+            return
+        print(f"[{self.address}] Stream: {stats}")
+        self.status_queue.put(f"STREAM_DONE:{self.address}:{stats['sent']} sent, {stats['dropped']} dropped, {stats['late']} late at {stats['fps']} fps, {stats['depth']} bit")
+
 class MultiviewerThread(threading.Thread):
     """A thread for managing the connection to Multiviewer for F1."""
-    def __init__(self, action_queue, status_queue):
+    RECORD_FLUSH_INTERVAL = 5.0 # Seconds between flushes of the recording, flushing every state weakens the compression
+
+    def __init__(self, action_queue, status_queue, record_path=None):
         super().__init__()
         self.action_queue = action_queue
         self.status_queue = status_queue
+        self.record_path = record_path # Gzipped JSONL of every distinct live timing state, None to not record
+        self.last_flush = time.monotonic()
         self.daemon = True
         self._stop_event = threading.Event()
 
     def stop(self):
         self._stop_event.set()
 
+    def record_state(self, recording, state, started, last_recorded):
+        """Appends a state to the recording if it differs from the last one. Returns the recorded JSON."""
+        encoded = json.dumps(state, sort_keys=True)
+        if encoded != last_recorded:
+            recording.write(json.dumps({'t': round(time.monotonic() - started, 3), 'state': state}) + "\n")
+        if time.monotonic() - self.last_flush >= self.RECORD_FLUSH_INTERVAL:
+            # Readable up to here even if the app does not exit cleanly
+            recording.flush()
+            self.last_flush = time.monotonic()
+        return encoded
+
     def run(self):
         url = "http://127.0.0.1:10101/api/graphql"
         graphql_query = {
@@ -149,6 +499,14 @@ class MultiviewerThread(threading.Thread):
         last_status = None
         error_logged = False
         processed_messages = set()
+        recording = None
+        last_recorded = None
+        started = time.monotonic()
+        if self.record_path:
+            os.makedirs(os.path.dirname(self.record_path) or ".", exist_ok=True)
+            recording = gzip.open(self.record_path, 'at', encoding='utf-8')
+            self.last_flush = time.monotonic()
+            print(f"Recording Multiviewer session to {self.record_path}")
 
         while not self._stop_event.is_set():
             sleep_duration = 0.1  # Faster polling for quicker response
@@ -162,6 +520,8 @@ class MultiviewerThread(threading.Thread):
                     if not live_timing_state:
                         time.sleep(0.5)
                         continue
+                    if recording:
+                        last_recorded = self.record_state(recording, live_timing_state, started, last_recorded)
 
                     track_status = live_timing_state.get("TrackStatus") or {}
                     status = str(track_status.get("Status", ""))
@@ -196,25 +556,123 @@ class MultiviewerThread(threading.Thread):
                 sleep_duration = 1.0
             
             time.sleep(sleep_duration)
+        if recording:
+            recording.close()
         print("Multiviewer thread finished.")
         self.status_queue.put("MV_STATUS_DISABLED") # Ensure status is updated on exit
 
 class SpotifyThread(threading.Thread):
     """A thread for managing the connection to Spotify."""
-    def __init__(self, action_queue, status_queue, client_id, client_secret, redirect_uri):
+    ART_WARM_INTERVAL = 120 # Seconds between cache warming runs
+    ART_WARM_LIMIT = 20 # Albums rendered per warming run
+
+    def __init__(self, action_queue, status_queue, client_id, client_secret, redirect_uri, get_art_profiles, art_cache, clock=time.monotonic, wait=None):
         super().__init__()
         self.action_queue = action_queue
         self.status_queue = status_queue
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
+        self.get_art_profiles = get_art_profiles # Returns {profile_key: render settings} for connected devices
+        self.art_cache = art_cache # Rendered art keyed by "album_id:profile_key"
         self.daemon = True
         self._stop_event = threading.Event()
         self.sp = None
+        self.warm_thread = None
+        self.clock = clock
+        self.wait = wait or self._stop_event.wait # Returns early when the thread is stopped
+        self.scheduler = poll.SpotifyPollScheduler(clock)
 
     def stop(self):
         self._stop_event.set()
 
+    @staticmethod
+    def pick_album_image(images, size):
+        """Returns the URL of the smallest cover that is at least size x size (or the largest one)."""
+        def side(entry):
+            return min(entry.get('width') or 0, entry.get('height') or 0)
+        large_enough = [entry for entry in images if side(entry) >= size]
+        if large_enough:
+            return min(large_enough, key=side)['url']
+        return max(images, key=side)['url']
+
+    def render_album_art(self, image_data, profiles):
+        """Renders the cover once per device profile, straight to each device's geometry."""
+        art = {}
+        for key, profile in profiles.items():
+            art[key] = image.render_album_art_for_device(image_data, **profile)
+        return art
+
+    def get_album_art(self, album, profiles, client):
+        """Returns ({profile_key: gif}, source) for an album. Only profiles missing from the cache are downloaded and rendered."""
+        album_id = album.get('id')
+        art = {}
+        missing = {}
+        for key, profile in profiles.items():
+            cached = self.art_cache.get(f"{album_id}:{key}") if album_id else None
+            if cached is None:
+                missing[key] = profile
+            else:
+                art[key] = cached
+        images = album.get('images', [])
+        if not missing or not images:
+            return art, None
+
+        # Download the smallest cover that still covers the largest panel
+        size = max(image.album_art_size(p['max_width'], p['max_height'], p['duplicate_horizontally']) for p in missing.values())
+        response = client.get(self.pick_album_image(images, size))
+        response.raise_for_status()
+        image_data = response.content
+
+        rendered = self.render_album_art(image_data, missing)
+        if album_id:
+            for key, gif_data in rendered.items():
+                self.art_cache.put(f"{album_id}:{key}", gif_data)
+        art.update(rendered)
+        return art, image_data
+
+    def warm_art_cache(self):
+        """Renders the covers of queued and recently played tracks ahead of time."""
+        profiles = self.get_art_profiles()
+        if not profiles:
+            return
+        albums = {}
+        try:
+            for item in (self.sp.queue() or {}).get('queue', []):
+                album = item.get('album') # Episodes have no album
+                if album and album.get('id'):
+                    albums.setdefault(album['id'], album)
+        except Exception as e:
+            print(f"[Spotify] Could not read the playback queue: {e}")
+        try:
+            for entry in (self.sp.current_user_recently_played(limit=self.ART_WARM_LIMIT) or {}).get('items', []):
+                album = (entry.get('track') or {}).get('album')
+                if album and album.get('id'):
+                    albums.setdefault(album['id'], album)
+        except Exception as e:
+            print(f"[Spotify] Could not read recently played tracks: {e}")
+
+        warmed = 0
+        with httpx.Client() as client:
+            for album in list(albums.values())[:self.ART_WARM_LIMIT]:
+                if self._stop_event.is_set():
+                    break
+                try:
+                    _, source = self.get_album_art(album, profiles, client)
+                    if source is not None:
+                        warmed += 1
+                except Exception as e:
+                    print(f"[Spotify] Could not warm album art for {album.get('name')}: {e}")
+        self.art_cache.flush()
+        if warmed:
+            print(f"[Spotify] Warmed album art cache with {warmed} album(s).")
+
+    def start_cache_warming(self):
+        if self.warm_thread and self.warm_thread.is_alive():
+            return
+        self.warm_thread = threading.Thread(target=self.warm_art_cache, daemon=True)
+        self.warm_thread.start()
+
     def run(self):
         print("[Spotify] Thread started.")
         if not all([self.client_id, self.client_secret, self.redirect_uri]):
@@ -227,7 +685,7 @@ class SpotifyThread(threading.Thread):
                 client_id=self.client_id,
                 client_secret=self.client_secret,
                 redirect_uri=self.redirect_uri,
-                scope="user-read-currently-playing",
+                scope="user-read-currently-playing user-read-playback-state user-read-recently-played",
                 open_browser=webbrowser.open
             )
             self.sp = spotipy.Spotify(auth_manager=auth_manager)
@@ -241,10 +699,16 @@ class SpotifyThread(threading.Thread):
             return
 
         last_track_id = None # Initialize to None to force the first fetch
+        last_warm = None
         while not self._stop_event.is_set():
+            if last_warm is None or self.clock() - last_warm >= self.ART_WARM_INTERVAL:
+                last_warm = self.clock()
+                self.start_cache_warming()
             try:
                 # print("[Spotify] Polling for current track...") # This can be noisy, uncomment if needed
+                request_started = self.clock()
                 current_track = self.sp.current_user_playing_track()
+                previous_track_id = last_track_id
                 track_id = None
                 if current_track and current_track.get('item'):
                     track_id = current_track['item']['id']
@@ -261,47 +725,36 @@ class SpotifyThread(threading.Thread):
                     print(f"[Spotify] New track detected: {track_name}")
 
                     # Check if album art exists before trying to access it
-                    images = current_track['item']['album'].get('images', [])
+                    album = current_track['item']['album']
+                    images = album.get('images', [])
                     if images:
-                        album_art_url = images[0]['url']
-                        print("[Spotify] Downloading album art...")
-                        with httpx.Client() as client:
-                            response = client.get(album_art_url)
-                            response.raise_for_status()
-                            image_data = response.content
-
-                        # Use PIL to open from bytes and save as a proper PNG to avoid format issues
                         try:
-                            img = Image.open(io.BytesIO(image_data))
-                            # Resize the image to 64x64 before saving
-                            resized_img = img.resize((64, 64), Image.Resampling.LANCZOS).convert("RGBA")
-                            # Optimize image by converting to a paletted format with 255 colors + transparency
-                            # This significantly reduces file size for faster transfer.
-                            try:
-                                # This can fail on some images with complex palettes
-                                optimized_img = resized_img.quantize(colors=255, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.FLOYDSTEINBERG)
-                            except Exception as quantize_error:
-                                print(f"[Spotify] WARNING: Could not quantize image, falling back to RGBA. Error: {quantize_error}")
-                                optimized_img = resized_img # Use the unoptimized RGBA image as a fallback
-                            # Save in the same directory as the script to ensure a consistent location
-                            with io.BytesIO() as output:
-                                optimized_img.save(output, format="GIF", disposal=2) # Use disposal=2 for single-frame GIFs
-                                optimized_img.save(output, format="GIF", disposal=2)  # Use disposal=2 for single-frame GIFs
-                                self.action_queue.put(output.getvalue())
-                            print("[Spotify] Album art resized, optimized as GIF, and queued for display.")
+                            with httpx.Client() as client:
+                                art, image_data = self.get_album_art(album, self.get_art_profiles(), client)
+                            self.action_queue.put({'album_id': album.get('id'), 'source': image_data, 'art': art})
+                            if image_data is None:
+                                print(f"[Spotify] Album art for {len(art)} device profile(s) served from cache.")
+                            else:
+                                print(f"[Spotify] Album art rendered for {len(art)} device profile(s) and queued for display.")
                         except Exception as pil_e:
                             print(f"[Spotify] ERROR: Could not process album art with PIL: {pil_e}") # pragma: no cover
                     else:
                         print(f"[Spotify] No album art found for track: {track_name}")
 
+                delay = self.scheduler.next_delay(current_track, track_id != previous_track_id, request_started)
             except Exception as e:
                 print(f"[Spotify] ERROR: An error occurred in the polling loop: {e}")
                 last_track_id = None # Reset on error to allow re-fetching
-            
-            time.sleep(3) # Poll every 3 seconds
-        print("[Spotify] Thread finished.")
+                delay = self.scheduler.error_delay()
+
+            self.wait(delay)
+        print(f"[Spotify] Thread finished after {self.scheduler.polls} polls.")
 
 class App(ttk.Window):
+    SEEN_MAX_AGE = 10.0 # Seconds an advertisement is good for connecting without discovery
+    SCAN_FALLBACK = 8.0 # Seconds to wait for a saved device to advertise before connecting by address
+    SCAN_WINDOW = 15.0 # Seconds a requested scan runs, afterwards the scanner only runs while a device is awaited
+
     def __init__(self):
         # Use ttkbootstrap Window with the 'superhero' dark theme
         super().__init__(themename="darkly")
@@ -345,8 +798,26 @@ class App(ttk.Window):
 
         # self.current_device_address = None # Replaced by multi-device support
         self.is_sending_art = False # Lock to prevent album art spam
-        self.gif_stop_timers = {} # Dictionary to hold stop timers for each device
+        self.diy_active = set() # Devices currently showing the DIY buffer
+        self.diy_framebuffers = {} # Address -> DiyFramebuffer of what the DIY buffer shows, absent when unknown
+        self.stream_threads = {} # Address -> StreamThread playing into the DIY buffer
+        self.sync_switch_var = tk.BooleanVar() # Stage GIFs on all devices, then switch them together
+        self.sync_skews = [] # Measured skew (ms) of recent synchronized switches
+        self.mv_record_var = tk.BooleanVar() # Record Multiviewer sessions for mv_replay.py
+        self.remocon_slots = {} # Assets stored in each device's remocon slots
+        self.playlist_devices = set() # Devices cycling a playlist, ended by the next content
+        self.buffer_manifest = manifest.BufferManifest("buffer_manifest.json") # What each device holds in which buffer
+        self.reconnect = reconnect.ReconnectSupervisor() # Also knows the devices the user disconnected, not to be reconnected
+        self.reconnect_timers = {} # Address -> pending reconnect timer
+        self.display_state = {} # Address -> (kind, value) of the last thing shown, replayed after a reconnect
+        self.device_registry = bluetooth.DeviceRegistry() # Advertising panels, kept up to date by the scanner
+        # A saved device we are waiting for is advertising
+        self.scanner = bluetooth.ContinuousScanner(self.device_registry, lambda address: self.status_queue.put(f"SCAN_SEEN:{address}"))
+        self.scanner_thread = None
+        self.scan_until = 0.0 # Clock time the current requested scan ends
         self.config_file = "ipixel_config.json"
+        self.art_cache = cache.PayloadCache("album_art_cache") # Rendered album art, survives restarts
+        self.wall_cache = cache.PayloadCache("wall_cache") # Rendered wall panels, keyed per panel
         self.startup_actions_done = False # Flag to ensure startup actions run only once
         self.load_config()
 
@@ -410,6 +881,8 @@ class App(ttk.Window):
 
         # Automatically populate device list and connect to saved devices on startup
         self.after(100, self.populate_tree_from_config)
+        self.after(100, self.start_scanner, self.SCAN_WINDOW)
+        self.after(1000, self.refresh_device_registry)
         if self.device_configs:
             self.after(200, self.start_connection_process)
         else:
@@ -426,6 +899,8 @@ class App(ttk.Window):
         self.is_mv_enabled = tk.BooleanVar(value=False)
         self.mv_checkbutton = ttk.Checkbutton(mv_frame, text="Enable Multiviewer Integration", variable=self.is_mv_enabled, command=self.toggle_multiviewer)
         self.mv_checkbutton.pack(anchor="w")
+        # Recordings can be served again with mv_replay.py, applies from the next start
+        ttk.Checkbutton(mv_frame, text="Record sessions", variable=self.mv_record_var, command=self.save_config).pack(anchor="w")
 
         self.mv_status_var = tk.StringVar(value="Disabled")
         self.mv_status_label = ttk.Label(mv_frame, textvariable=self.mv_status_var, bootstyle="secondary")
@@ -482,8 +957,11 @@ class App(ttk.Window):
         send_notebook.add(self.png_frame, text='Image (PNG/JPG)')
         self.gif_frame = ttk.Frame(send_notebook)
         send_notebook.add(self.gif_frame, text='Animation (GIF)')
+        self.text_frame = ttk.Frame(send_notebook)
+        send_notebook.add(self.text_frame, text='Text')
         self.setup_png_tab()
         self.setup_gif_tab()
+        self.setup_text_tab()
 
         self.debug_gif_frame = ttk.LabelFrame(mv_debug_tab, text="Quick Send GIFs")
         self.debug_gif_frame.grid(row=2, column=0, sticky="ew", pady=5)
@@ -497,6 +975,12 @@ class App(ttk.Window):
         self.erase_button.grid(row=0, column=1, padx=5, sticky="ew")
         self.write_button = ttk.Button(action_frame, text="Write to All Devices", command=self.start_write, bootstyle="primary")
         self.write_button.grid(row=0, column=0, padx=5, sticky="ew")
+        # One image tiled across the panels of the wall layout in the config file
+        ttk.Button(action_frame, text="Write to Wall", command=self.start_wall_write, bootstyle="primary-outline").grid(row=1, column=0, columnspan=2, padx=5, pady=(5, 0), sticky="ew")
+        # Stage GIFs on every device first, then switch all of them at once
+        ttk.Checkbutton(action_frame, text="Switch all panels together", variable=self.sync_switch_var, command=self.save_config).grid(row=2, column=0, columnspan=2, padx=5, pady=(5, 0), sticky="w")
+        # Selected files as a slideshow the device cycles through by itself
+        ttk.Button(action_frame, text="Play as Device Slideshow", command=self.start_playlist, bootstyle="primary-outline").grid(row=3, column=0, columnspan=2, padx=5, pady=(5, 0), sticky="ew")
 
     def setup_devices_window(self, parent):
         """Populate the Devices tab."""
@@ -517,15 +1001,17 @@ class App(ttk.Window):
         devices_frame.columnconfigure(0, weight=1)
         devices_frame.rowconfigure(0, weight=1)
 
-        self.device_tree = ttk.Treeview(devices_frame, columns=("name", "address", "status"), show=["headings", "tree"])
+        self.device_tree = ttk.Treeview(devices_frame, columns=("name", "address", "status", "signal"), show=["headings", "tree"])
         self.device_tree.heading("name", text="Name")
         self.device_tree.heading("address", text="Address")
         self.device_tree.heading("status", text="Status")
+        self.device_tree.heading("signal", text="Signal")
         # Designate column #0 as the tree column to show images/checkboxes
         self.device_tree.column("#0", width=30, stretch=False, anchor="center")
         self.device_tree.column("name", width=150, stretch=True)
         self.device_tree.column("address", width=150)
         self.device_tree.column("status", width=100)
+        self.device_tree.column("signal", width=120)
         self.device_tree.grid(row=0, column=0, sticky="nsew")
         self.device_tree.tag_configure('checked', image=self.checked_img)
         self.device_tree.tag_configure('unchecked', image=self.unchecked_img)
@@ -576,8 +1062,60 @@ class App(ttk.Window):
         self.clock_style_combo = ttk.Combobox(self.options_frame, textvariable=self.clock_style_var, values=[str(i) for i in range(1, 9)], state=tk.DISABLED, width=5)
         self.clock_style_combo.grid(row=8, column=1, padx=5, pady=5, sticky="w")
 
+        # Add palette size entry (lower values shrink uploads on tiny panels)
+        ttk.Label(self.options_frame, text="Palette Colors (2-256):").grid(row=9, column=0, padx=5, pady=5, sticky="w")
+        self.colors_entry = ttk.Entry(self.options_frame, state=tk.DISABLED)
+        self.colors_entry.grid(row=9, column=1, padx=5, pady=5, sticky="ew")
+
+        # Add upload time budget entry (0 disables the budget)
+        ttk.Label(self.options_frame, text="Upload Time Budget (s):").grid(row=10, column=0, padx=5, pady=5, sticky="w")
+        self.time_budget_entry = ttk.Entry(self.options_frame, state=tk.DISABLED)
+        self.time_budget_entry.grid(row=10, column=1, padx=5, pady=5, sticky="ew")
+
+        # Add resampling combobox (auto keeps pixel art crisp)
+        ttk.Label(self.options_frame, text="Resampling:").grid(row=11, column=0, padx=5, pady=5, sticky="w")
+        self.resample_var = tk.StringVar()
+        self.resample_combo = ttk.Combobox(self.options_frame, textvariable=self.resample_var, values=list(image.RESAMPLE_MODES), state=tk.DISABLED, width=10)
+        self.resample_combo.grid(row=11, column=1, padx=5, pady=5, sticky="w")
+
+        # Add placeholder combobox (shown from the DIY buffer while large uploads run)
+        ttk.Label(self.options_frame, text="Upload Placeholder:").grid(row=12, column=0, padx=5, pady=5, sticky="w")
+        self.placeholder_var = tk.StringVar()
+        self.placeholder_combo = ttk.Combobox(self.options_frame, textvariable=self.placeholder_var, values=list(image.PLACEHOLDER_MODES), state=tk.DISABLED, width=10)
+        self.placeholder_combo.grid(row=12, column=1, padx=5, pady=5, sticky="w")
+
+        # Add temporary album art checkbox (album art goes to the DIY buffer instead of flash)
+        self.temporary_art_var = tk.BooleanVar()
+        self.temporary_art_check = ttk.Checkbutton(self.options_frame, text="Send album art to temporary DIY buffer", variable=self.temporary_art_var, state=tk.DISABLED)
+        self.temporary_art_check.grid(row=13, column=1, padx=5, pady=5, sticky="w")
+
+        # Add DIY pixel checkbox (small DIY changes as repeated set_pixel batches instead of a PNG, batching is unverified)
+        self.diy_pixels_var = tk.BooleanVar()
+        self.diy_pixels_check = ttk.Checkbutton(self.options_frame, text="Send small DIY changes as pixels (experimental)", variable=self.diy_pixels_var, state=tk.DISABLED)
+        self.diy_pixels_check.grid(row=14, column=1, padx=5, pady=5, sticky="w")
+
+        # Add remocon slot budget (flags kept in remocon slots are shown with a screen switch, spare slots prefetch likely next flags, 0 disables)
+        ttk.Label(self.options_frame, text="Remocon Slots (0-9):").grid(row=15, column=0, padx=5, pady=5, sticky="w")
+        self.remocon_slots_entry = ttk.Entry(self.options_frame, state=tk.DISABLED)
+        self.remocon_slots_entry.grid(row=15, column=1, padx=5, pady=5, sticky="ew")
+
+        # Add flag label checkbox (flag icon plus its name as device-drawn text, one mix upload)
+        self.mv_labels_var = tk.BooleanVar()
+        self.mv_labels_check = ttk.Checkbutton(self.options_frame, text="Label Multiviewer flags with text", variable=self.mv_labels_var, state=tk.DISABLED)
+        self.mv_labels_check.grid(row=16, column=1, padx=5, pady=5, sticky="w")
+
+        # Add keep buffers checkbox (skip the erase on connect while the buffer manifest matches the firmware and free space)
+        self.keep_buffers_var = tk.BooleanVar()
+        self.keep_buffers_check = ttk.Checkbutton(self.options_frame, text="Keep buffers between sessions", variable=self.keep_buffers_var, state=tk.DISABLED)
+        self.keep_buffers_check.grid(row=17, column=1, padx=5, pady=5, sticky="w")
+
+        # Add identify checkbox (opt-in: set_current_time on connect reports the LED type, but also powers the panel on)
+        self.identify_on_connect_var = tk.BooleanVar()
+        self.identify_on_connect_check = ttk.Checkbutton(self.options_frame, text="Identify panel type on connect (turns the panel on)", variable=self.identify_on_connect_var, state=tk.DISABLED)
+        self.identify_on_connect_check.grid(row=18, column=1, padx=5, pady=5, sticky="w")
+
         # Add save button for device config
-        ttk.Button(self.options_frame, text="Save Options", command=self.save_device_options, state=tk.DISABLED, bootstyle="success").grid(row=9, column=1, sticky="e", padx=5, pady=5)
+        ttk.Button(self.options_frame, text="Save Options", command=self.save_device_options, state=tk.DISABLED, bootstyle="success").grid(row=19, column=1, sticky="e", padx=5, pady=5)
 
     def setup_png_tab(self):
         self.join_files_var = tk.BooleanVar()
@@ -594,6 +1132,38 @@ class App(ttk.Window):
         self.duration_entry.insert(0, "100")
         self.duration_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
 
+    def setup_text_tab(self):
+        self.text_frame.columnconfigure(1, weight=1)
+        ttk.Label(self.text_frame, text="Text:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.text_entry = ttk.Entry(self.text_frame)
+        self.text_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+        ttk.Label(self.text_frame, text="Effect:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        self.text_effect_var = tk.StringVar(value=DEFAULT_TEXT_STYLE['effect'])
+        ttk.Combobox(self.text_frame, textvariable=self.text_effect_var, values=list(set_text.EFFECTS), state="readonly").grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+        ttk.Label(self.text_frame, text="Speed (1-100):").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.text_speed_entry = ttk.Entry(self.text_frame)
+        self.text_speed_entry.insert(0, str(DEFAULT_TEXT_STYLE['speed']))
+        self.text_speed_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+
+        ttk.Label(self.text_frame, text="Color (RRGGBB):").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        self.text_color_entry = ttk.Entry(self.text_frame)
+        self.text_color_entry.insert(0, DEFAULT_TEXT_STYLE['color'])
+        self.text_color_entry.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+
+        ttk.Button(self.text_frame, text="Send Text to All Devices", command=self.start_text, bootstyle="primary").grid(row=4, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+        # Static label in the DIY buffer, updates only send the pixels that changed
+        ttk.Button(self.text_frame, text="Show as Label (DIY)", command=self.start_label, bootstyle="primary-outline").grid(row=5, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+
+        # Countdown streamed frame by frame, at the rate the link sustains
+        ttk.Label(self.text_frame, text="Countdown (s):").grid(row=6, column=0, padx=5, pady=5, sticky="w")
+        self.countdown_entry = ttk.Entry(self.text_frame)
+        self.countdown_entry.insert(0, "60")
+        self.countdown_entry.grid(row=6, column=1, padx=5, pady=5, sticky="ew")
+        ttk.Button(self.text_frame, text="Stream Countdown (DIY)", command=self.start_countdown, bootstyle="primary-outline").grid(row=7, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(self.text_frame, text="Stop Stream", command=self.stop_streams, bootstyle="secondary-outline").grid(row=7, column=1, padx=5, pady=5, sticky="ew")
+
     def populate_debug_gifs(self):
         gif_dir = "gifs"
         if not os.path.isdir(gif_dir):
@@ -661,38 +1231,60 @@ class App(ttk.Window):
 
     def start_connection_process(self):
         """Starts the connection process for all saved devices."""
-        saved_addresses = self.device_configs.keys()
+        saved_addresses = [address for address in self.device_configs if not (address in self.ble_threads and self.ble_threads[address].is_alive())]
         if saved_addresses:
             self.status_label.config(text=f"Status: Reconnecting to {len(saved_addresses)} saved device(s)...")
             for address in saved_addresses:
-                self.connect_to_device(address)
+                if self.device_registry.get(address, max_age=self.SEEN_MAX_AGE):
+                    self.connect_to_device(address)
+                else:
+                    # Connect the moment it advertises, or by address if the scanner does not see it
+                    self.scanner.want(address)
+                    self.start_scanner()
+                    self.after(int(self.SCAN_FALLBACK * 1000), self.connect_if_unseen, address)
         else:
             self.status_label.config(text="Status: No saved devices to reconnect.")
 
+    def connect_if_unseen(self, address):
+        """Connects by address to a saved device the scanner has not reported."""
+        thread = self.ble_threads.get(address)
+        if self.reconnect.is_suppressed(address) or (thread and thread.is_alive()):
+            return
+        self.connect_to_device(address)
+
+    def start_scanner(self, window=0.0):
+        """Starts the continuous scanner unless it is running, keeping it on for at least window seconds."""
+        if window > 0:
+            self.scan_until = max(self.scan_until, time.monotonic() + window)
+            self.after(int(window * 1000) + 100, self.stop_scanner_if_idle)
+        if self.scanner_thread and self.scanner_thread.is_alive() and self.scanner_thread.stopping:
+            # Backends allow one scan at a time, let the stopping one finish
+            self.scanner_thread.join(timeout=1.0)
+        if not self.scanner_thread or not self.scanner_thread.is_alive():
+            self.scanner_thread = ScannerThread(self.scanner, self.status_queue)
+            self.scanner_thread.start()
+
+    def stop_scanner_if_idle(self):
+        """Stops the scanner when no scan was requested recently and no device is awaited, so it does not compete with uploads."""
+        if not self.scanner_thread or not self.scanner_thread.is_alive():
+            return
+        if time.monotonic() < self.scan_until or self.scanner.wanted():
+            return
+        print("No device awaited, stopping the scanner")
+        self.scanner_thread.stop()
+
     def start_device_scan(self):
-        """Initiates a BLE device scan in a separate thread."""
-        self.status_label.config(text="Status: No saved device. Scanning...")
+        """Makes sure the scanner runs and shows what it has found so far."""
         self.status_label.config(text="Status: Scanning for devices...")
-        scan_thread = threading.Thread(target=self._scan_and_connect_worker, daemon=True)
-        scan_thread.start()
+        self.start_scanner(self.SCAN_WINDOW)
+        self.populate_device_tree(self.device_registry.entries())
 
-    def _scan_and_connect_worker(self):
-        """The actual scanning logic that runs in a thread."""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
+    def refresh_device_registry(self):
+        """Shows newly found devices and the signal of known ones."""
         try:
-            # Discover all devices, we can filter in the main thread if needed
-            devices = loop.run_until_complete(BleakScanner.discover(timeout=5.0))
-
-            if not devices:
-                self.status_queue.put("Scan complete: No devices found.")
-            else:
-                # Let the main thread handle populating the list.
-                self.after(0, self.populate_device_tree, devices)
-                self.status_queue.put(f"Scan complete: Found {len(devices)} device(s).")
-        except Exception as e:
-            self.status_queue.put(f"Scan failed: {e}")
+            self.populate_device_tree(self.device_registry.entries())
+        finally:
+            self.after(1000, self.refresh_device_registry)
 
     def show_device_selection_dialog(self, devices):
         """Creates a Toplevel window to let the user choose a device."""
@@ -721,8 +1313,8 @@ class App(ttk.Window):
 
         ttk.Button(dialog, text="Connect", command=on_connect).pack(pady=10)
 
-    def prompt_for_device_dimensions(self, address, name):
-        """Shows a dialog to get width/height before connecting."""
+    def prompt_for_device_dimensions(self, address, name, connect=True):
+        """Shows a dialog to get width/height, before connecting or for a connected panel of unknown type."""
         dialog = ttk.Toplevel(self)
         dialog.title("Set Device Dimensions")
         dialog.transient(self)
@@ -747,24 +1339,35 @@ class App(ttk.Window):
         ttk.Label(form_frame, text="Width:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
         width_entry = ttk.Entry(form_frame)
         width_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-        width_entry.insert(0, "32")
+        width_entry.insert(0, str(self.device_configs.get(address, {}).get('width', 32)))
 
         ttk.Label(form_frame, text="Height:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
         height_entry = ttk.Entry(form_frame)
         height_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-        height_entry.insert(0, "32")
+        height_entry.insert(0, str(self.device_configs.get(address, {}).get('height', 32)))
+
+        # Sizes are only learned per LED type when the panel is identified, which is opt-in
+        identify_var = tk.BooleanVar(value=self.device_configs.get(address, {}).get('identify_on_connect', False))
+        ttk.Checkbutton(form_frame, text="Identify panel type on connect (turns the panel on)", variable=identify_var).grid(row=2, column=0, columnspan=2, padx=5, pady=5, sticky="w")
 
         def on_confirm():
             try:
                 width = int(width_entry.get())
                 height = int(height_entry.get())
-                self.device_configs[address] = {
-                    'buffer': 1, 'auto_resize': True, 'width': width, 'height': height, 
+                defaults = {
+                    'buffer': 1, 'auto_resize': True,
                     'anchor': 0x33, 'duplicate_horizontally': False,
                     'brightness': 100, 'flip_display': False, 'clock_style': 7
                 }
+                self.device_configs[address] = {**defaults, **self.device_configs.get(address, {}), 'width': width, 'height': height, 'geometry_source': 'user', 'identify_on_connect': identify_var.get()}
+                self.learn_geometry(address)
                 dialog.destroy()
-                self.connect_to_device(address)
+                if connect:
+                    self.connect_to_device(address)
+                else:
+                    self.save_config()
+                    if self.selected_device_address == address:
+                        self.update_options_form(address)
             except ValueError:
                 messagebox.showerror("Invalid Input", "Width and Height must be numbers.", parent=dialog)
 
@@ -774,39 +1377,128 @@ class App(ttk.Window):
         """Starts the main BLE communication thread for the selected device."""
         # Ensure there's a default config for this new device
         if address not in self.device_configs:
+            # The size is a placeholder until the device is identified (geometry_source)
             self.device_configs[address] = {
-                'buffer': 1, 'auto_resize': True, 'width': 96, 'height': 32, 'anchor': 0x33, 'duplicate_horizontally': False,
+                'buffer': 1, 'auto_resize': True, 'width': 96, 'height': 32, 'geometry_source': 'default', 'anchor': 0x33, 'duplicate_horizontally': False,
                 'brightness': 100, 'flip_display': False, 'clock_style': 7
             }
 
+        self.reconnect.user_connected(address)
+        self.scanner.unwant(address)
+        # A recent advertisement lets the connection skip discovery
+        entry = self.device_registry.get(address, max_age=self.SEEN_MAX_AGE)
+
         # Each device gets its own command queue for targeted commands.
         device_command_queue = queue.Queue()
-        ble_thread = BLEThread(address, device_command_queue, self.status_queue)
+        ble_thread = BLEThread(address, device_command_queue, self.status_queue, self.buffer_manifest, entry['device'] if entry else None, self.device_configs[address].get('identify_on_connect', False))
         self.ble_threads[address] = ble_thread
         ble_thread.start()
 
     def disconnect_from_device(self, address):
         """Stops the BLE thread for a specific device."""
+        # Deliberate, so do not reconnect
+        self.reconnect.user_disconnected(address)
+        self.scanner.unwant(address)
+        if address in self.reconnect_timers:
+            self.after_cancel(self.reconnect_timers.pop(address))
         if address in self.ble_threads and self.ble_threads[address].is_alive():
             self.ble_threads[address].stop()
             # The thread will emit a DISCONNECTED status on its own.
             print(f"Requested disconnect from {address}")
 
+    def apply_capabilities(self, address, name):
+        """Caches what a connected device reported and takes its size from the learned LED types (only known for identified panels)."""
+        thread = self.ble_threads[address]
+        config = self.device_configs[address]
+        time_info = thread.time_info
+        cached_led_type = config.get('capabilities', {}).get('led_type')
+        if time_info is None and cached_led_type is not None:
+            # Not identified this time, keep the LED type from an earlier connect
+            time_info = {'led_type': cached_led_type}
+        capabilities = response.make_capabilities(thread.device_info, time_info, self.panel_geometries)
+        config['capabilities'] = capabilities._asdict()
+        # Configs from before geometry_source hold sizes the user set
+        if config.get('geometry_source', 'user') == 'user':
+            # The user knows best, teach the LED type instead
+            self.learn_geometry(address)
+        elif capabilities.has_geometry:
+            if (config['width'], config['height']) != (capabilities.width, capabilities.height):
+                print(f"[{address}] LED type {capabilities.led_type} is {capabilities.width}x{capabilities.height}, was {config['width']}x{config['height']}")
+            config['width'], config['height'] = capabilities.width, capabilities.height
+            config['geometry_source'] = 'device'
+            if self.selected_device_address == address:
+                self.update_options_form(address)
+        elif config.get('geometry_source') == 'default':
+            # Unknown or unidentified panel type, ask once (panels of this type are only detected later if they are identified)
+            self.after(0, self.prompt_for_device_dimensions, address, name, False)
+
+    def learn_geometry(self, address):
+        """Remembers the size the user set for a device as the size of its LED type."""
+        config = self.device_configs.get(address, {})
+        led_type = config.get('capabilities', {}).get('led_type')
+        if led_type is not None and config.get('geometry_source', 'user') == 'user':
+            self.panel_geometries[str(led_type)] = [config['width'], config['height']]
+
+    def schedule_reconnect(self, address):
+        """Retries a dropped device after the supervisor's backoff delay."""
+        if self.reconnect.is_suppressed(address) or address not in self.device_configs or address in self.reconnect_timers:
+            return
+        if not self.reconnect.is_recovering(address):
+            # Just dropped: also connect the moment it advertises again (once, retries stay on the backoff)
+            self.scanner.want(address)
+            self.start_scanner()
+        self.reconnect.lost(address)
+        delay = self.reconnect.next_delay(address)
+        attempt = self.reconnect.attempts(address)
+        print(f"[{address}] Reconnect attempt {attempt} in {delay:.1f} s")
+        self.status_label.config(text=f"Status: Lost {address}, reconnecting in {delay:.0f} s (attempt {attempt}).")
+        self.reconnect_timers[address] = self.after(int(delay * 1000), self.attempt_reconnect, address)
+
+    def attempt_reconnect(self, address):
+        """Starts a new connection for a dropped device, unless it is back already."""
+        self.reconnect_timers.pop(address, None)
+        thread = self.ble_threads.get(address)
+        if self.reconnect.is_suppressed(address) or (thread and thread.is_alive()):
+            return
+        self.connect_to_device(address)
+
+    def resume_display_state(self, address):
+        """Replays brightness, orientation and the last shown content on a reconnected device."""
+        config = self.device_configs.get(address, {})
+        thread = self.ble_threads[address]
+        self.queue_command_for_device(address, argparse.Namespace(brightness=int(config.get('brightness', 100))), set_brightness.make, "Restore Brightness")
+        self.queue_command_for_device(address, argparse.Namespace(upside_down=config.get('flip_display', False)), set_upside_down.make, "Restore Orientation")
+        kind, value = self.display_state.get(address, ('write', {'image_source': ("gifs/mv.gif",)}))
+        if kind == 'art':
+            self.send_album_art_to_device(address, thread, value)
+        elif kind == 'clock':
+            self.send_clock_command_to_device(address, value)
+        elif kind == 'wall':
+            self.send_wall(value, [address])
+        elif kind == 'playlist':
+            self.send_playlist(list(value), [address])
+        elif kind == 'write':
+            self.write_to_device(address, thread, **value)
+        else:
+            self.show_content(address, thread, value)
+
     def disconnect_all_devices(self):
         for address in list(self.ble_threads.keys()):
             self.disconnect_from_device(address)
 
-    def populate_device_tree(self, devices):
-        """Adds newly discovered devices to the Treeview without clearing it."""
-        # Filter for devices that are likely iPixel displays and not already in the tree
-        new_devices = [d for d in devices if d.name and ("iPixel" in d.name or "LED" in d.name) and not self.device_tree.exists(d.address)]
-        
-        for device in new_devices:
+    def populate_device_tree(self, entries):
+        """Adds newly discovered devices to the Treeview and updates their signal, without clearing it."""
+        now = time.monotonic()
+        for address, entry in entries.items():
+            signal = f"{entry['rssi']} dBm, {now - entry['last_seen']:.0f} s ago" if entry['rssi'] is not None else f"{now - entry['last_seen']:.0f} s ago"
+            if self.device_tree.exists(address):
+                self.device_tree.set(address, "signal", signal)
+                continue
             # Check if it's already connected
-            is_connected = device.address in self.ble_threads and self.ble_threads[device.address].is_alive()
+            is_connected = address in self.ble_threads and self.ble_threads[address].is_alive()
             tag = 'checked' if is_connected else 'unchecked'
             status = "Connected" if is_connected else "Disconnected"
-            self.device_tree.insert("", "end", iid=device.address, values=(device.name, device.address, status), tags=(tag,))
+            self.device_tree.insert("", "end", iid=address, values=(entry['name'], address, status, signal), tags=(tag,))
 
     def on_device_tree_click(self, event):
         """Handle clicks on the device tree to toggle connection or select for options."""
@@ -830,13 +1522,8 @@ class App(ttk.Window):
             if 'checked' in current_tags:
                 self.disconnect_from_device(item_id)
             elif 'unchecked' in current_tags:
-                # If we don't have a config, prompt for one first.
-                if item_id not in self.device_configs or 'width' not in self.device_configs[item_id]:
-                    device_name = self.device_tree.item(item_id, "values")[0]
-                    self.prompt_for_device_dimensions(item_id, device_name)
-                else:
-                    # If config exists (from a saved session), connect directly.
-                    self.connect_to_device(item_id)
+                # Unknown panels are asked for their size once connected, if their LED type is not known
+                self.connect_to_device(item_id)
 
 
     def update_options_form(self, address):
@@ -877,6 +1564,39 @@ class App(ttk.Window):
             self.clock_style_var.set(str(config.get('clock_style', 7)))
             self.clock_style_combo.config(state=state)
 
+            self.colors_entry.config(state=state)
+            self.colors_entry.delete(0, tk.END)
+            self.colors_entry.insert(0, str(config.get('colors', 256)))
+
+            self.time_budget_entry.config(state=state)
+            self.time_budget_entry.delete(0, tk.END)
+            self.time_budget_entry.insert(0, str(config.get('time_budget', 0)))
+
+            self.resample_var.set(config.get('resample', image.RESAMPLE_AUTO))
+            self.resample_combo.config(state=state)
+
+            self.placeholder_var.set(config.get('placeholder', image.PLACEHOLDER_OFF))
+            self.placeholder_combo.config(state=state)
+
+            self.temporary_art_var.set(config.get('temporary_art', True))
+            self.temporary_art_check.config(state=state)
+
+            self.diy_pixels_var.set(config.get('diy_pixels', False))
+            self.diy_pixels_check.config(state=state)
+
+            self.remocon_slots_entry.config(state=state)
+            self.remocon_slots_entry.delete(0, tk.END)
+            self.remocon_slots_entry.insert(0, str(config.get('remocon_slots', 0)))
+
+            self.mv_labels_var.set(config.get('mv_labels', False))
+            self.mv_labels_check.config(state=state)
+
+            self.keep_buffers_var.set(config.get('keep_buffers', True))
+            self.keep_buffers_check.config(state=state)
+
+            self.identify_on_connect_var.set(config.get('identify_on_connect', False))
+            self.identify_on_connect_check.config(state=state)
+
             self.options_frame.winfo_children()[-1].config(state=state) # Enable save button
         else:
             state = tk.DISABLED
@@ -893,6 +1613,7 @@ class App(ttk.Window):
             return
         
         brightness_val = self.brightness_var.get()
+        self.device_configs[self.selected_device_address]['brightness'] = brightness_val # Replayed after a reconnect
         params = argparse.Namespace(brightness=brightness_val)
         self.queue_command_for_device(self.selected_device_address, params, set_brightness.make, "Set Brightness")
         self.resend_current_mv_action()
@@ -903,6 +1624,7 @@ class App(ttk.Window):
             return
         
         is_flipped = self.flip_display_var.get()
+        self.device_configs[self.selected_device_address]['flip_display'] = is_flipped # Replayed after a reconnect
         params = argparse.Namespace(upside_down=is_flipped)
         self.queue_command_for_device(self.selected_device_address, params, set_upside_down.make, "Set Orientation")
         self.resend_current_mv_action()
@@ -912,6 +1634,10 @@ class App(ttk.Window):
         if not self.selected_device_address:
             return
         try:
+            if self.resample_var.get() not in image.RESAMPLE_MODES:
+                raise ValueError(f"Resampling must be one of {', '.join(image.RESAMPLE_MODES)}")
+            if self.placeholder_var.get() not in image.PLACEHOLDER_MODES:
+                raise ValueError(f"Placeholder must be one of {', '.join(image.PLACEHOLDER_MODES)}")
             config = {
                 'buffer': int(self.buffer_entry.get()),
                 'auto_resize': self.auto_resize_var.get(),
@@ -921,9 +1647,31 @@ class App(ttk.Window):
                 'duplicate_horizontally': self.duplicate_h_var.get(),
                 'brightness': self.brightness_var.get(),
                 'flip_display': self.flip_display_var.get(),
-                'clock_style': int(self.clock_style_var.get())
+                'clock_style': int(self.clock_style_var.get()),
+                'colors': int(self.colors_entry.get()),
+                'time_budget': float(self.time_budget_entry.get()),
+                'resample': self.resample_var.get(),
+                'placeholder': self.placeholder_var.get(),
+                'temporary_art': self.temporary_art_var.get(),
+                'diy_pixels': self.diy_pixels_var.get(),
+                'remocon_slots': int(self.remocon_slots_entry.get()),
+                'mv_labels': self.mv_labels_var.get(),
+                'keep_buffers': self.keep_buffers_var.get(),
+                'identify_on_connect': self.identify_on_connect_var.get()
             }
-            self.device_configs[self.selected_device_address] = config
+            if config['remocon_slots'] < 0 or config['remocon_slots'] > common.REMOCON_COUNT:
+                raise ValueError(f"Remocon slots must be between 0 and {common.REMOCON_COUNT}")
+            slots = self.remocon_slots.get(self.selected_device_address)
+            if slots and slots.budget != config['remocon_slots']:
+                # Slots beyond a smaller budget may still hold assets, start over
+                self.cancel_prefetch(self.selected_device_address)
+                self.remocon_slots[self.selected_device_address] = remocon.RemoconSlots(config['remocon_slots'])
+            previous = self.device_configs.get(self.selected_device_address, {})
+            if (config['width'], config['height']) != (previous.get('width'), previous.get('height')):
+                config['geometry_source'] = 'user'
+            # Keep settings that have no widget (e.g. placeholder_threshold)
+            self.device_configs[self.selected_device_address] = {**previous, **config}
+            self.learn_geometry(self.selected_device_address)
             self.save_config()
             self.status_label.config(text=f"Status: Saved options for {self.selected_device_address}")
         except ValueError as e:
@@ -935,14 +1683,30 @@ class App(ttk.Window):
             with open(self.config_file, 'r') as f:
                 config_data = json.load(f)
                 self.device_configs = config_data.get('device_configs', {})
+                for config in self.device_configs.values():
+                    # The slot budget was saved as prefetch_slots before
+                    if 'prefetch_slots' in config:
+                        config.setdefault('remocon_slots', config.pop('prefetch_slots'))
                 # Load Spotify config if it exists
                 spotify_config = config_data.get('spotify_config', {})
                 self.spotify_client_id = spotify_config.get('client_id', '')
                 self.spotify_client_secret = spotify_config.get('client_secret', '')
+                self.gif_hold_after = {**DEFAULT_GIF_HOLD_AFTER, **config_data.get('gif_hold_after', {})}
+                self.mv_debouncer = flags.FlagDebouncer(config_data.get('mv_policy', {}))
+                self.panel_geometries = config_data.get('panel_geometries', {})
+                self.wall_config = config_data.get('wall_layout', {})
+                self.sync_switch_var.set(config_data.get('sync_switch', False))
+                self.mv_record_var.set(config_data.get('mv_record', False))
+                self.playlist = playlist.Playlist(assignments=config_data.get('playlist_buffers', {}))
                 print(f"Loaded device configs for: {list(self.device_configs.keys())}")
         except (FileNotFoundError, json.JSONDecodeError):
             print("No config file found or it's invalid. Will scan for devices.")
             self.device_configs = {}
+            self.gif_hold_after = dict(DEFAULT_GIF_HOLD_AFTER)
+            self.mv_debouncer = flags.FlagDebouncer()
+            self.panel_geometries = {}
+            self.wall_config = {}
+            self.playlist = playlist.Playlist()
 
     def save_config(self):
         """Saves the current device address to the config file."""
@@ -954,7 +1718,13 @@ class App(ttk.Window):
                     'spotify_config': {
                         'client_id': getattr(self, 'spotify_client_id', ''),
                         'client_secret': getattr(self, 'spotify_client_secret', '')
-                    }
+                    },
+                    'gif_hold_after': self.gif_hold_after,
+                    'panel_geometries': self.panel_geometries,
+                    'wall_layout': self.wall_config,
+                    'sync_switch': self.sync_switch_var.get(),
+                    'playlist_buffers': self.playlist.assignments,
+                    'mv_record': self.mv_record_var.get()
                 }
                 json.dump(config_data, f, indent=4)
                 print(f"Saved config file: {self.config_file}")
@@ -984,7 +1754,9 @@ class App(ttk.Window):
         self.spotify_thread = SpotifyThread(
             self.spotify_action_queue, self.status_queue,
             self.spotify_client_id, self.spotify_client_secret,
-            "http://127.0.0.1:8888/callback" # Standard redirect URI
+            "http://127.0.0.1:8888/callback", # Standard redirect URI
+            self.get_album_art_profiles,
+            self.art_cache
         )
         self.spotify_thread.start()
         self.spotify_status_var.set("Connecting...")
@@ -1081,7 +1853,9 @@ class App(ttk.Window):
     def toggle_multiviewer(self):
         if self.is_mv_enabled.get():
             if not self.mv_thread or not self.mv_thread.is_alive():
-                self.mv_thread = MultiviewerThread(self.mv_action_queue, self.status_queue)
+                record_path = os.path.join(MV_SESSION_DIR, datetime.now().strftime("session-%Y%m%d-%H%M%S.jsonl.gz")) if self.mv_record_var.get() else None
+                self.mv_thread = MultiviewerThread(self.mv_action_queue, self.status_queue, record_path)
+                self.mv_debouncer.reset() # The start GIF replaces whatever flag was shown
                 self.mv_thread.start()
                 print("Multiviewer thread started.")
                 self.send_gif_from_path("gifs/mv.gif")
@@ -1100,6 +1874,14 @@ class App(ttk.Window):
             self._check_and_set_idle_state()
 
 
+    def split_address(self, text):
+        """Splits "ADDRESS:detail" where both the address and the detail may contain colons."""
+        for address in list(self.ble_threads) + list(self.device_configs):
+            if text == address or text.startswith(address + ':'):
+                return address, text[len(address) + 1:]
+        address, _, detail = text.rpartition(':')
+        return (address, detail) if address else (text, '')
+
     def process_status_queue(self):
         """Check for new status messages and update the GUI."""
         try:
@@ -1117,6 +1899,12 @@ class App(ttk.Window):
                     # Otherwise, just update its status.
                     self.device_tree.item(address, values=(name, address, "Connected"), tags=('checked',))
                 self.status_label.config(text=f"Status: Connected to {name} ({address}).")
+                self.stop_scanner_if_idle()
+                recovery = self.reconnect.recovered(address)
+                if recovery:
+                    seconds, attempts = recovery
+                    print(f"[{address}] Recovered after {seconds:.1f} s and {attempts} attempt(s) ({self.reconnect.summary()})")
+                    self.status_label.config(text=f"Status: Reconnected to {name} after {seconds:.1f} s.")
 
                 # Run startup actions on first successful connection
                 if not self.startup_actions_done and self.is_mv_enabled.get() == False:
@@ -1124,31 +1912,68 @@ class App(ttk.Window):
                     self.toggle_multiviewer()
                     self.startup_actions_done = True
                 
-                # Erase the device's memory before sending the initial GIF
-                erase_params = argparse.Namespace(erase_all=True, buffer=[])
-                self.queue_command_for_device(address, erase_params, erase_data.make, f"Erase on connect for {address}")
+                # A fresh connection starts outside DIY mode, with erased slots
+                self.diy_active.discard(address)
+                self.diy_framebuffers.pop(address, None)
+                self.remocon_slots[address] = remocon.RemoconSlots(self.device_configs.get(address, {}).get('remocon_slots', 0))
+
+                self.apply_capabilities(address, name)
+
+                # Keep the device's buffers while the manifest still describes them (same firmware and free space), otherwise start over
+                device_info = self.ble_threads[address].device_info
+                last_space = self.ble_threads[address].last_space
+                if self.device_configs.get(address, {}).get('keep_buffers', True) and self.buffer_manifest.verify(address, device_info, last_space):
+                    print(f"[{address}] Buffer manifest verified ({len(self.buffer_manifest.buffers(address))} buffers), skipping erase")
+                else:
+                    self.buffer_manifest.reset(address, device_info)
+                    erase_params = argparse.Namespace(erase_all=True, buffer=[])
+                    self.queue_command_for_device(address, erase_params, erase_data.make, f"Erase on connect for {address}")
 
-                # Send the startup GIF
-                self.send_gif_from_path("gifs/mv.gif")
+                if recovery:
+                    # Put back exactly what was on screen before the drop
+                    self.resume_display_state(address)
+                else:
+                    # Send the startup GIF (only switched to if the device already holds it)
+                    self.send_gif_from_path("gifs/mv.gif")
 
                 self.save_config()
             elif message.startswith("BLE_DISCONNECTED"):
-                address = message.split(':')[-1]
+                address = message.split(':', 1)[1] # MAC addresses contain colons
                 if self.device_tree.exists(address):
                     self.device_tree.item(address, values=(self.device_tree.item(address, "values")[0], address, "Disconnected"), tags=('unchecked',))
                 if self.selected_device_address == address:
                     self.update_options_form(None) # Disable form if selected device disconnects
                 self.status_label.config(text="Status: Device disconnected.")
+                self.schedule_reconnect(address)
             elif message.startswith("BLE_CONNECT_FAIL"):
-                parts = message.split(':', 1)
-                address_and_error = parts[1].rsplit(':', 1)
-                address, error_msg = address_and_error[0], address_and_error[1]
+                address, error_msg = self.split_address(message.split(':', 1)[1])
                 if self.device_tree.exists(address):
                     self.device_tree.item(address, values=(self.device_tree.item(address, "values")[0], address, "Failed"), tags=('unchecked',))
                 self.status_label.config(text=f"Status: Failed to connect to {address}. Retrying or scan needed.")
-                if address in self.device_configs:
-                    del self.device_configs[address] # Remove bad config
-                    self.save_config()
+                # Keep the config, the device is most likely just out of range or busy
+                self.schedule_reconnect(address)
+            elif message.startswith("SCAN_SEEN"):
+                address = message.split(':', 1)[1]
+                thread = self.ble_threads.get(address)
+                if not self.reconnect.is_suppressed(address) and not (thread and thread.is_alive()):
+                    print(f"[{address}] Advertising, connecting now")
+                    if address in self.reconnect_timers:
+                        self.after_cancel(self.reconnect_timers.pop(address))
+                    self.connect_to_device(address)
+            elif message.startswith("SYNC_DONE"):
+                _, switched, skew = message.split(':')
+                self.sync_skews = (self.sync_skews + [float(skew)])[-100:]
+                print(f"Synchronized switch of {switched} device(s): skew {skew} ms (avg {sum(self.sync_skews) / len(self.sync_skews):.1f} ms, max {max(self.sync_skews):.1f} ms over {len(self.sync_skews)} switches)")
+                self.status_label.config(text=f"Status: Switched {switched} device(s) within {skew} ms.")
+            elif message.startswith("STREAM_DONE"):
+                address, summary = self.split_address(message.split(':', 1)[1])
+                self.status_label.config(text=f"Status: Stream on {address} ended: {summary}.")
+            elif message.startswith("PREFETCH_DONE") or message.startswith("PREFETCH_ABORTED"):
+                kind, rest = message.split(':', 1)
+                address, token = rest.rsplit(':', 1)
+                slots = self.remocon_slots.get(address)
+                if slots:
+                    slots.end_prefetch(int(token), kind == "PREFETCH_DONE")
             elif message == "MV_STATUS_CONNECTED":
                 self.mv_status_var.set("Connected")
                 self.mv_status_label.config(bootstyle="success")
@@ -1172,16 +1997,22 @@ class App(ttk.Window):
         except queue.Empty:
             pass
         finally:
-            self.after(100, self.process_status_queue)
+            # Drain bursts quickly so connection events are not delayed behind other messages
+            self.after(10 if not self.status_queue.empty() else 100, self.process_status_queue)
 
     def process_mv_action_queue(self):
-        """Check for actions from the Multiviewer thread and send GIFs."""
+        """Check for actions from the Multiviewer thread and send the GIF of the settled one."""
         try:
-            action = self.mv_action_queue.get_nowait()
-            self.gif_map['current_action'] = action # Store the latest action
-            self.send_mv_action(action)
+            while True:
+                self.mv_debouncer.offer(self.mv_action_queue.get_nowait())
         except queue.Empty:
             pass
+        try:
+            action = self.mv_debouncer.poll()
+            if action:
+                print(f"MV flag settled on '{action}' ({self.mv_debouncer.sent} of {self.mv_debouncer.offered} changes sent)")
+                self.gif_map['current_action'] = action # Store the latest action
+                self.send_mv_action(action)
         finally:
             self.after(50, self.process_mv_action_queue)
     
@@ -1191,22 +2022,76 @@ class App(ttk.Window):
             self.after(100, self.process_spotify_action_queue)
             return
         try:
-            image_data = self.spotify_action_queue.get_nowait()
+            art = self.spotify_action_queue.get_nowait()
             print(f"[Spotify] Action queue received art data. Setting lock.")
             self.is_sending_art = True # Set lock
-            
-            # Use a temporary file in memory to send the image data
-            # The file object needs to be kept alive until the command is processed.
-            # Since start_write is synchronous, this is safe.
-            with io.BytesIO(image_data) as temp_file:
-                temp_file.name = "temp_album_art.gif" # The library uses the name attribute to detect file type
-                self.start_write(image_file_obj=temp_file)
-
+            self.send_album_art(art)
         except queue.Empty:
             pass
         finally:
             self.after(100, self.process_spotify_action_queue)
 
+    def album_art_profile(self, config):
+        """Returns the render profile key and settings of album art for a device config."""
+        profile = {
+            'max_width': config['width'],
+            'max_height': config['height'],
+            'anchor': config['anchor'],
+            'duplicate_horizontally': config.get('duplicate_horizontally', False),
+            'resample': config.get('resample', image.RESAMPLE_AUTO),
+            'colors': config.get('colors', 256)
+        }
+        key = f"{profile['max_width']}x{profile['max_height']}:{profile['anchor']:02x}:{int(profile['duplicate_horizontally'])}:{profile['resample']}:{profile['colors']}"
+        return key, profile
+
+    def get_album_art_profiles(self):
+        """Returns the album art profiles of all connected devices. Called from the Spotify thread."""
+        profiles = {}
+        for address in list(self.ble_threads):
+            config = self.device_configs.get(address)
+            if config:
+                key, profile = self.album_art_profile(config)
+                profiles[key] = profile
+        return profiles
+
+    def send_album_art(self, art):
+        """Queues pre-rendered album art for every connected device."""
+        try:
+            for address, thread in list(self.ble_threads.items()):
+                self.send_album_art_to_device(address, thread, art)
+        finally:
+            print("[Spotify] Art command queued. Releasing lock.")
+            self.is_sending_art = False
+
+    def send_album_art_to_device(self, address, thread, art):
+        """Queues pre-rendered album art for one device, rendering it if the device's profile is missing."""
+        config = self.device_configs.get(address)
+        if not config:
+            print(f"Warning: No config found for connected device {address}. Skipping album art.")
+            return
+        self.display_state[address] = ('art', art)
+        key, profile = self.album_art_profile(config)
+        gif_data = art['art'].get(key)
+        if gif_data is None and art['album_id']:
+            gif_data = self.art_cache.get(f"{art['album_id']}:{key}")
+        if gif_data is None:
+            if art['source'] is None:
+                print(f"Warning: No album art rendered for {address}. Skipping.")
+                return
+            # Device connected (or changed settings) after the art was rendered
+            try:
+                gif_data = image.render_album_art_for_device(art['source'], **profile)
+            except Exception as e:
+                print(f"Warning: Could not render album art for {address}: {e}")
+                return
+        if config.get('temporary_art', True):
+            self.diy_framebuffers.pop(address, None) # Replaced by the art
+            payloads = write_data_png.make_temporary(write_data_gif.build(gif_data, common.DIY_BUFFER))
+            self.queue_payloads_for_device(address, payloads, CONTENT_TRANSIENT)
+        else:
+            self.queue_payloads_for_device(address, [write_data_gif.build(gif_data, config['buffer'])], CONTENT_DURABLE)
+        self.status_label.config(text=f"Status: Queued album art for {address}.")
+
     def resend_current_mv_action(self):
         """Resends the last known Multiviewer action."""
         if self.gif_map['current_action']:
@@ -1217,7 +2102,25 @@ class App(ttk.Window):
         gif_path = self.gif_map.get(action)
         if gif_path and os.path.exists(gif_path):
             print(f"MV Action: '{action}'. Sending GIF: {gif_path}")
-            self.send_gif_from_path(gif_path)
+            self.file_listbox.delete(0, tk.END)
+            self.file_listbox.insert(tk.END, gif_path)
+            plain = []
+            for address, thread in self.ble_threads.items():
+                if action in MV_ACTION_TEXT and self.device_configs.get(address, {}).get('mv_labels', False):
+                    self.show_content(address, thread, {**DEFAULT_TEXT_STYLE, 'text': MV_ACTION_TEXT[action], 'icon': gif_path})
+                else:
+                    plain.append(address)
+            if self.sync_switch_var.get() and len(plain) > 1:
+                self.send_synced_gif(gif_path, plain)
+            else:
+                for address in plain:
+                    if not self.write_to_device(address, self.ble_threads[address], (gif_path,)):
+                        break
+            self.prefetch_likely_actions(action)
+        elif action in MV_ACTION_TEXT:
+            print(f"MV Action: '{action}'. No GIF, sending text: {MV_ACTION_TEXT[action]}")
+            for address, thread in self.ble_threads.items():
+                self.show_content(address, thread, {**DEFAULT_TEXT_STYLE, 'text': MV_ACTION_TEXT[action]})
 
     def send_debug_gif(self, gif_path):
         print(f"Debug: Sending GIF: {gif_path}")
@@ -1241,6 +2144,9 @@ class App(ttk.Window):
 
         # This command is the same for all devices, so we can use the broadcast queue
         self.queue_command_for_all(params, make_function, "Erase")
+        for address, slots in self.remocon_slots.items():
+            self.cancel_prefetch(address)
+            slots.forget_all()
 
     def send_clock_command_to_all(self):
         """Sends the clock command to all connected devices, using their individual style settings."""
@@ -1257,6 +2163,7 @@ class App(ttk.Window):
         if address not in self.ble_threads:
             return
 
+        self.display_state[address] = ('clock', style)
         now = datetime.now()
         lang = 0 # 0 for International (DD/MM), 1 for China (MM/DD)
         params = argparse.Namespace(
@@ -1267,9 +2174,188 @@ class App(ttk.Window):
             clock_mode_show_date=True, # Hardcoded for simplicity
             clock_mode_show_24h=True,  # Hardcoded for simplicity
         )
-        self.queue_command_for_device(address, params, set_clock_mode.make, f"Clock Style {style}")
+        self.queue_command_for_device(address, params, set_clock_mode.make, f"Clock Style {style}", CONTENT_MODE)
+
+    def write_params(self, config, thread, image_source):
+        """Returns the write-gif/write-png parameters shared by all writes to a device."""
+        return {
+            'image_file': image_source,
+            'start_buffer': config['buffer'],
+            'auto_resize': config['auto_resize'],
+            'device_width': config['width'],
+            'device_height': config['height'],
+            'anchor': config['anchor'],
+            'duplicate_horizontally': config.get('duplicate_horizontally', False),
+            'colors': config.get('colors', 256),
+            'time_budget': config.get('time_budget', 0),
+            'resample': config.get('resample', image.RESAMPLE_AUTO),
+            'placeholder': config.get('placeholder', image.PLACEHOLDER_OFF),
+            'placeholder_threshold': config.get('placeholder_threshold', image.PLACEHOLDER_THRESHOLD),
+            'throughput': thread.throughput
+            # Brightness and flip are sent as separate commands, not part of the image write
+        }
+
+    def slot_asset_key(self, params):
+        """Returns the remocon slot key of a GIF write: the file and everything that changes its rendering."""
+        return f"{params.image_file[0]}:{params.device_width}x{params.device_height}:{params.anchor:02x}:{int(params.auto_resize)}:{int(params.duplicate_horizontally)}:{params.resample}:{params.colors}:{params.hold_after}"
+
+    def show_gif_in_slot(self, address, slots, params):
+        """Shows a GIF from a remocon slot, switching to it if it is already stored there."""
+        self.cancel_prefetch(address)
+        key = self.slot_asset_key(params)
+        slot = slots.lookup(key)
+        if slot is not None:
+            print(f"[{address}] {params.image_file[0]} is in slot {slot:#04x}, switching screen")
+            shown = self.queue_command_for_device(address, argparse.Namespace(screen=slots.screen(slot)), set_screen.make, f"Switch screen for {address}", CONTENT_MODE)
+        else:
+            slot = slots.allocate(key)
+            if slot is None:
+                self.queue_command_for_device(address, params, write_data_gif.make, f"Write for {address}", CONTENT_DURABLE)
+                return
+            params.start_buffer = slot
+            shown = self.queue_command_for_device(address, params, write_data_gif.make, f"Write for {address}", CONTENT_DURABLE)
+            if shown:
+                slots.store(key, slot)
+        # Set after queueing, which resets it
+        slots.current = slot if shown else None
+
+    def current_screen_payloads(self, address):
+        """Returns the payloads that show what a device shows now without uploading it again, or None if that is not possible (DIY, clock, playlist or unknown)."""
+        slots = self.remocon_slots.get(address)
+        if slots and slots.current is not None:
+            return self.show_buffer_payloads(slots.current)
+        if address in self.diy_active:
+            return None
+        kind, value = self.display_state.get(address, (None, None))
+        if kind == 'write' and (len(value['image_source']) == 1 or value.get('make_from_image') or value.get('join_image_files')):
+            return self.show_buffer_payloads(self.device_configs[address]['buffer'])
+        if kind in ('text', 'wall', 'art'):
+            return self.show_buffer_payloads(self.device_configs[address]['buffer'])
+        return None
+
+    def send_synced_gif(self, gif_path, addresses):
+        """Shows a GIF on several devices at the same moment: staged in a remocon slot everywhere, then switched to together."""
+        switches = {}
+        uploads = {}
+        unchanged = set()
+        unsynced = []
+        for address in addresses:
+            config = self.device_configs.get(address)
+            thread = self.ble_threads.get(address)
+            slots = self.remocon_slots.get(address)
+            if not config or not thread or slots is None:
+                continue
+            params = argparse.Namespace(**self.write_params(config, thread, [gif_path]), make_from_image=0, hold_after=self.gif_hold_after.get(os.path.basename(gif_path).lower(), 0))
+            # A placeholder would show on screen before the switch
+            params.placeholder = image.PLACEHOLDER_OFF
+            self.stop_stream(address)
+            self.cancel_prefetch(address)
+            key = self.slot_asset_key(params)
+            slot = slots.lookup(key)
+            upload = []
+            if slot is None:
+                slot = slots.allocate(key, max(slots.budget, SYNC_STAGING_SLOTS))
+                if slot is None:
+                    unsynced.append(address)
+                    self.write_to_device(address, thread, (gif_path,))
+                    continue
+                params.start_buffer = slot
+                try:
+                    upload = write_data_gif.make(params)
+                except ValueError as e:
+                    messagebox.showerror("Invalid Input", f"Please check your inputs for device {address}. Error: {e}")
+                    return
+                if all(self.buffer_manifest.holds(address, payload) for payload in upload):
+                    upload = []
+                else:
+                    # Uploads show once complete, go back to the current screen until every device is ready
+                    restore = self.current_screen_payloads(address)
+                    if restore is None:
+                        unsynced.append(address)
+                        self.write_to_device(address, thread, (gif_path,))
+                        continue
+                    upload += restore
+                slots.store(key, slot)
+            elif slot == slots.current and address not in self.diy_active:
+                unchanged.add(address)
+            switch = set_screen.make(argparse.Namespace(screen=slots.screen(slot)))
+            if address in self.diy_active:
+                switch = set_diy_mode.make(argparse.Namespace(diy_mode=False)) + switch
+                self.diy_active.discard(address)
+                self.diy_framebuffers.pop(address, None)
+            if address in self.playlist_devices:
+                # End the slideshow first, like queue_payloads_for_device
+                switch = set_prg_mode.make(argparse.Namespace(buffer=[config['buffer']])) + switch
+                self.playlist_devices.discard(address)
+            slots.current = slot
+            self.display_state[address] = ('write', {'image_source': (gif_path,)})
+            switches[address] = switch
+            uploads[address] = upload
+        if unsynced:
+            print(f"Synchronized switch to {gif_path}: not synchronized on {', '.join(unsynced)} (no free slot, or the current screen cannot be restored)")
+        if not switches:
+            return
+        sync = remocon.SyncSwitch(switches, self.status_queue, unchanged)
+        for address, upload in uploads.items():
+            self.ble_threads[address].command_queue.put((upload, CONTENT_DURABLE if upload else CONTENT_MODE, sync))
+        print(f"Synchronized switch to {gif_path}: staging on {len(switches)} device(s), {sum(1 for u in uploads.values() if u)} upload(s)")
+        not_synced = f", {len(unsynced)} not synchronized" if unsynced else ""
+        self.status_label.config(text=f"Status: Staging {os.path.basename(gif_path)} on {len(switches)} device(s){not_synced}...")
+
+    def prefetch_likely_actions(self, action):
+        """Uploads the likely next Multiviewer GIFs into spare remocon slots while the link is idle."""
+        for address, thread in self.ble_threads.items():
+            slots = self.remocon_slots.get(address)
+            config = self.device_configs.get(address)
+            if not slots or not config or slots.budget == 0:
+                continue
+            # Uploads show once complete, so only prefetch when the screen can be put back without an upload
+            restore = self.current_screen_payloads(address)
+            if restore is None:
+                continue
+            # A slot on screen stays, the others may hold predictions
+            spare = slots.budget - (1 if slots.current is not None else 0)
+            for next_action in MV_TRANSITIONS.get(action, [])[:spare]:
+                gif_path = self.gif_map.get(next_action)
+                if not gif_path or not os.path.exists(gif_path):
+                    continue
+                params = argparse.Namespace(**self.write_params(config, thread, [gif_path]), make_from_image=0, hold_after=self.gif_hold_after.get(os.path.basename(gif_path).lower(), 0))
+                key = self.slot_asset_key(params)
+                if slots.is_known(key):
+                    continue
+                slot = slots.allocate(key)
+                if slot is None:
+                    break
+                # A placeholder would show on screen
+                params.start_buffer = slot
+                params.placeholder = image.PLACEHOLDER_OFF
+                try:
+                    upload = write_data_gif.make(params)
+                except Exception as e:
+                    print(f"[{address}] Could not prefetch {gif_path}: {e}")
+                    continue
+                if all(self.buffer_manifest.holds(address, payload) for payload in upload):
+                    # Still on the device from an earlier upload
+                    slots.store(key, slot)
+                    continue
+                token = slots.begin_prefetch(key, slot)
+                thread.prefetch_queue.put((token, upload, restore))
+                print(f"[{address}] Prefetching {gif_path} into slot {slot:#04x}")
+
+    def cancel_prefetch(self, address):
+        """Drops the prefetches of a device that have not started yet."""
+        thread = self.ble_threads.get(address)
+        slots = self.remocon_slots.get(address)
+        if not thread or not slots:
+            return
+        while True:
+            try:
+                token, _, _ = thread.prefetch_queue.get_nowait()
+            except queue.Empty:
+                break
+            slots.end_prefetch(token, False)
 
-    def start_write(self, image_file_obj=None):
+    def start_write(self):
         if not self.ble_threads:
             messagebox.showerror("Error", "Device is not connected.")
             return
@@ -1277,145 +2363,386 @@ class App(ttk.Window):
         image_files = self.file_listbox.get(0, tk.END)
         if not image_files:
             messagebox.showerror("Error", "At least one image file must be selected.")
-            # Allow proceeding if an in-memory object is provided
-            if not image_file_obj:
-                return
-        
-        # If an in-memory file object is passed, use it. Otherwise, use file paths.
-        image_source = [image_file_obj] if image_file_obj else image_files
-
-        # Cancel any previously scheduled GIF-to-static-frame timer.
-        # This ensures a new write action overrides any pending "stop" commands for all devices.
-        for timer_id in self.gif_stop_timers.values():
-            self.after_cancel(timer_id)
-        self.gif_stop_timers.clear()
+            return
+        image_source = image_files
+        try:
+            make_from_image = int(self.duration_entry.get()) if self.make_from_image_var.get() else 0
+            if self.make_from_image_var.get() and make_from_image <= 0:
+                raise ValueError("The frame duration must be positive")
+        except ValueError as e:
+            messagebox.showerror("Invalid Input", f"Please check the frame duration. Error: {e}")
+            return
+        join_image_files = self.join_files_var.get()
+        if self.sync_switch_var.get() and len(self.ble_threads) > 1 and len(image_source) == 1 and image_source[0].lower().endswith('.gif') and not make_from_image:
+            self.send_synced_gif(image_source[0], list(self.ble_threads))
+            return
 
         # Iterate over each connected device and queue a command for it.
         for address, thread in self.ble_threads.items():
+            if not self.write_to_device(address, thread, image_source, make_from_image, join_image_files):
+                return # Stop on first error
+
+    def start_wall_write(self):
+        if not self.ble_threads:
+            messagebox.showerror("Error", "Device is not connected.")
+            return
+        image_files = self.file_listbox.get(0, tk.END)
+        if not image_files:
+            messagebox.showerror("Error", "At least one image file must be selected.")
+            return
+        if not self.wall_config.get('panels'):
+            messagebox.showerror("Error", f"No wall layout configured. Add 'wall_layout' with its panels to {self.config_file}.")
+            return
+        self.send_wall(image_files[0])
+
+    def send_wall(self, path, addresses=None):
+        """Renders an image once for the whole wall and writes each connected panel its part (or only the given panels)."""
+        try:
+            sizes = {address: (config['width'], config['height']) for address, config in self.device_configs.items()}
+            layout = wall.WallLayout.from_config(self.wall_config, sizes)
+            gifs = wall.render_wall_gifs(
+                path, layout,
+                self.wall_config.get('anchor', 0x33),
+                self.wall_config.get('auto_resize', True),
+                self.wall_config.get('resample', image.RESAMPLE_AUTO),
+                self.wall_config.get('colors', image.MAX_PALETTE_COLORS),
+                self.wall_cache
+            )
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Invalid Input", f"Could not render {path} for the wall: {e}")
+            return
+        print(f"Wall {layout.width}x{layout.height}: {', '.join(f'{a} {len(d)} bytes' for a, d in gifs.items())}")
+        # Every panel has its own BLE thread, so the uploads run side by side
+        for address, data in gifs.items():
+            if addresses is not None and address not in addresses:
+                continue
+            if address not in self.ble_threads:
+                print(f"Warning: Wall panel {address} is not connected, skipping it.")
+                continue
+            self.display_state[address] = ('wall', path)
+            self.queue_payloads_for_device(address, [write_data_gif.build(data, self.device_configs[address]['buffer'])], CONTENT_DURABLE)
+        self.status_label.config(text=f"Status: Queued wall write of {os.path.basename(path)}.")
+
+    def start_playlist(self):
+        if not self.ble_threads:
+            messagebox.showerror("Error", "Device is not connected.")
+            return
+        slides = list(self.file_listbox.get(0, tk.END))
+        if not slides:
+            messagebox.showerror("Error", "At least one image file must be selected.")
+            return
+        self.send_playlist(slides)
+
+    def send_playlist(self, slides, addresses=None):
+        """Uploads the slides that changed into the playlist buffers and lets the devices cycle through them."""
+        for address in list(addresses if addresses is not None else self.ble_threads):
             config = self.device_configs.get(address)
-            if not config:
-                print(f"Warning: No config found for connected device {address}. Skipping command.")
+            thread = self.ble_threads.get(address)
+            if not config or not thread:
                 continue
 
+            def slide_params(slide):
+                params = argparse.Namespace(**self.write_params(config, thread, [slide]))
+                # Same input, same bytes: budgets depend on the measured link and placeholders go through DIY
+                params.time_budget = 0
+                params.throughput = None
+                params.placeholder = image.PLACEHOLDER_OFF
+                return params
+
+            def fingerprint(slide):
+                settings = {k: v for k, v in vars(slide_params(slide)).items() if k not in ('image_file', 'start_buffer')}
+                return f"{image.source_hash(image.read_source(slide))}:{sorted(settings.items())}"
+
+            def render(slide, buffer):
+                params = slide_params(slide)
+                params.start_buffer = buffer
+                if slide.lower().endswith('.gif'):
+                    return write_data_gif.make(argparse.Namespace(**vars(params), make_from_image=0, hold_after=0))
+                return write_data_png.make(argparse.Namespace(**vars(params), join_image_files=False))
+
             try:
-                # Common parameters
-                common_params = {
-                    'image_file': image_source,
-                    'start_buffer': config['buffer'],
-                    'auto_resize': config['auto_resize'],
-                    'device_width': config['width'],
-                    'device_height': config['height'],
-                    'anchor': config['anchor'],
-                    'duplicate_horizontally': config.get('duplicate_horizontally', False)
-                    # Brightness and flip are sent as separate commands, not part of the image write
-                }
+                uploads, prg = self.playlist.plan(address, slides, render, self.buffer_manifest, fingerprint)
+            except (ValueError, OSError) as e:
+                messagebox.showerror("Invalid Input", f"Could not prepare the slideshow for {address}: {e}")
+                return
+            print(f"[{address}] Slideshow of {len(slides)} slide(s): {len(uploads)} upload(s), {sum(len(p) for p in uploads)} bytes")
+            self.display_state[address] = ('playlist', tuple(slides))
+            # A new playlist replaces the old one without showing the regular buffer in between
+            self.playlist_devices.discard(address)
+            if uploads:
+                self.queue_payloads_for_device(address, uploads, CONTENT_DURABLE)
+            self.queue_payloads_for_device(address, prg, CONTENT_MODE)
+            self.playlist_devices.add(address)
+        self.save_config()
+        self.status_label.config(text=f"Status: Queued slideshow of {len(slides)} slide(s).")
+
+    def start_text(self):
+        if not self.ble_threads:
+            messagebox.showerror("Error", "Device is not connected.")
+            return
 
-                # Automatically detect if we should treat this as a GIF/animation
-                is_gif = any(isinstance(f, str) and f.lower().endswith('.gif') for f in image_source)
-                is_spotify_art = image_file_obj is not None
-                
-                if is_spotify_art: # Handle Spotify Album Art specifically
-                    # Spotify art is a single GIF, never joined.
-                    params = argparse.Namespace(**common_params, join_image_files=False)
-                    params = argparse.Namespace(**common_params, join_image_files=False, make_from_image=0)
-                    make_function = write_data_gif.make
-                elif is_gif or self.make_from_image_var.get(): # Handle GIFs or creating a GIF from images
-                    make_from_image = self.make_from_image_var.get()
-                    duration = int(self.duration_entry.get()) if make_from_image else 0
-                    params = argparse.Namespace(**common_params, make_from_image=duration)
-                    make_function = write_data_gif.make
-                else: # Handle standard PNGs/JPGs from the debug window
-                    params = argparse.Namespace(**common_params, join_image_files=self.join_files_var.get())
-                    make_function = write_data_png.make
-
-                # Generate and queue the command for this specific device
-                if is_gif:
-                    # Only schedule the "stop" timer for specific color GIFs
-                    gif_path = image_files[0]
-                    gif_filename = os.path.basename(gif_path).lower()
-                    stoppable_gif_names = ['green.gif', 'yellow.gif', 'red.gif', 'blue.gif', 'white.gif']
-                    if gif_filename in stoppable_gif_names:
-                        # Schedule the first frame to be sent after 3 seconds
-                        self.gif_stop_timers[address] = self.after(3000, lambda a=address, p=gif_path: self.send_first_frame_of_gif(a, p))
-                self.queue_command_for_device(address, params, make_function, f"Write for {address}")
-
-            except ValueError as e:
-                messagebox.showerror("Invalid Input", f"Please check your inputs for device {address}. Error: {e}")
+        content = {
+            'text': self.text_entry.get(),
+            'effect': self.text_effect_var.get(),
+            'speed': self.text_speed_entry.get(),
+            'color': self.text_color_entry.get()
+        }
+        for address, thread in self.ble_threads.items():
+            if not self.show_content(address, thread, content):
                 return # Stop on first error
-        
-        # If we were sending album art, release the lock now that commands are queued
-        if self.is_sending_art:
-            print("[Spotify] Art command queued. Releasing lock.")
-            self.is_sending_art = False
 
-    def queue_command_for_device(self, address, params, make_function, action_name):
-        """Generates a payload and queues it for a specific device."""
+    def start_label(self):
+        if not self.ble_threads:
+            messagebox.showerror("Error", "Device is not connected.")
+            return
+        try:
+            color = set_text.helper_convert_color(self.text_color_entry.get())
+        except argparse.ArgumentTypeError as e:
+            messagebox.showerror("Invalid Input", str(e))
+            return
+        for address in self.ble_threads:
+            config = self.device_configs.get(address)
+            if config:
+                frame = image.render_text_stack(self.text_entry.get(), config['width'], config['height'], color, config['anchor'])[0]
+                self.send_diy_frame(address, frame)
+
+    def countdown_frames(self, seconds, width, height, color, anchor, fps):
+        """Yields the frames of a countdown in tenths of a second, fps frames per second."""
+        for i in range(int(seconds * fps) + 1):
+            remaining = max(0.0, seconds - i / fps)
+            minutes, secs = divmod(remaining, 60)
+            yield image.render_text_stack(f"{int(minutes)}:{secs:04.1f}", width, height, color, anchor)[0]
+
+    def start_countdown(self):
+        if not self.ble_threads:
+            messagebox.showerror("Error", "Device is not connected.")
+            return
+        try:
+            color = set_text.helper_convert_color(self.text_color_entry.get())
+            seconds = float(self.countdown_entry.get())
+            if seconds <= 0:
+                raise ValueError("The countdown must be positive")
+        except (argparse.ArgumentTypeError, ValueError) as e:
+            messagebox.showerror("Invalid Input", str(e))
+            return
+        fps = 10.0
+        for address in self.ble_threads:
+            config = self.device_configs.get(address)
+            if config:
+                frames = self.countdown_frames(seconds, config['width'], config['height'], color, config['anchor'], fps)
+                self.start_stream(address, frames, fps)
+
+    def start_stream(self, address, frames, fps):
+        """Streams frames into the DIY buffer of a device, replacing a running stream."""
+        config = self.device_configs.get(address)
+        if address not in self.ble_threads or not config:
+            return
+        self.stop_stream(address)
+        # Turn DIY mode on; the stream keeps its own framebuffer, so the shared one is stale afterwards
+        self.queue_payloads_for_device(address, set_diy_mode.make(argparse.Namespace(diy_mode=True)), CONTENT_TRANSIENT)
+        self.diy_framebuffers.pop(address, None)
+        thread = StreamThread(address, self.ble_threads[address], frames, config['width'], config['height'], self.status_queue, fps, config.get('diy_pixels', False))
+        self.stream_threads[address] = thread
+        thread.start()
+        self.status_label.config(text=f"Status: Streaming to {address}...")
+
+    def stop_stream(self, address):
+        thread = self.stream_threads.pop(address, None)
+        if thread and thread.is_alive():
+            thread.stop()
+
+    def stop_streams(self):
+        for address in list(self.stream_threads):
+            self.stop_stream(address)
+
+    def send_diy_frame(self, address, frame):
+        """Shows a frame in the DIY buffer, as a PNG unless the device config enables set_pixel updates (diy_pixels)."""
+        config = self.device_configs.get(address)
+        if address not in self.ble_threads or not config:
+            return
+        buffer = self.diy_framebuffers.get(address)
+        if not buffer or (buffer.width, buffer.height, buffer.pixels) != (config['width'], config['height'], config.get('diy_pixels', False)):
+            buffer = framebuffer.DiyFramebuffer(config['width'], config['height'], config.get('diy_pixels', False))
+        payloads = []
+        if address not in self.diy_active:
+            buffer.invalidate()
+            payloads = set_diy_mode.make(argparse.Namespace(diy_mode=True))
+        payloads += buffer.update(frame)
+        print(f"[{address}] DIY frame: {buffer.last_report}")
+        if payloads:
+            self.queue_payloads_for_device(address, payloads, CONTENT_TRANSIENT)
+        # Set after queueing, which may reset it
+        self.diy_framebuffers[address] = buffer
+
+    def show_content(self, address, thread, content):
+        """Routes content to the cheapest path: pure text is drawn by the device (set_text), files are uploaded. Returns False on invalid input."""
+        if isinstance(content, dict) and 'icon' in content:
+            return self.send_mix_to_device(address, thread, content)
+        if isinstance(content, dict):
+            return self.send_text_to_device(address, content)
+        return self.write_to_device(address, thread, content)
+
+    def text_params(self, content, buffer):
+        """Returns set_text parameters for text content (text, effect, speed, color)."""
+        return argparse.Namespace(
+            text=content['text'],
+            effect=content['effect'],
+            speed=int(content['speed']),
+            style=1,
+            color=set_text.helper_convert_color(content['color']),
+            background=(0x00, 0x00, 0x00),
+            start_buffer=buffer,
+            temporary=False
+        )
+
+    def send_mix_to_device(self, address, thread, content):
+        """Shows an icon GIF in a square on the left and text drawn by the device next to it, in one upload. Returns False on invalid input."""
+        config = self.device_configs.get(address)
+        if not config:
+            print(f"Warning: No config found for connected device {address}. Skipping text.")
+            return True
+        side = config['height']
+        if config['width'] < side * 2:
+            # No room for text beside the icon
+            return self.write_to_device(address, thread, (content['icon'],))
+        try:
+            params = self.text_params(content, config['buffer'])
+            hold_after = self.gif_hold_after.get(os.path.basename(content['icon']).lower(), 0)
+            frames, duration, loop, key = image.load_animation_frames_for_device(content['icon'], side, side, 0x33, True, resample=config.get('resample', image.RESAMPLE_AUTO))
+            text_data = set_text.build_text_data(params.text, set_text.EFFECTS[params.effect], params.speed, params.style, params.color, params.background)
+            parts = [
+                write_data_mix.gif_part(write_data_gif.encode(key, frames, duration, loop, config.get('colors', 256), hold_after), 0, 0, side, side),
+                write_data_mix.text_part(text_data, side, 0, config['width'] - side, side)
+            ]
+            payloads = [write_data_mix.build(write_data_mix.compose(parts), config['buffer'])]
+        except (ValueError, argparse.ArgumentTypeError, OSError) as e:
+            messagebox.showerror("Invalid Input", f"Please check the text for device {address}. Error: {e}")
+            return False
+        self.display_state[address] = ('text', content)
+        self.queue_payloads_for_device(address, payloads, CONTENT_DURABLE)
+        print(f"[{address}] {content['icon']} with text '{content['text']}': {sum(len(p) for p in payloads)} bytes")
+        self.status_label.config(text=f"Status: Queued flag and text for {address}.")
+        return True
+
+    def send_text_to_device(self, address, content):
+        """Shows text with the device's own renderer, a few hundred bytes instead of an animation upload. Returns False on invalid input."""
+        config = self.device_configs.get(address)
+        if not config:
+            print(f"Warning: No config found for connected device {address}. Skipping text.")
+            return True
+        try:
+            payloads = set_text.make(self.text_params(content, config['buffer']))
+        except (ValueError, argparse.ArgumentTypeError) as e:
+            messagebox.showerror("Invalid Input", f"Please check the text for device {address}. Error: {e}")
+            return False
+        self.display_state[address] = ('text', content)
+        self.queue_payloads_for_device(address, payloads, CONTENT_DURABLE)
+        print(f"[{address}] Text '{content['text']}': {sum(len(p) for p in payloads)} bytes")
+        self.status_label.config(text=f"Status: Queued text for {address}.")
+        return True
+
+    def write_to_device(self, address, thread, image_source, make_from_image=0, join_image_files=False):
+        """Writes image files to one device, make_from_image is the frame duration (msec) of a GIF made from still images (0 = off). Returns False on invalid input."""
+        config = self.device_configs.get(address)
+        if not config:
+            print(f"Warning: No config found for connected device {address}. Skipping command.")
+            return True
+        # Everything the write depends on besides the device config, so a reconnect replays it exactly
+        self.display_state[address] = ('write', {'image_source': tuple(image_source), 'make_from_image': make_from_image, 'join_image_files': join_image_files})
+
+        try:
+            common_params = self.write_params(config, thread, image_source)
+
+            # Automatically detect if we should treat this as a GIF/animation
+            is_gif = any(isinstance(f, str) and f.lower().endswith('.gif') for f in image_source)
+
+            if is_gif or make_from_image: # Handle GIFs or creating a GIF from images
+                # Some GIFs (e.g. flags) play for a while and then stay on their first frame
+                hold_after = 0 if make_from_image else self.gif_hold_after.get(os.path.basename(image_source[0]).lower(), 0)
+                params = argparse.Namespace(**common_params, make_from_image=make_from_image, hold_after=hold_after)
+                make_function = write_data_gif.make
+                slots = self.remocon_slots.get(address)
+                if slots and slots.budget > 0 and not make_from_image and len(image_source) == 1:
+                    self.show_gif_in_slot(address, slots, params)
+                    return True
+            else: # Handle standard PNGs/JPGs from the debug window
+                params = argparse.Namespace(**common_params, join_image_files=join_image_files)
+                make_function = write_data_png.make
+
+            # Generate and queue the command for this specific device
+            self.queue_command_for_device(address, params, make_function, f"Write for {address}", CONTENT_DURABLE)
+            return True
+
+        except ValueError as e:
+            messagebox.showerror("Invalid Input", f"Please check your inputs for device {address}. Error: {e}")
+            return False
+
+    def show_buffer_payloads(self, buffer):
+        """Returns the payloads that show a stored buffer without sending its data again."""
+        if common.REMOCON_BUFFER <= buffer < common.REMOCON_BUFFER + common.REMOCON_COUNT:
+            return set_screen.make(argparse.Namespace(screen=remocon.RemoconSlots.screen(buffer)))
+        return set_prg_mode.make(argparse.Namespace(buffer=[buffer]))
+
+    def skip_stored_payloads(self, address, payloads):
+        """Replaces data payloads the device already holds (see BufferManifest) with commands that show them."""
+        result = []
+        for payload in payloads:
+            if self.buffer_manifest.holds(address, payload):
+                buffer = manifest.parse_data_payload(payload)['buffer']
+                print(f"[{address}] Buffer {buffer:#04x} already holds this data, showing it instead of uploading {len(payload)} bytes")
+                result.extend(self.show_buffer_payloads(buffer))
+            else:
+                result.append(payload)
+        return result
+
+    def queue_payloads_for_device(self, address, payloads, content_class=CONTENT_COMMAND):
+        """Queues ready payloads for a device, leaving DIY mode before anything that must show from program buffers."""
+        # Other content replaces a running stream
+        self.stop_stream(address)
+        payloads = self.skip_stored_payloads(address, payloads)
+        if address in self.playlist_devices and content_class in (CONTENT_TRANSIENT, CONTENT_DURABLE, CONTENT_MODE):
+            # The device cycles the playlist until set_prg_mode selects the regular buffer again
+            payloads = set_prg_mode.make(argparse.Namespace(buffer=[self.device_configs[address]['buffer']])) + payloads
+            self.playlist_devices.discard(address)
+        slots = self.remocon_slots.get(address)
+        if slots and content_class in (CONTENT_TRANSIENT, CONTENT_DURABLE, CONTENT_MODE):
+            # The screen changes, so predictions made for it are stale
+            slots.current = None
+            self.cancel_prefetch(address)
+        if content_class == CONTENT_TRANSIENT:
+            self.diy_active.add(address)
+        elif content_class in (CONTENT_DURABLE, CONTENT_MODE) and address in self.diy_active:
+            diy_off = set_diy_mode.make(argparse.Namespace(diy_mode=False))
+            # Mode switches need DIY off first; uploads keep the DIY image up until they are complete
+            payloads = diy_off + payloads if content_class == CONTENT_MODE else payloads + diy_off
+            self.diy_active.discard(address)
+            self.diy_framebuffers.pop(address, None)
+        self.ble_threads[address].command_queue.put((payloads, content_class))
+
+    def queue_command_for_device(self, address, params, make_function, action_name, content_class=CONTENT_COMMAND):
+        """Generates a payload and queues it for a specific device. Returns True if it was queued."""
         if address not in self.ble_threads:
             print(f"Warning: Attempted to queue command for disconnected device {address}")
-            return
+            return False
 
-        ble_thread = self.ble_threads[address]
         try:
             self.status_label.config(text=f"Status: Generating payload for {action_name}...")
             payloads = make_function(params)
-            ble_thread.command_queue.put(payloads) # Put on the specific device's queue
+            for report in getattr(params, 'encode_report', []):
+                print(f"[{address}] Budget encode: {report}")
+            self.queue_payloads_for_device(address, payloads, content_class) # Put on the specific device's queue
             self.status_label.config(text=f"Status: Queued '{action_name}' command.")
+            return True
         except Exception as e:
             self.status_label.config(text=f"Status: Error - {e}")
             messagebox.showerror("Error", f"An error occurred: {e}")
+            return False
 
     def queue_command_for_all(self, params, make_function, action_name):
         """Generates one payload and queues it for all connected devices."""
         for address in self.ble_threads:
             self.queue_command_for_device(address, params, make_function, f"{action_name} on {address}")
 
-    def send_first_frame_of_gif(self, address, gif_path):
-        """Extracts the first frame of a GIF and sends it as a static image."""
-        if address not in self.ble_threads:
-            print(f"Cannot send first frame: device {address} is no longer connected.")
-            return
-
-        print(f"Timer expired. Sending first frame of {gif_path} to {address}.")
-
-        try:
-            with Image.open(gif_path) as img:
-                # Ensure we are on the first frame
-                img.seek(0)
-                # Convert to RGBA to handle transparency properly
-                first_frame = img.convert("RGBA")
-
-            # Get the config for the target device to perform resizing
-            config = self.device_configs.get(address, {})
-            device_width = config.get('width', 96)
-            device_height = config.get('height', 32)
-
-            # Resize using NEAREST for a crisp, pixel-perfect look
-            resampling_filter = Image.Resampling.NEAREST if hasattr(Image, 'Resampling') else Image.NEAREST
-            resized_frame = first_frame.resize((device_width, device_height), resample=resampling_filter)
-            
-            # Convert to RGB for saving as PNG
-            final_frame = resized_frame.convert("RGB")
-
-            # Use a temporary file to hold the frame
-            temp_png_path = "temp_first_frame.png"
-            final_frame.save(temp_png_path, "PNG")
-
-            # Get the config for the target device
-            config = self.device_configs.get(address, {})
-            params = argparse.Namespace(
-                image_file=[temp_png_path],
-                start_buffer=config.get('buffer', 1),
-                auto_resize=config.get('auto_resize', False),
-                device_width=device_width,
-                device_height=device_height,
-                anchor=config.get('anchor', 0x33),
-                join_image_files=False
-            )
-            self.queue_command_for_device(address, params, write_data_png.make, f"First Frame to {address}")
-
-        except Exception as e:
-            print(f"Error sending first frame of GIF: {e}")
-
 if __name__ == "__main__":
     # Check if bleak is installed
     try:
@@ -1438,6 +2765,7 @@ if __name__ == "__main__":
         if app.spotify_thread and app.spotify_thread.is_alive():
             app.spotify_thread.stop()
             threads_to_join.append(app.spotify_thread)
+        app.stop_streams()
         for thread in app.ble_threads.values():
             if thread.is_alive():
                 thread.stop()
@@ -1446,6 +2774,11 @@ if __name__ == "__main__":
         # Wait for threads to finish, with a timeout
         for thread in threads_to_join:
             thread.join(timeout=1.0)
+        app.art_cache.flush()
+        app.wall_cache.flush()
+        print(f"Reconnects: {app.reconnect.summary()}")
+        if app.scanner_thread:
+            app.scanner_thread.stop()
         app.destroy()
 
     app.protocol("WM_DELETE_WINDOW", on_closing)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+# Import modules
+import argparse
+import bisect
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GRAPHQL_PATH = "/api/graphql"
+
+def helper_convert_speed(value: str) -> float:
+    if value.lower() == "max":
+        return 0.0
+    try:
+        speed = float(value.lower().rstrip("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("The speed must be a factor (e.g. 1x, 20x) or max")
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("The speed must be positive")
+    return speed
+
+def load_session(path: str) -> list[tuple[float, dict]]:
+    """
+    Reads a session recorded by the Multiviewer integration.
+
+    :param path: Recording (.jsonl.gz), one {"t": seconds, "state": f1LiveTimingState} per line.
+    :return: List of (seconds since the start, state), in order.
+    """
+    records = []
+    with gzip.open(path, 'rt', encoding = 'utf-8') as f:
+        try:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records.append((float(record['t']), record['state']))
+        except (EOFError, json.JSONDecodeError):
+            # The app did not exit cleanly, keep what was flushed
+            pass
+    if not records:
+        raise ValueError(f"{path} holds no recorded states")
+    return records
+
+class SessionReplay:
+    r"""Plays a recorded session back on a virtual clock.
+
+    At a speed factor, the state served is the last one recorded before
+    the elapsed time multiplied by the factor. At max speed (0) every
+    request gets the next state, so no change is skipped and the session
+    runs as fast as the client polls.
+
+    Only this clock is sped up. The client's own timing (the app polls
+    every 0.1 s and debounces flags in real time) is not, so at max speed
+    a session takes at least the poll interval per state. Only 1x
+    reproduces what the panels would have shown: faster, a flag has less
+    wall time to outlast its settle time (1.5 s back to green), and at max
+    speed most flag changes are debounced away. Use the faster speeds to
+    exercise the app, not to judge the flags.
+
+    :param records: Recorded (seconds, state) pairs.
+    :param speed: Speed factor, 0 for max.
+    :param loop: If True, start over after the last state.
+    """
+    def __init__(self, records: list[tuple[float, dict]], speed: float = 1.0, loop: bool = False, clock = time.monotonic):
+        self.records = records
+        self.times = [t for t, _ in records]
+        self.speed = speed
+        self.loop = loop
+        self.clock = clock
+        self.started = None
+        self.index = -1
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self) -> float:
+        return self.records[-1][0] - self.records[0][0]
+
+    def next_state(self) -> tuple[int, dict]:
+        """
+        Returns the state to serve for a request.
+
+        :return: Tuple of the record index and the state.
+        """
+        with self._lock:
+            self.requests += 1
+            if self.started is None:
+                self.started = self.clock()
+            if self.speed == 0:
+                index = self.index + 1
+                if index >= len(self.records):
+                    index = 0 if self.loop else len(self.records) - 1
+            else:
+                elapsed = (self.clock() - self.started) * self.speed
+                if self.loop and self.duration > 0:
+                    elapsed %= self.duration
+                index = max(bisect.bisect_right(self.times, self.times[0] + elapsed) - 1, 0)
+            changed = index != self.index
+            self.index = index
+            if changed and index == len(self.records) - 1 and not self.loop:
+                print(f"Replay finished: {len(self.records)} states ({self.duration:.0f} s session) in {self.clock() - self.started:.1f} s, {self.requests} requests")
+            return index, self.records[index][1]
+
+def make_handler(replay: SessionReplay):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != GRAPHQL_PATH:
+                self.send_error(404)
+                return
+            # The query is always the one of the Multiviewer integration
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            _, state = replay.next_state()
+            body = json.dumps({"data": {"f1LiveTimingState": state}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description = 'serve a recorded Multiviewer session on the live timing API, e.g. to load-test the panels')
+    parser.add_argument("--speed", type = helper_convert_speed, default = 1.0, help = 'speed factor (1x, 20x, ...) or max for the next state on every request (default: 1x). The app still debounces flags in real time, so only 1x shows the flags the panels would have shown, at max most flag changes are debounced away')
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 10101)
+    parser.add_argument("--loop", default = False, action = "store_true", help = 'start over after the last state')
+    parser.add_argument("session_file", help = 'recording (.jsonl.gz) from the mv_sessions folder')
+    args = parser.parse_args()
+
+    replay = SessionReplay(load_session(args.session_file), args.speed, args.loop)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(replay))
+    speed = "max speed" if args.speed == 0 else f"{args.speed:g}x"
+    print(f"Replaying {len(replay.records)} states ({replay.duration:.0f} s session) at {speed} on http://{args.host}:{args.port}{GRAPHQL_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
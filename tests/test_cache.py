@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+# Import modules
+import os
+import tempfile
+import unittest
+from ipixel_ctrl.cache import INDEX_FILE, PayloadCache
+
+class PayloadCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = PayloadCache(self.dir.name, max_bytes = 10)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.put("a", b'1234')
+        self.assertEqual(self.cache.get("a"), b'1234')
+        self.assertIn("a", self.cache)
+        self.assertEqual(self.cache.total_bytes, 4)
+        # Replacing an entry does not count it twice
+        self.cache.put("a", b'12')
+        self.assertEqual((len(self.cache), self.cache.total_bytes), (1, 2))
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.put("a", b'aaaa')
+        self.cache.put("b", b'bbbb')
+        self.cache.get("a")
+        self.cache.put("c", b'cccc')
+        self.assertNotIn("b", self.cache)
+        self.assertEqual(self.cache.get("a"), b'aaaa')
+        self.assertEqual(self.cache.get("c"), b'cccc')
+        self.assertEqual(self.cache.total_bytes, 8)
+        # Evicted files are removed from disk
+        self.assertEqual(len([f for f in os.listdir(self.dir.name) if f.endswith(".bin")]), 2)
+
+    def test_oversized_data_is_not_stored(self):
+        self.cache.put("a", b'0123456789A')
+        self.assertEqual(len(self.cache), 0)
+
+    def test_index_persists_with_lru_order(self):
+        self.cache.put("a", b'aaaa')
+        self.cache.put("b", b'bbbb')
+        self.cache.get("a")
+        self.cache.flush()
+        reopened = PayloadCache(self.dir.name, max_bytes = 10)
+        self.assertEqual(reopened.total_bytes, 8)
+        self.assertEqual(reopened.get("b"), b'bbbb')
+        # a was used after b before the restart, b since then
+        reopened.put("c", b'cc')
+        reopened.put("d", b'dd')
+        self.assertNotIn("a", reopened)
+        self.assertIn("b", reopened)
+
+    def test_missing_file_is_a_miss(self):
+        self.cache.put("a", b'aaaa')
+        for name in os.listdir(self.dir.name):
+            if name.endswith(".bin"):
+                os.remove(os.path.join(self.dir.name, name))
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual((len(self.cache), self.cache.total_bytes), (0, 0))
+
+    def test_clear_and_broken_index(self):
+        self.cache.put("a", b'aaaa')
+        self.cache.clear()
+        self.assertEqual(PayloadCache(self.dir.name).total_bytes, 0)
+        with open(os.path.join(self.dir.name, INDEX_FILE), 'w') as f:
+            f.write("{broken")
+        self.assertEqual(len(PayloadCache(self.dir.name)), 0)
+
+if __name__ == "__main__":
+    unittest.main()
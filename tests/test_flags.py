@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+# Import modules
+import unittest
+from ipixel_ctrl.flags import DEFAULT_MV_POLICY, FlagDebouncer
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class FlagDebouncerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.debouncer = FlagDebouncer(clock = self.clock)
+
+    def offer(self, action, after = 0.0):
+        self.clock.now += after
+        self.debouncer.offer(action)
+        return self.debouncer.poll()
+
+    def wait(self, seconds):
+        self.clock.now += seconds
+        return self.debouncer.poll()
+
+    def show(self, action):
+        self.assertEqual(self.offer(action), action)
+
+    def test_settle(self):
+        self.show('yellow')
+        # Green must persist for its settle time
+        self.clock.now += 10
+        self.assertIsNone(self.offer('green'))
+        self.assertIsNone(self.wait(1.4))
+        self.assertEqual(self.wait(0.2), 'green')
+        self.assertIsNone(self.wait(10))
+
+    def test_dwell(self):
+        self.show('sc')
+        # Ending settles after 1 s, but the safety car stays up for 3 s
+        self.assertIsNone(self.offer('ending', 0.5))
+        self.assertIsNone(self.wait(1.5))
+        self.assertEqual(self.wait(1.0), 'ending')
+        self.assertEqual(self.debouncer.shown_at, self.clock.now)
+
+    def test_escalation_skips_the_dwell(self):
+        self.show('yellow')
+        self.assertEqual(self.offer('sc', 0.1), 'sc')
+        # Back down to yellow waits for the dwell of sc
+        self.assertIsNone(self.offer('yellow', 0.1))
+        self.assertEqual(self.wait(DEFAULT_MV_POLICY['dwell']['sc']), 'yellow')
+
+    def test_preemption_skips_settle_and_dwell(self):
+        self.debouncer = FlagDebouncer({'settle': {'red': 5.0}}, clock = self.clock)
+        self.show('sc')
+        self.assertEqual(self.offer('red', 0.1), 'red')
+        # Red has no dwell, the next action follows at once
+        self.show('sc')
+
+    def test_bounce_back_drops_the_candidate(self):
+        self.show('yellow')
+        self.clock.now += 10
+        self.assertIsNone(self.offer('green'))
+        self.assertIsNone(self.offer('yellow', 1.0))
+        self.assertIsNone(self.debouncer.pending)
+        # Green has to settle again from scratch
+        self.assertIsNone(self.offer('green', 0.1))
+        self.assertIsNone(self.wait(1.0))
+        self.assertEqual(self.wait(0.5), 'green')
+        self.assertEqual((self.debouncer.offered, self.debouncer.sent), (4, 2))
+
+    def test_overrides_merge_with_the_defaults(self):
+        debouncer = FlagDebouncer({'settle': {'green': 0.0}, 'preempt': []}, clock = self.clock)
+        self.assertEqual(debouncer.settle, {'green': 0.0, 'ending': 1.0})
+        self.assertEqual(debouncer.preempt, set())
+        self.assertEqual(debouncer.dwell, DEFAULT_MV_POLICY['dwell'])
+
+    def test_reset_forgets_the_shown_action(self):
+        self.show('sc')
+        self.debouncer.reset()
+        # The same action is shown again, without a dwell
+        self.show('sc')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+# Import modules
+import unittest
+import numpy as np
+from PIL import Image
+from ipixel_ctrl import image
+
+class ResizeStackTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.stack = rng.integers(0, 256, (3, 40, 50, 4), dtype = np.uint8)
+
+    def test_matches_pillow(self):
+        for mode in (image.RESAMPLE_LANCZOS, image.RESAMPLE_BOX, image.RESAMPLE_NEAREST):
+            with self.subTest(mode = mode):
+                resized = image.resize_stack(self.stack, 96, 32, mode)
+                self.assertEqual(resized.shape, (3, 32, 96, 4))
+                for frame, expected in zip(resized, self.stack):
+                    np.testing.assert_array_equal(frame, np.asarray(Image.fromarray(expected, "RGBA").resize((96, 32), image.PIL_FILTERS[mode])))
+
+    def test_same_size_and_invalid_mode(self):
+        self.assertIs(image.resize_stack(self.stack, 50, 40), self.stack)
+        with self.assertRaises(ValueError):
+            image.resize_stack(self.stack, 96, 32, "bicubic")
+
+class HoldFirstFrameTest(unittest.TestCase):
+    def setUp(self):
+        self.stack = np.stack([np.full((4, 4, 4), i, np.uint8) for i in range(3)])
+
+    def test_keeps_order_and_holds_a_copy(self):
+        stack, durations, loop = image.hold_first_frame(self.stack, 100, 200)
+        np.testing.assert_array_equal(stack[:3], self.stack)
+        np.testing.assert_array_equal(stack[3], self.stack[0])
+        self.assertEqual(durations, [100, 100, 100, image.HOLD_FRAME_DURATION])
+        self.assertIsNone(loop)
+
+    def test_several_passes_loop(self):
+        stack, durations, loop = image.hold_first_frame(self.stack, [100, 200, 300], 1000)
+        np.testing.assert_array_equal(stack[0], self.stack[0])
+        np.testing.assert_array_equal(stack[-1], self.stack[0])
+        self.assertEqual(durations, [100, 200, 300, image.HOLD_SEAM_DURATION])
+        # Two passes in total, ending on the copy of the first frame
+        self.assertEqual(loop, 1)
+
+    def test_single_frame_and_invalid_time(self):
+        stack, durations, loop = image.hold_first_frame(self.stack[:1], 100, 200)
+        self.assertEqual((len(stack), durations, loop), (1, 100, None))
+        with self.assertRaises(ValueError):
+            image.hold_first_frame(self.stack, 100, 0)
+
+if __name__ == "__main__":
+    unittest.main()
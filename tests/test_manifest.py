@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+# Import modules
+import argparse
+import os
+import tempfile
+import unittest
+from ipixel_ctrl import manifest
+from ipixel_ctrl.commands import common, erase_data
+
+INFO = {'mcu_version': '01.02', 'ble_version': '03.04', 'extra': ''}
+
+def data_payload(buffer, data = b'frame', command = common.CMD_SEND_GIF):
+    return common.make_data_payload(command, data, buffer)
+
+class BufferManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "manifest.json")
+        self.manifest = manifest.BufferManifest(self.path)
+        self.manifest.reset('A', INFO)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_parse_data_payload(self):
+        info = manifest.parse_data_payload(data_payload(5, b'abc'))
+        self.assertEqual((info['command'], info['buffer'], info['size']), (common.CMD_SEND_GIF, 5, 3))
+        self.assertIsNone(manifest.parse_data_payload(common.make_payload(0x8005, b'')))
+
+    def test_record_and_holds(self):
+        self.assertTrue(self.manifest.record('A', [data_payload(1)]))
+        self.assertTrue(self.manifest.holds('A', data_payload(1)))
+        self.assertFalse(self.manifest.holds('A', data_payload(1, b'other')))
+        self.assertFalse(self.manifest.holds('A', data_payload(2)))
+        self.assertFalse(self.manifest.holds('B', data_payload(1)))
+        # A newer write replaces the buffer
+        self.manifest.record('A', [data_payload(1, b'other')])
+        self.assertFalse(self.manifest.holds('A', data_payload(1)))
+
+    def test_diy_buffer_is_not_recorded(self):
+        self.assertFalse(self.manifest.record('A', [data_payload(common.DIY_BUFFER)]))
+        self.assertFalse(self.manifest.holds('A', data_payload(common.DIY_BUFFER)))
+        self.assertEqual(self.manifest.buffers('A'), {})
+
+    def test_delete_removes_buffers(self):
+        self.manifest.record('A', [data_payload(1), data_payload(2)])
+        erase = erase_data.make(argparse.Namespace(erase_all = False, buffer = [1]))
+        self.assertEqual(manifest.parse_erase_payload(erase[0]), [1])
+        self.assertTrue(self.manifest.record('A', erase))
+        self.assertEqual(list(self.manifest.buffers('A')), [2])
+
+    def test_unknown_device_is_ignored(self):
+        self.assertFalse(self.manifest.record('B', [data_payload(1)]))
+        self.manifest.record_space('B', '00')
+        self.assertEqual(self.manifest.buffers('B'), {})
+
+    def test_verify_needs_firmware_and_space(self):
+        self.manifest.record('A', [data_payload(1)])
+        self.assertFalse(self.manifest.verify('A', INFO, '10'))
+        self.manifest.record_space('A', '10')
+        self.assertTrue(self.manifest.verify('A', INFO, '10'))
+        self.assertFalse(self.manifest.verify('A', INFO, '0f'))
+        self.assertFalse(self.manifest.verify('A', INFO, None))
+        self.assertFalse(self.manifest.verify('A', None, '10'))
+        self.assertFalse(self.manifest.verify('A', {**INFO, 'mcu_version': '01.03'}, '10'))
+        self.assertFalse(self.manifest.verify('B', INFO, '10'))
+
+    def test_persists(self):
+        self.manifest.record('A', [data_payload(1)])
+        self.manifest.record_space('A', '10')
+        reloaded = manifest.BufferManifest(self.path)
+        self.assertTrue(reloaded.holds('A', data_payload(1)))
+        self.assertTrue(reloaded.verify('A', INFO, '10'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+# Import modules
+import os
+import tempfile
+import unittest
+from ipixel_ctrl import playlist
+from ipixel_ctrl.commands import common
+from ipixel_ctrl.manifest import BufferManifest
+
+INFO = {'mcu_version': '01.02', 'ble_version': '03.04', 'extra': ''}
+
+class PlaylistAssignTest(unittest.TestCase):
+    def test_default_buffers(self):
+        buffers = playlist.Playlist().assign(["a"])
+        self.assertEqual(buffers, {"a": playlist.FIRST_BUFFER})
+
+    def test_reorder_keeps_buffers(self):
+        slides = playlist.Playlist()
+        first = slides.assign(["a", "b", "c"])
+        second = slides.assign(["c", "a", "b"])
+        self.assertEqual(list(second), ["c", "a", "b"])
+        self.assertEqual(dict(first), dict(second))
+
+    def test_removal_keeps_others_and_frees_buffer(self):
+        slides = playlist.Playlist(buffers = [1, 2, 3])
+        first = slides.assign(["a", "b", "c"])
+        second = slides.assign(["a", "c"])
+        self.assertEqual(second, {"a": first["a"], "c": first["c"]})
+        # The freed buffer goes to the next new slide
+        third = slides.assign(["a", "c", "d"])
+        self.assertEqual(third["d"], first["b"])
+
+    def test_saved_assignments(self):
+        slides = playlist.Playlist(buffers = [1, 2, 3], assignments = {"a": 3, "b": 9})
+        # Assignments outside the buffers are dropped
+        self.assertEqual(slides.assign(["b", "a"]), {"b": 1, "a": 3})
+
+    def test_invalid_playlists(self):
+        slides = playlist.Playlist(buffers = [1, 2])
+        with self.assertRaises(ValueError):
+            slides.assign([])
+        with self.assertRaises(ValueError):
+            slides.assign(["a", "a"])
+        with self.assertRaises(ValueError):
+            slides.assign(["a", "b", "c"])
+
+class PlaylistPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.manifest = BufferManifest(os.path.join(self.dir.name, "manifest.json"))
+        self.manifest.reset('A', INFO)
+        self.sources = {"a": b'one', "b": b'two'}
+        self.rendered = []
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def render(self, slide, buffer):
+        self.rendered.append(slide)
+        return [common.make_data_payload(common.CMD_SEND_GIF, self.sources[slide], buffer)]
+
+    def fingerprint(self, slide):
+        return self.sources[slide].hex()
+
+    def test_only_changed_slides_are_uploaded(self):
+        slides = playlist.Playlist(buffers = [1, 2])
+        uploads, mode = slides.plan('A', ["a", "b"], self.render, self.manifest, self.fingerprint)
+        self.assertEqual(len(uploads), 2)
+        self.assertEqual(len(mode), 1)
+        self.manifest.record('A', uploads)
+        self.sources["b"] = b'changed'
+        uploads, _ = slides.plan('A', ["b", "a"], self.render, self.manifest, self.fingerprint)
+        self.assertEqual(uploads, [common.make_data_payload(common.CMD_SEND_GIF, b'changed', 2)])
+        # Slide a was rendered once, its fingerprint did not change
+        self.assertEqual(self.rendered, ["a", "b", "b"])
+
+if __name__ == "__main__":
+    unittest.main()
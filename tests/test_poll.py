@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# Import modules
+import unittest
+from ipixel_ctrl.poll import SpotifyPollScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+def playing(duration_ms, progress_ms):
+    return {'is_playing': True, 'item': {'duration_ms': duration_ms}, 'progress_ms': progress_ms}
+
+class SpotifyPollSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = SpotifyPollScheduler(self.clock)
+
+    def poll(self, playback, changed = False, latency = 0.0):
+        started = self.clock.now
+        self.clock.now += latency
+        delay = self.scheduler.next_delay(playback, changed, started)
+        self.clock.now += delay
+        return delay
+
+    def test_playing_is_capped(self):
+        delays = [self.poll(playing(180000, 10000 + i * 3000)) for i in range(5)]
+        self.assertEqual(delays, [SpotifyPollScheduler.PLAYING_MAX_INTERVAL] * 5)
+        self.assertLessEqual(SpotifyPollScheduler.PLAYING_MAX_INTERVAL, 3.0)
+
+    def test_polls_just_after_the_track_end(self):
+        self.assertAlmostEqual(self.poll(playing(180000, 179000), latency = 0.2), 1.0 + SpotifyPollScheduler.END_MARGIN - 0.2)
+        # Never faster than MIN_INTERVAL
+        self.assertEqual(self.poll(playing(180000, 180000)), SpotifyPollScheduler.MIN_INTERVAL)
+
+    def test_idle_backs_off_to_the_cap(self):
+        delays = [self.poll(None) for _ in range(4)]
+        self.assertEqual(delays, [3.0, 6.0, 6.0, 6.0])
+        self.assertEqual(self.poll({'is_playing': False, 'item': {'duration_ms': 1000}}), 6.0)
+
+    def test_resume_resets_the_backoff(self):
+        for _ in range(3):
+            self.poll(None)
+        self.poll(playing(180000, 0))
+        self.assertEqual(self.poll(None), SpotifyPollScheduler.IDLE_MIN_INTERVAL)
+
+    def test_skip_starts_fast_polls(self):
+        self.poll(playing(180000, 0))
+        delays = [self.poll(playing(200000, 0), changed = (i == 0)) for i in range(5)]
+        self.assertEqual(delays, [SpotifyPollScheduler.SKIP_INTERVAL] * 3 + [SpotifyPollScheduler.PLAYING_MAX_INTERVAL] * 2)
+
+    def test_error_forgets_the_track(self):
+        self.poll(playing(180000, 0))
+        self.assertEqual(self.scheduler.error_delay(), SpotifyPollScheduler.ERROR_INTERVAL)
+        self.assertIsNone(self.scheduler.expected_end)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Import modules
+import unittest
+from ipixel_ctrl.reconnect import ReconnectSupervisor
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class ReconnectSupervisorTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.random = 0.0
+        self.supervisor = ReconnectSupervisor(self.clock, lambda: self.random)
+
+    def delays(self, address, count):
+        return [self.supervisor.next_delay(address) for _ in range(count)]
+
+    def test_backoff_grows_and_is_capped(self):
+        self.assertTrue(self.supervisor.lost('A'))
+        self.random = 0.999999
+        caps = [round(d) for d in self.delays('A', 8)]
+        self.assertEqual(caps, [1, 2, 4, 8, 16, 30, 30, 30])
+        self.assertEqual(self.supervisor.attempts('A'), 8)
+
+    def test_jitter_keeps_half_the_delay(self):
+        self.supervisor.lost('A')
+        self.random = 0.0
+        self.assertEqual(self.delays('A', 3), [0.5, 1.0, 2.0])
+        self.random = 0.5
+        self.assertEqual(self.supervisor.next_delay('A'), 6.0)
+
+    def test_recovery_is_measured_from_the_first_drop(self):
+        self.supervisor.lost('A')
+        self.delays('A', 2)
+        self.clock.now += 5
+        # A second drop report does not restart the clock
+        self.supervisor.lost('A')
+        self.clock.now += 2.5
+        self.assertEqual(self.supervisor.recovered('A'), (7.5, 2))
+        self.assertFalse(self.supervisor.is_recovering('A'))
+        self.assertIsNone(self.supervisor.recovered('A'))
+        self.assertEqual(self.supervisor.summary(), "1 recoveries, mean 7.5 s, max 7.5 s")
+
+    def test_user_disconnect_suppresses_retries(self):
+        self.supervisor.lost('A')
+        self.supervisor.user_disconnected('A')
+        self.assertFalse(self.supervisor.is_recovering('A'))
+        self.assertTrue(self.supervisor.is_suppressed('A'))
+        self.assertFalse(self.supervisor.lost('A'))
+        self.assertFalse(self.supervisor.is_recovering('A'))
+        self.supervisor.user_connected('A')
+        self.assertTrue(self.supervisor.lost('A'))
+        self.assertEqual(self.supervisor.attempts('A'), 0)
+
+    def test_devices_back_off_independently(self):
+        self.supervisor.lost('A')
+        self.supervisor.lost('B')
+        self.delays('A', 3)
+        self.assertEqual(self.supervisor.next_delay('B'), 0.5)
+        self.assertEqual(self.supervisor.summary(), "no recoveries")
+
+if __name__ == "__main__":
+    unittest.main()
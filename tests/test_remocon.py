@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+# Import modules
+import queue
+import threading
+import unittest
+from ipixel_ctrl.commands import common
+from ipixel_ctrl.remocon import RemoconSlots, SyncSwitch
+
+FIRST = common.REMOCON_BUFFER
+
+class RemoconSlotsTest(unittest.TestCase):
+    def fill(self, slots, keys):
+        for key in keys:
+            slots.store(key, slots.allocate(key))
+
+    def test_budget_is_clamped(self):
+        self.assertEqual(RemoconSlots(-1).budget, 0)
+        self.assertEqual(RemoconSlots(99).budget, common.REMOCON_COUNT)
+        self.assertIsNone(RemoconSlots(0).allocate('a'))
+
+    def test_free_slots_first(self):
+        slots = RemoconSlots(3)
+        self.fill(slots, ['a', 'b', 'c'])
+        self.assertEqual(slots.assets, {'a': FIRST, 'b': FIRST + 1, 'c': FIRST + 2})
+        self.assertEqual(RemoconSlots.screen(FIRST + 2), 3)
+
+    def test_evicts_least_recently_used(self):
+        slots = RemoconSlots(3)
+        self.fill(slots, ['a', 'b', 'c'])
+        self.assertEqual(slots.lookup('a'), FIRST)
+        self.assertEqual(slots.allocate('d'), FIRST + 1)
+        self.assertNotIn('b', slots.assets)
+
+    def test_never_evicts_the_slot_on_screen(self):
+        slots = RemoconSlots(2)
+        self.fill(slots, ['a', 'b'])
+        slots.current = FIRST
+        self.assertEqual(slots.allocate('c'), FIRST + 1)
+        slots.store('c', FIRST + 1)
+        slots.current = FIRST + 1
+        # 'a' is the least recently used now and not on screen
+        self.assertEqual(slots.allocate('d'), FIRST)
+
+    def test_single_slot_on_screen_is_busy(self):
+        slots = RemoconSlots(1)
+        self.fill(slots, ['a'])
+        slots.current = FIRST
+        self.assertIsNone(slots.allocate('b'))
+        self.assertEqual(slots.lookup('a'), FIRST)
+
+    def test_prefetch_in_flight_is_busy(self):
+        slots = RemoconSlots(2)
+        token = slots.begin_prefetch('a', slots.allocate('a'))
+        self.assertTrue(slots.is_known('a'))
+        self.assertEqual(slots.allocate('b'), FIRST + 1)
+        slots.store('b', FIRST + 1)
+        slots.current = FIRST + 1
+        self.assertIsNone(slots.allocate('c'))
+        slots.end_prefetch(token, True)
+        self.assertEqual(slots.lookup('a'), FIRST)
+
+    def test_aborted_prefetch_frees_its_slot(self):
+        slots = RemoconSlots(1)
+        token = slots.begin_prefetch('a', slots.allocate('a'))
+        slots.end_prefetch(token, False)
+        self.assertFalse(slots.is_known('a'))
+        self.assertEqual(slots.allocate('b'), FIRST)
+
+    def test_store_replaces_the_old_asset(self):
+        slots = RemoconSlots(2)
+        self.fill(slots, ['a'])
+        slots.store('b', FIRST)
+        self.assertIsNone(slots.lookup('a'))
+        slots.current = FIRST
+        slots.forget_all()
+        self.assertEqual(slots.assets, {})
+        self.assertIsNone(slots.current)
+
+class SyncSwitchTest(unittest.TestCase):
+    def setUp(self):
+        self.status = queue.Queue()
+        self.sync = SyncSwitch({'A': [b'a'], 'B': [b'b'], 'C': [b'c']}, self.status, unchanged = ['C'])
+
+    def test_released_on_the_last_report(self):
+        self.sync.staged('A')
+        self.sync.staged('C')
+        self.assertFalse(self.sync.go.is_set())
+        # A repeated report does not count twice
+        self.sync.staged('A')
+        self.assertFalse(self.sync.go.is_set())
+        self.sync.staged('B')
+        self.assertTrue(self.sync.go.is_set())
+
+    def test_waiting_threads_switch_together(self):
+        released = []
+        def device(address):
+            self.sync.staged(address)
+            if self.sync.go.wait(5):
+                released.append(address)
+        threads = [threading.Thread(target = device, args = (a,)) for a in ('A', 'B')]
+        for thread in threads:
+            thread.start()
+        self.assertFalse(self.sync.go.wait(0.05))
+        device('C')
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(sorted(released), ['A', 'B', 'C'])
+
+    def test_skew_is_reported_once_all_switched(self):
+        self.sync.record('A', 10.0)
+        self.sync.record('C', 9.0)
+        self.assertTrue(self.status.empty())
+        self.sync.record('B', 10.025)
+        # C showed the content already, it does not count
+        self.assertEqual(self.status.get_nowait(), "SYNC_DONE:2:25.0")
+        self.assertAlmostEqual(self.sync.skew(), 0.025)
+
+    def test_failed_switches_do_not_count(self):
+        self.sync.record('A', None)
+        self.sync.record('B', 10.0)
+        self.sync.record('C', None)
+        self.assertEqual(self.status.get_nowait(), "SYNC_DONE:1:0.0")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+# Import modules
+import unittest
+import numpy as np
+from ipixel_ctrl.wall import WallLayout, WallPanel
+
+SIZES = {"A": (64, 16), "B": (32, 32), "C": (64, 16)}
+
+class WallLayoutTest(unittest.TestCase):
+    def test_from_config_places_panels_in_cells(self):
+        layout = WallLayout.from_config({"panels": [
+            {"address": "A", "row": 0, "column": 0},
+            {"address": "B", "row": 0, "column": 1, "offset_x": 2},
+            {"address": "C", "row": 1, "column": 0, "offset_y": 1},
+        ]}, SIZES)
+        self.assertEqual(layout.panels, [WallPanel("A", 0, 0, 64, 16), WallPanel("B", 66, 0, 32, 32), WallPanel("C", 0, 33, 64, 16)])
+        self.assertEqual((layout.width, layout.height), (98, 49))
+
+    def test_from_config_needs_sizes(self):
+        with self.assertRaises(ValueError):
+            WallLayout.from_config({"panels": [{"address": "D"}]}, SIZES)
+        with self.assertRaises(ValueError):
+            WallLayout.from_config({"panels": []}, SIZES)
+
+    def test_invalid_areas(self):
+        with self.assertRaises(ValueError):
+            WallLayout([WallPanel("A", -1, 0, 64, 16)])
+        with self.assertRaises(ValueError):
+            WallLayout([WallPanel("A", 0, 0, 0, 16)])
+
+    def test_slices_are_views_of_each_panel(self):
+        layout = WallLayout([WallPanel("A", 0, 0, 64, 16), WallPanel("C", 0, 16, 64, 16), WallPanel("B", 64, 0, 32, 32)])
+        self.assertEqual((layout.width, layout.height), (96, 32))
+        stack = np.arange(2 * 32 * 96, dtype = np.int32).reshape(2, 32, 96)
+        views = layout.slices(stack)
+        self.assertEqual(views["A"].shape, (2, 16, 64))
+        self.assertEqual(views["C"].shape, (2, 16, 64))
+        self.assertEqual(views["B"].shape, (2, 32, 32))
+        np.testing.assert_array_equal(views["C"], stack[:, 16:32, 0:64])
+        np.testing.assert_array_equal(views["B"], stack[:, :, 64:96])
+        for view in views.values():
+            self.assertTrue(np.shares_memory(view, stack))
+
+    def test_slices_need_canvas_size(self):
+        layout = WallLayout([WallPanel("A", 0, 0, 64, 16)])
+        with self.assertRaises(ValueError):
+            layout.slices(np.zeros((1, 16, 32), dtype = np.uint8))
+
+    def test_panel_keys_differ_per_panel_and_layout(self):
+        first = WallLayout([WallPanel("A", 0, 0, 64, 16), WallPanel("B", 64, 0, 32, 32)])
+        second = WallLayout([WallPanel("A", 0, 0, 64, 16), WallPanel("B", 64, 0, 32, 16)])
+        keys = {first.panel_key("k", p) for p in first.panels} | {second.panel_key("k", p) for p in second.panels}
+        self.assertEqual(len(keys), 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+# Import modules
+import os
+import re
+import unittest
+from ipixel_ctrl import utils
+from ipixel_ctrl.commands import common, write_data_mix
+
+DEVICE_COMMANDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "docs", "DeviceCommands.md")
+
+GIF = write_data_mix.PART_GIF
+TEXT = write_data_mix.PART_TEXT
+
+# The parts of the send_mix_data examples, in the order of the document: (type, size, x, y, width, height)
+EXAMPLE_PARTS = [
+    (TEXT, 0x80, 0x00, 0x00, 0x60, 0x10), (TEXT, 0x80, 0x00, 0x10, 0x60, 0x10),
+    (GIF, 0xF61, 0x00, 0x00, 0x20, 0x20), (TEXT, 0x80, 0x20, 0x00, 0x40, 0x20),
+    (TEXT, 0x80, 0x00, 0x00, 0x40, 0x20), (GIF, 0xF61, 0x40, 0x00, 0x20, 0x20),
+    (GIF, 0xF61, 0x00, 0x00, 0x20, 0x20), (TEXT, 0x80, 0x20, 0x00, 0x40, 0x10), (TEXT, 0x80, 0x20, 0x10, 0x40, 0x10),
+    (TEXT, 0x80, 0x00, 0x00, 0x40, 0x10), (TEXT, 0x80, 0x00, 0x10, 0x40, 0x10), (GIF, 0xF61, 0x40, 0x00, 0x20, 0x20),
+]
+
+def documented_headers() -> list[bytes]:
+    with open(DEVICE_COMMANDS, 'r', encoding = 'utf-8') as f:
+        text = f.read()
+    section = text[text.index("## 0x0004 - send_mix_data"):text.index("## 0x0100 - set_text")]
+    return [bytes.fromhex(m.replace(" ", "")) for m in re.findall(r"^(?:GIF|TXT)\d: ([0-9A-F ]+)$", section, re.M)]
+
+class WriteDataMixTest(unittest.TestCase):
+    def test_headers_match_the_documented_examples(self):
+        documented = documented_headers()
+        self.assertEqual(len(documented), len(EXAMPLE_PARTS))
+        for expected, part in zip(documented, EXAMPLE_PARTS):
+            with self.subTest(part = part):
+                header = write_data_mix.make_part_header(*part)
+                self.assertEqual(len(header), write_data_mix.PART_HEADER_SIZE)
+                self.assertEqual(header.hex(), expected.hex())
+
+    def test_invalid_areas(self):
+        with self.assertRaises(ValueError):
+            write_data_mix.make_part_header(GIF, 1, 0, 0, 0x100, 0x20)
+        with self.assertRaises(ValueError):
+            write_data_mix.make_part_header(TEXT, 1, 0, 0, 0x20, 0)
+
+    def test_compose_keeps_the_part_order(self):
+        parts = [write_data_mix.gif_part(b'GIF89a', 0, 0, 32, 32), write_data_mix.text_part(b'text', 32, 0, 64, 32)]
+        data = write_data_mix.compose(parts)
+        self.assertEqual(data[:16], write_data_mix.make_part_header(GIF, 6, 0, 0, 32, 32))
+        self.assertEqual(data[16:22], b'GIF89a')
+        self.assertEqual(data[22:38], write_data_mix.make_part_header(TEXT, 4, 32, 0, 64, 32))
+        self.assertEqual(data[38:], b'text')
+        with self.assertRaises(ValueError):
+            write_data_mix.compose([])
+
+    def test_payload_header(self):
+        mix = write_data_mix.compose([write_data_mix.text_part(b'text', 0, 0, 96, 16)])
+        payload = write_data_mix.build(mix, 0x05)
+        self.assertEqual(int.from_bytes(payload[0:2], 'little'), len(payload))
+        self.assertEqual(int.from_bytes(payload[2:4], 'little'), common.CMD_SEND_MIX)
+        # 00, size, CRC32, 02 fixed, SCR_NO
+        self.assertEqual(payload[4], 0x00)
+        self.assertEqual(int.from_bytes(payload[5:9], 'little'), len(mix))
+        self.assertEqual(int.from_bytes(payload[9:13], 'little'), utils.crc32(mix))
+        self.assertEqual(payload[13:15], bytes([0x02, 0x05]))
+        self.assertEqual(payload[15:], mix)
+
+if __name__ == "__main__":
+    unittest.main()